@@ -1,9 +1,12 @@
 from flask import Flask, render_template, redirect, url_for, request, flash, session
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_migrate import Migrate, stamp
 from config import Config
-from models.database import db
+from models.database import db, configure_sqlite
 from datetime import datetime
+import csv
+import os
+import click
 
 #Import models (after db initialization to avoid circular imports)
 from models.agency import Agency
@@ -11,6 +14,18 @@ from models.agent import Agent
 from models.customer import Customer
 from models.policy import Policy
 from models.claim import Claim
+from models import loaders
+from services import cache
+from services import dashboard
+from services import search
+from services import query_plans
+from services import importer
+from services import renewals
+from services import lifecycle
+from services import metrics
+from services import slow_queries
+from services import seed
+from services.validation import ValidationError
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -18,10 +33,23 @@ app.config.from_object(Config)
 
 # Initialize database
 db.init_app(app)
-migrate = Migrate(app, db)
+# The FTS tables are managed by services.search, keep autogenerate away from them
+migrate = Migrate(app, db, include_name=lambda name, type_, parent_names: not (
+    type_ == 'table' and search.is_search_table(name)
+))
 
+# The schema comes from the migrations (flask db upgrade) or, for a new
+# database without them, from flask create-db; creating missing tables here
+# would let them drift from what the migrations build
 with app.app_context():
-    db.create_all()
+    configure_sqlite(db.engine, app.config.get('SQLITE_PRAGMAS'))
+
+# Request latency, SQL and render timings for /metrics and the Server-Timing header
+metrics.init_app(app)
+# Statements slower than SLOW_QUERY_MS, logged as JSON with their EXPLAIN output
+slow_queries.init_app(app)
+# Page and value cache, invalidated by tag after each commit
+cache.init_app(app)
 
 # Register blueprints
 from routes.agency_routes import agency_bp
@@ -29,12 +57,22 @@ from routes.agent_routes import agent_bp
 from routes.customer_routes import customer_bp
 from routes.policy_routes import policy_bp
 from routes.claim_routes import claim_bp
+from routes.search_routes import search_bp
+from routes.import_routes import import_bp
+from routes.job_routes import job_bp
+from routes.metrics_routes import metrics_bp
+from routes.change_routes import change_bp
 
 app.register_blueprint(agency_bp, url_prefix='/agencies')
 app.register_blueprint(agent_bp, url_prefix='/agents')
 app.register_blueprint(customer_bp, url_prefix='/customers')
 app.register_blueprint(policy_bp, url_prefix='/policies')
 app.register_blueprint(claim_bp, url_prefix='/claims')
+app.register_blueprint(search_bp, url_prefix='/search')
+app.register_blueprint(import_bp, url_prefix='/import')
+app.register_blueprint(job_bp, url_prefix='/jobs')
+app.register_blueprint(metrics_bp)
+app.register_blueprint(change_bp, url_prefix='/api')
 
 # Add 'now' to the Jinja2 template context
 @app.context_processor
@@ -47,47 +85,50 @@ def inject_app_name():
     return {'APP_NAME': app.config['APP_NAME']}                                           
 
 
+# Add the status registries to the Jinja2 template context
+@app.context_processor
+def inject_statuses():
+    return {'POLICY_STATUSES': Policy.STATUSES, 'CLAIM_STATUSES': Claim.STATUSES}
+
+# The home page shows rows of every table
+def _index_tags():
+    return [cache.table(model) for model in (Agency, Agent, Customer, Policy, Claim)]
+
 # Home route
 @app.route('/')
+@cache.cached(_index_tags)
 def index():
 
-    # Dashboard summary data
-    agency_count = Agency.query.count()
-    agent_count = Agent.query.count()
-    customer_count = Customer.query.count()
-    policy_count = Policy.query.count()
-    claim_count = Claim.query.count()
+    # Dashboard summary data (one query, cached for DASHBOARD_CACHE_TTL seconds)
+    counts = dashboard.get_dashboard_counts()
     
     # Get recent policies
-    recent_policies = Policy.query.order_by(Policy.start_date.desc()).limit(4).all()
+    recent_policies = Policy.query.options(*loaders.policy_list()).order_by(Policy.start_date.desc()).limit(4).all()
     
-    # Get upcoming renewals
-    upcoming_renewals = Policy.query.filter(
-        Policy.end_date.isnot(None)
-    ).order_by(Policy.end_date.asc()).limit(4).all()
+    # Get upcoming renewals (Active policies ending from today on)
+    upcoming_renewals = renewals.upcoming(Policy.query.options(*loaders.policy_list()), 4).all()
     
     # Get recent claims
-    recent_claims = Claim.query.order_by(Claim.claim_date.desc()).limit(4).all()
+    recent_claims = Claim.query.options(*loaders.claim_list()).order_by(Claim.claim_date.desc()).limit(4).all()
     
     # Get open claims
-    open_claims = Claim.query.filter(
-        Claim.status.in_(['Open', 'In Progress', 'Under Review'])
+    open_claims = Claim.query.options(*loaders.claim_list()).filter(
+        Claim.is_open()
     ).order_by(Claim.claim_date.asc()).limit(4).all()
-    open_claim_count = Claim.query.filter(Claim.status.in_(['Open', 'In Progress', 'Under Review'])).count()
     
     return render_template('index.html', 
-                           agency_count=agency_count,
-                           agent_count=agent_count,
-                           customer_count=customer_count,
-                           policy_count=policy_count,
-                           claim_count=claim_count,
                            recent_policies=recent_policies,
                            upcoming_renewals=upcoming_renewals,
                            recent_claims=recent_claims,
                            open_claims=open_claims,
-                           open_claim_count=open_claim_count)
+                           **counts)
 
 # Error handlers
+@app.errorhandler(400)
+def bad_request(e):
+    return render_template('layout/error.html', error_code=400,
+                          error_message=e.description or "Bad request"), 400
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('layout/error.html', error_code=404, 
@@ -103,7 +144,138 @@ def server_error(e):
 def create_db_command():
     """Create database tables."""
     db.create_all()
+    # The tables are what the latest migration builds: later upgrades start here
+    stamp()
     print("Database initialized!")
 
+# Command to rebuild the full-text search index
+@app.cli.command("search-reindex")
+def search_reindex_command():
+    """Rebuild the full-text search index from the source tables."""
+    with db.engine.begin() as connection:
+        if not search.install_search_index(connection):
+            print("Full-text search is not available on this database; using ILIKE search.")
+            return
+        search.rebuild_search_index(connection)
+    print("Search index rebuilt!")
+
+# Command to check that the list-view queries are served by indexes
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """Fail if EXPLAIN QUERY PLAN shows a full table scan for any list-view query."""
+    offenders = query_plans.full_scans()
+    for name, plan in offenders.items():
+        print(f"{name}:")
+        for line in plan:
+            print(f"    {line}")
+    if offenders:
+        raise SystemExit(f"{len(offenders)} query shape(s) scan a whole table.")
+    checked = len(query_plans.QUERY_SHAPES) - len(query_plans.EXPECTED_SCANS)
+    print(f"All {checked} query shapes use indexes "
+          f"({len(query_plans.EXPECTED_SCANS)} expected scans skipped: {', '.join(query_plans.EXPECTED_SCANS)}).")
+
+# Command to bulk import customers, policies or claims from a CSV file
+@app.cli.command("import")
+@click.argument("entity", type=click.Choice(sorted(importer.IMPORTERS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", type=int, default=None,
+              help="Rows per transaction (default: IMPORT_CHUNK_SIZE).")
+@click.option("--errors", "errors_path", default=None,
+              help="CSV file for rejected rows (default: <path>.errors.csv).")
+def import_command(entity, path, chunk_size, errors_path):
+    """Import ENTITY rows from the CSV file at PATH."""
+    errors_path = errors_path or f"{path}.errors.csv"
+    errors = {'file': None, 'writer': None}
+
+    def on_error(line, row, message):
+        if errors['writer'] is None:
+            errors['file'] = open(errors_path, 'w', newline='', encoding='utf-8')
+            errors['writer'] = csv.writer(errors['file'])
+            errors['writer'].writerow(['line', 'error'] + list(row.keys()))
+        errors['writer'].writerow([line, message] + list(row.values()))
+
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as stream:
+            result = importer.import_csv(entity, stream, chunk_size=chunk_size, on_error=on_error)
+    except ValidationError as e:
+        raise click.ClickException(str(e))
+    finally:
+        if errors['file']:
+            errors['file'].close()
+
+    print(f"Imported {result.imported} {entity} in {result.elapsed:.2f}s "
+          f"({result.rows_per_second:,.0f} rows/sec).")
+    if result.rejected:
+        print(f"Rejected {result.rejected} rows; see {errors_path}")
+
+# Command to bring policy statuses in line with their dates (run nightly)
+@app.cli.command("policy-lifecycle")
+@click.option("--renew", is_flag=True,
+              help="Also create Pending renewals for policies ending within RENEWAL_LEAD_DAYS.")
+@click.option("--date", "today", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Run as of this date (default: today).")
+@click.option("--chunk-size", type=int, default=None,
+              help="Rows per transaction (default: LIFECYCLE_CHUNK_SIZE).")
+@click.option("--history", is_flag=True, help="List the recent runs instead of running.")
+def policy_lifecycle_command(renew, today, chunk_size, history):
+    """Expire lapsed policies, activate due renewals and optionally create renewals."""
+    if history:
+        for run in lifecycle.recent_runs():
+            duration = run.duration_seconds()
+            print(f"{run.started_at:%Y-%m-%d %H:%M:%S}  {run.status:<9}  "
+                  f"expired {run.expired_count}, activated {run.activated_count}, "
+                  f"renewed {run.renewed_count}"
+                  + (f" in {duration:.2f}s" if duration is not None else ""))
+        return
+
+    run = lifecycle.run(today=today.date() if today else None, renew=renew, chunk_size=chunk_size)
+    print(f"Expired {run.expired_count}, activated {run.activated_count} and "
+          f"renewed {run.renewed_count} policies in {run.duration_seconds():.2f}s.")
+
+# Command to fill the database with synthetic data for benchmarks
+@app.cli.command("seed")
+@click.option("--scale", type=float, default=1.0, show_default=True,
+              help="Units of seed.ROWS_PER_SCALE rows to add (1000 is about 1.5 million rows).")
+@click.option("--seed", "seed_number", type=int, default=0, show_default=True,
+              help="Random seed; the same seed adds the same rows.")
+@click.option("--chunk-size", type=int, default=None,
+              help="Rows per transaction (default: IMPORT_CHUNK_SIZE).")
+def seed_command(scale, seed_number, chunk_size):
+    """Add realistic agencies, agents, customers, policies and claims."""
+    result = seed.seed(scale=scale, seed=seed_number, chunk_size=chunk_size)
+    print(", ".join(f"{count:,} {table}" for table, count in result.counts.items()))
+    print(f"Added {result.total:,} rows in {result.elapsed:.2f}s "
+          f"({result.rows_per_second:,.0f} rows/sec).")
+
+# Command to summarize the slow-query log by statement shape
+@app.cli.command("slow-queries")
+@click.option("--path", default=None, help="Log file to read (default: SLOW_QUERY_LOG).")
+@click.option("--limit", type=int, default=10, help="Statement shapes to show.")
+@click.option("--plans", is_flag=True, help="Also print the last EXPLAIN output of each shape.")
+def slow_queries_command(path, limit, plans):
+    """List the slowest statement shapes in the slow-query log by total time."""
+    path = path or slow_queries.log_path(app)
+    if not os.path.exists(path):
+        print(f"No slow queries logged ({path} does not exist).")
+        return
+    summary = slow_queries.summarize(slow_queries.read_log(path))
+    print(f"{len(summary)} statement shape(s) in {path}")
+    for group in summary[:limit]:
+        print(f"\n{group['fingerprint']}  {group['count']}x  total {group['total_ms']:.1f} ms  "
+              f"mean {group['mean_ms']:.1f} ms  max {group['max_ms']:.1f} ms")
+        if group['endpoints']:
+            print(f"    endpoints: {', '.join(group['endpoints'])}")
+        print(f"    {group['statement']}")
+        if plans and group['plan']:
+            for line in group['plan']:
+                print(f"        {line}")
+
+# Command to empty the page and value cache
+@app.cli.command("cache-clear")
+def cache_clear_command():
+    """Drop every cached page and value (CACHE_BACKEND)."""
+    cache.clear()
+    print(f"Cleared the {app.config['CACHE_BACKEND']} cache.")
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""
+Endpoint benchmarks at several data scales, checked against a JSON baseline.
+
+For each scale a fresh SQLite database is filled with ``flask seed`` data in
+a child process, then every GET route of the app (plus the search and filter
+variants in ``EXTRA_CASES``) is requested through the test client. Each case
+records its p50/p95 latency, the SQL statements one request sends and the
+peak Python memory allocated while answering it. The page and value cache
+is off (``CACHE_BACKEND=none``), so every request does its query work
+instead of measuring a cache hit.
+
+    python -m benchmarks.routes                      # run, compare with baseline.json
+    python -m benchmarks.routes --scales 1 10 100 --requests 50
+    python -m benchmarks.routes --update-baseline    # accept the current numbers
+
+A case regresses when its p95 grows by more than ``--tolerance`` (and by at
+least ``MIN_LATENCY_DELTA_MS``), when it sends more statements than before,
+or when its peak memory grows by more than the tolerance (and by at least
+``MIN_MEMORY_DELTA_KIB``). Regressions are listed and the exit status is 1.
+Latency depends on the machine, so compare runs from the same host.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from flask import url_for
+from sqlalchemy import event, text
+
+from models.database import db
+from services import cache
+from services import seed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+DEFAULT_SCALES = (1, 10, 50)
+DEFAULT_REQUESTS = 20
+WARMUP_REQUESTS = 1
+# Stop timing a case after this many seconds once it has MIN_REQUESTS samples
+# (the unpaged JSON lists and exports take seconds per request at scale)
+CASE_TIME_BUDGET = 5.0
+MIN_REQUESTS = 3
+DEFAULT_TOLERANCE = 0.25
+
+# Differences below these are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_KIB = 64
+
+# Route argument -> how to pick the row it names: the one with the most children,
+# so the detail pages are measured at their worst
+ARGUMENTS = {
+    'agency_id': 'SELECT agency_id FROM agent GROUP BY agency_id ORDER BY count(*) DESC LIMIT 1',
+    'agent_id': 'SELECT agent_id FROM policy GROUP BY agent_id ORDER BY count(*) DESC LIMIT 1',
+    'customer_id': 'SELECT customer_id FROM policy GROUP BY customer_id ORDER BY count(*) DESC LIMIT 1',
+    'policy_id': 'SELECT policy_id FROM claim GROUP BY policy_id ORDER BY count(*) DESC LIMIT 1',
+    'claim_id': 'SELECT max(claim_id) FROM claim',
+}
+
+# Extra (case name, URL) pairs for the filters and searches the plain routes miss
+EXTRA_CASES = (
+    ('policy.index?search', '/policies/?search=smith'),
+    ('policy.index?status', '/policies/?status=Active'),
+    ('policy.index?page', '/policies/?page=50'),
+    ('claim.index?search', '/claims/?search=CLM-S0000'),
+    ('claim.index?status', '/claims/?status=Open'),
+    ('customer.index?search', '/customers/?search=garcia'),
+    ('agent.index?search', '/agents/?search=lee'),
+    ('agency.index?search', '/agencies/?search=summit'),
+    ('policy.renewals?bucket', '/policies/renewals?bucket=Warning'),
+    ('policy.api_lookup?q', '/policies/api/lookup?q=POL-S0001'),
+    ('customer.api_lookup?q', '/customers/api/lookup?q=mar'),
+    ('agent.api_lookup?q', '/agents/api/lookup?q=jo'),
+    ('search.api_search?q', '/search/api/search?q=smith'),
+)
+
+# Endpoints that are not pages of the app (static files, the job poller needs a job)
+SKIPPED_ENDPOINTS = {'static', 'job.api_job'}
+
+
+def percentile(values, fraction):
+    """The ``fraction`` percentile of ``values`` by linear interpolation."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def cases(app, arguments):
+    """(case name, URL) for every GET route whose arguments can be filled, plus ``EXTRA_CASES``."""
+    found = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if 'GET' not in rule.methods or rule.endpoint in SKIPPED_ENDPOINTS:
+            continue
+        if not set(rule.arguments) <= set(arguments):
+            continue
+        with app.test_request_context():
+            url = url_for(rule.endpoint, **{name: arguments[name] for name in rule.arguments})
+        found.append((rule.endpoint, url))
+    return found + list(EXTRA_CASES)
+
+
+def _measure(client, engine, url, requests):
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    for _ in range(WARMUP_REQUESTS):
+        client.get(url).get_data()
+
+    latencies = []
+    deadline = time.perf_counter() + CASE_TIME_BUDGET
+    while len(latencies) < requests:
+        started = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        latencies.append((time.perf_counter() - started) * 1000)
+        if len(latencies) >= MIN_REQUESTS and time.perf_counter() > deadline:
+            break
+
+    event.listen(engine, 'before_cursor_execute', count)
+    tracemalloc.start()
+    try:
+        client.get(url).get_data()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        event.remove(engine, 'before_cursor_execute', count)
+
+    return {
+        'url': url,
+        'status': response.status_code,
+        'samples': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'queries': len(statements),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run_scale(scale, requests):
+    """Seed the database named by ``DATABASE_URL`` at ``scale`` and benchmark every case."""
+    # The app creates its engine from DATABASE_URL when it is imported
+    from app import app
+
+    app.config['SLOW_QUERY_MS'] = 0
+    app.config['CACHE_BACKEND'] = 'none'
+    cache.init_app(app)
+    with app.app_context():
+        db.create_all()
+        seeded = seed.seed(scale=scale)
+        arguments = {name: db.session.execute(text(sql)).scalar()
+                     for name, sql in ARGUMENTS.items()}
+        engine = db.engine
+        db.session.remove()
+
+    client = app.test_client()
+    routes = {}
+    for name, url in cases(app, arguments):
+        routes[name] = _measure(client, engine, url, requests)
+    return {
+        'rows': seeded.counts,
+        'seed_seconds': round(seeded.elapsed, 2),
+        'routes': routes,
+    }
+
+
+def _run_in_child(scale, requests):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                   CACHE_BACKEND='none')
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.routes', '--child', str(scale),
+             '--requests', str(requests)],
+            cwd=os.path.dirname(HERE), env=env, capture_output=True, text=True, check=True
+        )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(scales, requests):
+    """Benchmark each scale in its own process and database."""
+    return {
+        'created': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'requests': requests,
+        'scales': {str(scale): _run_in_child(scale, requests) for scale in scales},
+    }
+
+
+def _grew(current, base, tolerance, floor):
+    return current > base * (1 + tolerance) and current - base >= floor
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Describe every case in ``results`` that is worse than in ``baseline``."""
+    regressions = []
+    for scale, measured in results['scales'].items():
+        base_routes = baseline.get('scales', {}).get(scale, {}).get('routes', {})
+        for name, current in measured['routes'].items():
+            base = base_routes.get(name)
+            if base is None:
+                continue
+            label = f'scale {scale} {name}'
+            if current['status'] != base['status']:
+                regressions.append(f"{label}: status {base['status']} -> {current['status']}")
+            if _grew(current['p95_ms'], base['p95_ms'], tolerance, MIN_LATENCY_DELTA_MS):
+                regressions.append(f"{label}: p95 {base['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+            if current['queries'] > base['queries']:
+                regressions.append(f"{label}: queries {base['queries']} -> {current['queries']}")
+            if _grew(current['peak_kib'], base['peak_kib'], tolerance, MIN_MEMORY_DELTA_KIB):
+                regressions.append(
+                    f"{label}: peak memory {base['peak_kib']:.0f} -> {current['peak_kib']:.0f} KiB")
+    return regressions
+
+
+def _print_table(results):
+    for scale, measured in results['scales'].items():
+        rows = measured['rows']
+        print(f"\nScale {scale}: {sum(rows.values()):,} rows "
+              f"(seeded in {measured['seed_seconds']:.1f}s)")
+        print(f"  {'case':<40} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'peak KiB':>9}")
+        for name, route in measured['routes'].items():
+            print(f"  {name:<40} {route['status']:>6} {route['p50_ms']:>8.2f} {route['p95_ms']:>8.2f} "
+                  f"{route['queries']:>8} {route['peak_kib']:>9.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                        help='Timed requests per case.')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed relative growth of p95 latency and peak memory.')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write the results to the baseline instead of comparing.')
+    parser.add_argument('--child', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(run_scale(args.child, args.requests)))
+        return 0
+
+    scales = [int(s) if float(s).is_integer() else s for s in args.scales]
+    results = run(scales, args.requests)
+    _print_table(results)
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(results, stream, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as stream:
+            json.dump(results, stream, indent=2)
+            stream.write('\n')
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline) as stream:
+        regressions = compare(results, json.load(stream), args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
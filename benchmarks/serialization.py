@@ -0,0 +1,198 @@
+"""
+Throughput of the JSON list APIs: batch serializers against per-row ``to_dict``.
+
+A temporary SQLite database is seeded at ``--scale`` and every list API body
+is built twice: once the way its endpoint builds it (column tuples, one
+batch at a time, ``services.serializers``) and once the way the endpoints
+used to (ORM instances with the API loader options, ``to_dict`` and the
+Flask JSON provider, row by row). Both bodies are decoded and must be equal.
+Both are built in a request context for the endpoint's URL and start from an
+empty session, so they pay the same fixed costs; routing and the conditional
+GET check are left out of both. The two paths take turns, ``--repeat`` runs
+each with the garbage collector off as ``timeit`` does, and the fastest run
+of each counts.
+
+    python -m benchmarks.serialization                # scale 10, needs 5x
+    python -m benchmarks.serialization --scale 50 --min-speedup 8
+
+The exit status is 1 when two bodies differ, when an endpoint of at least
+``--min-rows`` rows is served less than ``--min-speedup`` times faster (or
+its lower ``ENDPOINT_MIN_SPEEDUP``), when a smaller one is slower than
+``to_dict``, or when all the rows together are served less than
+``--min-speedup`` times faster.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+DEFAULT_SCALE = 10
+DEFAULT_REPEAT = 3
+DEFAULT_MIN_SPEEDUP = 5.0
+# Endpoints with fewer rows are dominated by the fixed cost of a query; they
+# only have to be no slower than to_dict
+DEFAULT_MIN_ROWS = 1000
+# Customers have no related rows to load, so to_dict() is already cheap for
+# them and the batch path measures only 4.5-6x: a 5x gate fails at random.
+# The correlated policy count is kept; a grouped join measured slower on SQLite
+ENDPOINT_MIN_SPEEDUP = {'/customers/api/customers': 4.0}
+
+
+def _endpoints():
+    from models import loaders
+    from models.agency import Agency
+    from models.agent import Agent
+    from models.customer import Customer
+    from models.policy import Policy
+    from models.claim import Claim
+    return [
+        ('/agencies/api/agencies', Agency, loaders.agency_list),
+        ('/agents/api/agents', Agent, loaders.agent_list),
+        ('/customers/api/customers', Customer, loaders.customer_list),
+        ('/policies/api/policies', Policy, loaders.policy_api),
+        ('/claims/api/claims', Claim, loaders.claim_list),
+    ]
+
+
+def per_row_body(app, model, options):
+    """The list body as ``to_dict`` and the Flask JSON provider build it, row by row."""
+    pk = getattr(model, model.__mapper__.primary_key[0].key)
+    query = model.query.options(*options()).order_by(pk.asc())
+    rows = query.yield_per(app.config.get('API_STREAM_BATCH', 500))
+    dumps = app.json.dumps
+    return '[' + ','.join(dumps(obj.to_dict()) for obj in rows) + ']'
+
+
+def batch_body(model):
+    """The list body as the endpoint builds it, from column tuples a batch at a time."""
+    from services.api import api_list_response
+    return b''.join(api_list_response(model).response)
+
+
+def _best(functions, repeat):
+    # The functions take turns, so a change in machine load hits them alike.
+    # As timeit does, garbage is collected beforehand and the collector is
+    # kept out of the timed runs
+    best = [None] * len(functions)
+    results = [None] * len(functions)
+    enabled = gc.isenabled()
+    try:
+        for _ in range(repeat):
+            for i, function in enumerate(functions):
+                gc.collect()
+                gc.disable()
+                started = time.perf_counter()
+                results[i] = function()
+                elapsed = time.perf_counter() - started
+                gc.enable()
+                best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    finally:
+        if enabled:
+            gc.enable()
+        else:
+            gc.disable()
+    return best, results
+
+
+def measure(app, url, model, options, repeat=DEFAULT_REPEAT):
+    """Time one list API body both ways and check that they agree."""
+    from models.database import db
+
+    def fresh(build):
+        def run():
+            try:
+                return build()
+            finally:
+                db.session.remove()
+        return run
+
+    with app.test_request_context(url):
+        (batch_seconds, per_row_seconds), (body, expected) = _best([
+            fresh(lambda: batch_body(model)),
+            fresh(lambda: per_row_body(app, model, options)),
+        ], repeat)
+
+    rows = len(json.loads(body))
+    return {
+        'url': url,
+        'rows': rows,
+        'per_row_ms': round(per_row_seconds * 1000, 2),
+        'batch_ms': round(batch_seconds * 1000, 2),
+        'rows_per_second': round(rows / batch_seconds) if batch_seconds else None,
+        'speedup': round(per_row_seconds / batch_seconds, 1) if batch_seconds else None,
+        'same_output': json.loads(body) == json.loads(expected),
+    }
+
+
+def run(app, repeat=DEFAULT_REPEAT):
+    return [measure(app, url, model, options, repeat) for url, model, options in _endpoints()]
+
+
+def overall_speedup(results):
+    """Speedup of serving every endpoint's rows once, by total time."""
+    batch_ms = sum(result['batch_ms'] for result in results)
+    return round(sum(result['per_row_ms'] for result in results) / batch_ms, 1) if batch_ms else None
+
+
+def failures(results, min_speedup=DEFAULT_MIN_SPEEDUP, min_rows=DEFAULT_MIN_ROWS):
+    """Why the results fail the benchmark, one line per problem (empty when they pass)."""
+    lines = []
+    for result in results:
+        if not result['same_output']:
+            lines.append(f"{result['url']}: output differs from to_dict")
+        if result['rows'] >= min_rows:
+            required = min(min_speedup, ENDPOINT_MIN_SPEEDUP.get(result['url'], min_speedup))
+        else:
+            required = 1.0
+        if result['speedup'] is not None and result['speedup'] < required:
+            lines.append(f"{result['url']}: {result['speedup']}x, below {required:g}x "
+                         f"for {result['rows']} rows")
+    speedup = overall_speedup(results)
+    if speedup is not None and speedup < min_speedup:
+        lines.append(f"all endpoints: {speedup}x, below {min_speedup:g}x")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=float, default=DEFAULT_SCALE)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--min-speedup', type=float, default=DEFAULT_MIN_SPEEDUP)
+    parser.add_argument('--min-rows', type=int, default=DEFAULT_MIN_ROWS)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The app creates its engine from DATABASE_URL when it is imported
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'serialization.db')}"
+        from app import app
+        from models.database import db
+        from services import seed, serializers
+
+        with app.app_context():
+            db.create_all()
+            seed.seed(scale=args.scale)
+            db.session.remove()
+        results = run(app, args.repeat)
+        with app.app_context():
+            db.engine.dispose()
+
+    encoder = 'orjson' if serializers.orjson is not None else 'json'
+    print(f"Scale {args.scale:g}, encoder {encoder}, best of {args.repeat}")
+    print(f"  {'endpoint':<28} {'rows':>7} {'to_dict ms':>11} {'batch ms':>9} {'rows/s':>9} {'speedup':>8}")
+    for result in results:
+        print(f"  {result['url']:<28} {result['rows']:>7} {result['per_row_ms']:>11.1f} "
+              f"{result['batch_ms']:>9.1f} {result['rows_per_second']:>9,} {result['speedup']:>7.1f}x")
+    print(f"  {'all endpoints':<28} {sum(r['rows'] for r in results):>7} "
+          f"{sum(r['per_row_ms'] for r in results):>11.1f} {sum(r['batch_ms'] for r in results):>9.1f} "
+          f"{'':>9} {overall_speedup(results):>7.1f}x")
+    lines = failures(results, args.min_speedup, args.min_rows)
+    for line in lines:
+        print(f"  {line}")
+    return 1 if lines else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,20 @@
 import os
 from datetime import timedelta
 
+
+def _engine_options(database_uri):
+    """Connection pool settings for server databases (SQLite keeps SQLAlchemy's defaults)."""
+    if database_uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
 class Config:
     # Basic Flask config
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-for-insurance-app'
@@ -8,10 +22,89 @@ class Config:
     # Database config
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///insurance.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    
+    # PRAGMAs run on every new SQLite connection. WAL lets readers proceed while
+    # a writer commits; busy_timeout makes writers wait for the lock instead of
+    # failing with "database is locked". cache_size is in KiB when negative.
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        # Off by default in SQLite; the ON DELETE CASCADE keys depend on it
+        'foreign_keys': 'ON',
+    }
+    
+    # Production WSGI server (gunicorn.conf.py): pre-forked workers, each
+    # running WEB_THREADS request threads, with the app loaded once before forking
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
     
     # Session config
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
     
     # Application config
     APP_NAME = "InsureMate"
-    ITEMS_PER_PAGE = 10
\ No newline at end of file
+    ITEMS_PER_PAGE = 10
+    
+    # Seconds to cache the dashboard counters (0 disables caching)
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 30))
+    
+    # Page and value cache (services/cache.py): 'filesystem' (CACHE_DIR,
+    # default instance/cache, shared by a host's workers), 'memory' (LRU per
+    # process: only for a single worker, as a commit does not reach the
+    # others), 'network' (CACHE_URL: redis://... or local://) or 'none'.
+    # Entries are dropped when the rows they show are committed, and after
+    # CACHE_DEFAULT_TTL seconds at the latest (0 disables caching)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'filesystem')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 30))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    CACHE_DIR = os.environ.get('CACHE_DIR')
+    CACHE_URL = os.environ.get('CACHE_URL')
+    
+    # List pagination: 'offset' (numbered pages) or 'keyset' (cursor links).
+    # Keyset mode can also be requested per request with ?cursor=
+    PAGINATION_MODE = os.environ.get('PAGINATION_MODE', 'offset')
+    # Seconds to reuse the row total shown next to keyset pagers
+    PAGINATION_COUNT_TTL = int(os.environ.get('PAGINATION_COUNT_TTL', 60))
+    
+    # JSON list APIs: largest ?limit= accepted and rows fetched per batch when streaming
+    API_MAX_LIMIT = int(os.environ.get('API_MAX_LIMIT', 1000))
+    API_STREAM_BATCH = int(os.environ.get('API_STREAM_BATCH', 500))
+    
+    # Renewal worklist: days before today (still-Active lapsed policies) and
+    # after today (policies coming up for renewal) that it covers
+    RENEWAL_LOOKBACK_DAYS = int(os.environ.get('RENEWAL_LOOKBACK_DAYS', 30))
+    RENEWAL_HORIZON_DAYS = int(os.environ.get('RENEWAL_HORIZON_DAYS', 90))
+    
+    # Policy lifecycle job: rows updated or inserted per transaction, and how
+    # many days before its end date an Active policy gets a renewal
+    LIFECYCLE_CHUNK_SIZE = int(os.environ.get('LIFECYCLE_CHUNK_SIZE', 1000))
+    RENEWAL_LEAD_DAYS = int(os.environ.get('RENEWAL_LEAD_DAYS', 30))
+    
+    # Deleting an agency or customer with at least this many rows underneath
+    # (itself included) runs in the background, DELETE_CHUNK_SIZE rows per
+    # transaction; 0 always deletes in the request
+    DELETE_BACKGROUND_THRESHOLD = int(os.environ.get('DELETE_BACKGROUND_THRESHOLD', 5000))
+    DELETE_CHUNK_SIZE = int(os.environ.get('DELETE_CHUNK_SIZE', 1000))
+    
+    # Per-request latency, SQL and template timings, served at /metrics and in
+    # the Server-Timing response header
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Slow-query log: statements taking at least SLOW_QUERY_MS (0 disables) are
+    # written, with EXPLAIN output, to SLOW_QUERY_LOG (default
+    # instance/slow_queries.log); SLOW_QUERY_SAMPLE_RATE of them are kept.
+    # Bound parameters hold customer names, emails and phones, so only their
+    # types and lengths are written unless SLOW_QUERY_LOG_PARAMETERS is on
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+    SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', 1.0))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')
+    SLOW_QUERY_LOG_PARAMETERS = os.environ.get('SLOW_QUERY_LOG_PARAMETERS', 'false').lower() in ('1', 'true', 'yes')
+    
+    # CSV import: rows validated, inserted and committed per transaction
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))
\ No newline at end of file
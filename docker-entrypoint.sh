@@ -22,5 +22,5 @@ else
     flask create-db
 fi
 
-echo "Starting InsureMate on ${FLASK_RUN_HOST:-0.0.0.0}:${FLASK_RUN_PORT:-5000}"
+echo "Starting InsureMate: $*"
 exec "$@"
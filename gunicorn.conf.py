@@ -0,0 +1,48 @@
+"""
+Gunicorn settings for serving InsureMate in production.
+
+Values come from ``Config`` (and therefore from the environment), so the
+same variables configure Docker, docker-compose and bare-metal deployments.
+"""
+from config import Config
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread'
+timeout = Config.WEB_TIMEOUT
+
+# Import the app (templates, mappers, schema check) once in the master
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the workers
+    from app import app
+    from models.database import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def when_ready(server):
+    # No worker has started yet, so a background delete still 'Running' was
+    # cut off when the previous server stopped
+    from app import app
+    from services import deletion
+
+    with app.app_context():
+        deletion.fail_interrupted()
+
+
+def worker_exit(server, worker):
+    # The worker's daemon threads die with it; let its background deletes
+    # finish within half the graceful timeout and record the rest as failed
+    from app import app
+    from services import deletion
+
+    with app.app_context():
+        deletion.shutdown(server.cfg.graceful_timeout / 2)
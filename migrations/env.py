@@ -93,6 +93,15 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # SQLite tables are altered by copying them; with foreign keys
+        # enforced, dropping the old copy would cascade into child rows.
+        # The PRAGMA only takes effect outside a transaction.
+        sqlite = connection.dialect.name == 'sqlite'
+        if sqlite:
+            enforced = connection.exec_driver_sql('PRAGMA foreign_keys').scalar()
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -100,8 +109,13 @@ def run_migrations_online():
             **current_app.extensions['migrate'].configure_args
         )
 
-        with context.begin_transaction():
-            context.run_migrations()
+        try:
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if sqlite:
+                connection.exec_driver_sql(f'PRAGMA foreign_keys={enforced}')
+                connection.commit()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,26 @@
+"""add policy lookup index
+
+Revision ID: 3b9f6d2c8e14
+Revises: a5d81f0c6e27
+Create Date: 2026-10-18 11:41:52.306118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9f6d2c8e14'
+down_revision = 'a5d81f0c6e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # serves the policy typeahead: active policies in policy-number order
+    op.create_index('ix_policy_policy_status_policy_number', 'policy',
+                    ['policy_status', 'policy_number'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_policy_policy_status_policy_number', table_name='policy', if_exists=True)
@@ -0,0 +1,55 @@
+"""add policy lifecycle job runs and renewal link
+
+Revision ID: 5f8a2d4c7b31
+Revises: e41c7b5a9d02
+Create Date: 2026-10-18 14:22:09.631874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f8a2d4c7b31'
+down_revision = 'e41c7b5a9d02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_run',
+        sa.Column('job_run_id', sa.Integer(), nullable=False),
+        sa.Column('job', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('expired_count', sa.Integer(), nullable=False),
+        sa.Column('activated_count', sa.Integer(), nullable=False),
+        sa.Column('renewed_count', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('job_run_id')
+    )
+    op.create_index('ix_job_run_job_started_at', 'job_run', ['job', 'started_at'], unique=False)
+
+    # On SQLite a plain ADD COLUMN with an inline REFERENCES: rebuilding the
+    # table in batch mode would drop its full-text search triggers
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ALTER TABLE policy ADD COLUMN renewed_from_id INTEGER REFERENCES policy (policy_id)')
+    else:
+        op.add_column('policy', sa.Column('renewed_from_id', sa.Integer(), nullable=True))
+        op.create_foreign_key('fk_policy_renewed_from_id', 'policy', 'policy',
+                              ['renewed_from_id'], ['policy_id'])
+    op.create_index('ix_policy_renewed_from_id', 'policy', ['renewed_from_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_policy_renewed_from_id', table_name='policy')
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite 3.35+ drops a column in place, keeping the table's triggers
+        op.execute('ALTER TABLE policy DROP COLUMN renewed_from_id')
+    else:
+        op.drop_constraint('fk_policy_renewed_from_id', 'policy', type_='foreignkey')
+        op.drop_column('policy', 'renewed_from_id')
+
+    op.drop_index('ix_job_run_job_started_at', table_name='job_run')
+    op.drop_table('job_run')
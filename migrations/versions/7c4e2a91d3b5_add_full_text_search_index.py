@@ -0,0 +1,85 @@
+"""add full-text search index
+
+Revision ID: 7c4e2a91d3b5
+Revises: eeec2c3a2da2
+Create Date: 2026-10-18 09:12:44.301552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e2a91d3b5'
+down_revision = 'eeec2c3a2da2'
+branch_labels = None
+depends_on = None
+
+
+# table, source, key, {fts column: expression over the source row ({p} = row prefix)}, watched columns
+SEARCH_INDEXES = [
+    ('customer_search', 'customer', 'customer_id', {
+        'name': "coalesce({p}first_name, '') || ' ' || coalesce({p}last_name, '')",
+        'email': "coalesce({p}email, '')",
+        'phone': "coalesce({p}phone, '')",
+    }, ['first_name', 'last_name', 'email', 'phone']),
+    ('agent_search', 'agent', 'agent_id', {
+        'name': "coalesce({p}first_name, '') || ' ' || coalesce({p}last_name, '')",
+        'email': "coalesce({p}email, '')",
+        'phone': "coalesce({p}phone, '')",
+    }, ['first_name', 'last_name', 'email', 'phone']),
+    ('policy_search', 'policy', 'policy_id', {
+        'policy_number': "{p}policy_number",
+        'policy_type': "{p}policy_type",
+    }, ['policy_number', 'policy_type']),
+    ('claim_search', 'claim', 'claim_id', {
+        'claim_number': "{p}claim_number",
+    }, ['claim_number']),
+]
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases keep using ILIKE search
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+
+    for table, source, key, columns, watch in SEARCH_INDEXES:
+        # The application installs the same index on startup; leave it alone
+        exists = bind.execute(
+            sa.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': table}
+        ).first()
+        if exists:
+            continue
+
+        names = ', '.join(columns)
+        new_values = ', '.join(expr.format(p='new.') for expr in columns.values())
+        values = ', '.join(expr.format(p='') for expr in columns.values())
+
+        op.execute(f"CREATE VIRTUAL TABLE {table} USING fts5({names}, tokenize='unicode61', prefix='2 3')")
+        op.execute(
+            f"CREATE TRIGGER {source}_search_insert AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {table}(rowid, {names}) VALUES (new.{key}, {new_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {source}_search_update AFTER UPDATE OF {', '.join(watch)} ON {source} BEGIN "
+            f"DELETE FROM {table} WHERE rowid = old.{key}; "
+            f"INSERT INTO {table}(rowid, {names}) VALUES (new.{key}, {new_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {source}_search_delete AFTER DELETE ON {source} BEGIN "
+            f"DELETE FROM {table} WHERE rowid = old.{key}; END"
+        )
+        op.execute(f"INSERT INTO {table}(rowid, {names}) SELECT {key}, {values} FROM {source}")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table, source, key, columns, watch in SEARCH_INDEXES:
+        op.execute(f"DROP TRIGGER IF EXISTS {source}_search_insert")
+        op.execute(f"DROP TRIGGER IF EXISTS {source}_search_update")
+        op.execute(f"DROP TRIGGER IF EXISTS {source}_search_delete")
+        op.execute(f"DROP TABLE IF EXISTS {table}")
@@ -0,0 +1,110 @@
+"""cascade deletes in the database and background delete progress
+
+Revision ID: 9d3e6f1a2b48
+Revises: 5f8a2d4c7b31
+Create Date: 2026-10-18 15:47:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3e6f1a2b48'
+down_revision = '5f8a2d4c7b31'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referred table, referred column, ON DELETE action)
+FOREIGN_KEYS = [
+    ('agent', 'agency_id', 'agency', 'agency_id', 'CASCADE'),
+    ('policy', 'agent_id', 'agent', 'agent_id', 'CASCADE'),
+    ('policy', 'customer_id', 'customer', 'customer_id', 'CASCADE'),
+    ('policy', 'renewed_from_id', 'policy', 'policy_id', 'SET NULL'),
+    ('claim', 'policy_id', 'policy', 'policy_id', 'CASCADE'),
+]
+
+# Names the batch copy gives the unnamed constraints SQLite reflects; without
+# a 'uq' name the copy would silently drop the UNIQUE policy/claim numbers
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+    'uq': 'uq_%(table_name)s_%(column_0_name)s',
+}
+
+
+# Columns whose UNIQUE constraint has to survive the table copy
+UNIQUE_COLUMNS = {
+    'policy': 'policy_number',
+    'claim': 'claim_number',
+}
+
+
+def _fk_name(bind, table, column, referred):
+    for fk in sa.inspect(bind).get_foreign_keys(table):
+        if fk['constrained_columns'] == [column] and fk['name']:
+            return fk['name']
+    return f'fk_{table}_{column}_{referred}'
+
+
+def _unique_reflected(bind, table, column):
+    inspector = sa.inspect(bind)
+    constraints = inspector.get_unique_constraints(table)
+    indexes = [index for index in inspector.get_indexes(table) if index['unique']]
+    return any(item['column_names'] == [column] for item in constraints + indexes)
+
+
+def _replace_foreign_keys(ondelete):
+    bind = op.get_bind()
+    sqlite = bind.dialect.name == 'sqlite'
+    for table in ('claim', 'policy', 'agent'):
+        keys = [fk for fk in FOREIGN_KEYS if fk[0] == table]
+        names = [_fk_name(bind, table, column, referred) for _, column, referred, _, _ in keys]
+
+        # Rebuilding a SQLite table drops its triggers (the full-text search
+        # ones) and any inline "unique" column constraint it cannot reflect;
+        # put both back
+        triggers = []
+        missing_unique = None
+        if sqlite:
+            triggers = [row[0] for row in bind.execute(
+                sa.text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :table"),
+                {'table': table}
+            )]
+            column = UNIQUE_COLUMNS.get(table)
+            if column and not _unique_reflected(bind, table, column):
+                missing_unique = column
+
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for name, (_, column, referred, referred_column, action) in zip(names, keys):
+                batch_op.drop_constraint(name, type_='foreignkey')
+                if sqlite and not ondelete and column == 'renewed_from_id':
+                    # The previous revision added this key inline with ADD
+                    # COLUMN, which a table copy cannot reproduce, and SQLite
+                    # cannot DROP COLUMN a column in a table-level key
+                    continue
+                batch_op.create_foreign_key(name, referred, [column], [referred_column],
+                                            ondelete=action if ondelete else None)
+            if missing_unique:
+                batch_op.create_unique_constraint(f'uq_{table}_{missing_unique}', [missing_unique])
+
+        for sql in triggers:
+            op.execute(sql)
+
+
+def upgrade():
+    # Run with foreign key enforcement off (migrations/env.py): dropping the
+    # old SQLite tables would otherwise cascade into their children
+    _replace_foreign_keys(ondelete=True)
+
+    op.add_column('job_run', sa.Column('target', sa.String(length=100), nullable=True))
+    op.add_column('job_run', sa.Column('deleted_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('job_run', sa.Column('total_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('job_run') as batch_op:
+        for column in ('total_count', 'deleted_count', 'target'):
+            batch_op.drop_column(column)
+
+    _replace_foreign_keys(ondelete=False)
@@ -0,0 +1,42 @@
+"""add list view indexes
+
+Revision ID: a5d81f0c6e27
+Revises: 7c4e2a91d3b5
+Create Date: 2026-10-18 10:03:17.582904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d81f0c6e27'
+down_revision = '7c4e2a91d3b5'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) matched to the filters and sort orders of the list views
+INDEXES = [
+    ('ix_agent_agency_id', 'agent', ['agency_id']),
+    ('ix_agent_last_name_first_name', 'agent', ['last_name', 'first_name']),
+    ('ix_customer_last_name_first_name', 'customer', ['last_name', 'first_name']),
+    ('ix_policy_agent_id', 'policy', ['agent_id']),
+    ('ix_policy_customer_id', 'policy', ['customer_id']),
+    ('ix_policy_start_date', 'policy', ['start_date']),
+    ('ix_policy_end_date', 'policy', ['end_date']),
+    ('ix_policy_policy_status_start_date', 'policy', ['policy_status', 'start_date']),
+    ('ix_claim_policy_id', 'claim', ['policy_id']),
+    ('ix_claim_claim_date', 'claim', ['claim_date']),
+    ('ix_claim_status_claim_date', 'claim', ['status', 'claim_date']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,40 @@
+"""row versions and last write times for conditional GET
+
+Revision ID: b7e2c94d1f60
+Revises: 9d3e6f1a2b48
+Create Date: 2026-10-18 18:12:09.583104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c94d1f60'
+down_revision = '9d3e6f1a2b48'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('agency', 'agent', 'customer', 'policy', 'claim')
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        if table != 'claim':
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # Existing rows count as written now, so no validator predates them
+        op.execute(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL')
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        # Plain ALTER TABLE ... DROP COLUMN (SQLite 3.35+): a batch table copy
+        # would drop the full-text search triggers
+        with op.batch_alter_table(table, recreate='never') as batch_op:
+            batch_op.drop_column('version')
+            if table != 'claim':
+                batch_op.drop_column('updated_at')
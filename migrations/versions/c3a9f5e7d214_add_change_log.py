@@ -0,0 +1,31 @@
+"""append-only change log for the incremental change feed
+
+Revision ID: c3a9f5e7d214
+Revises: b7e2c94d1f60
+Create Date: 2026-10-18 19:05:44.917302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a9f5e7d214'
+down_revision = 'b7e2c94d1f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+        sa.Column('change_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.String(length=10), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('change_id')
+    )
+
+
+def downgrade():
+    op.drop_table('change_log')
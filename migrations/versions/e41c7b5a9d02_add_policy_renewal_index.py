@@ -0,0 +1,26 @@
+"""add policy renewal index
+
+Revision ID: e41c7b5a9d02
+Revises: 3b9f6d2c8e14
+Create Date: 2026-10-18 13:05:27.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41c7b5a9d02'
+down_revision = '3b9f6d2c8e14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # serves the renewal worklist: active policies by end-date range
+    op.create_index('ix_policy_policy_status_end_date', 'policy',
+                    ['policy_status', 'end_date'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_policy_policy_status_end_date', table_name='policy', if_exists=True)
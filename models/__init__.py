@@ -3,4 +3,6 @@ from models.agent import Agent
 from models.customer import Customer
 from models.policy import Policy
 from models.claim import Claim
+from models.job_run import JobRun
+from models.change_log import ChangeLog
 from models.database import db
@@ -1,7 +1,14 @@
 from models.database import db
+from models.agent import Agent
+from sqlalchemy import select, func
+from sqlalchemy.orm import column_property
+from datetime import datetime
 
 class Agency(db.Model):
     __tablename__ = 'agency'
+    __table_args__ = (
+        db.Index('ix_agency_updated_at', 'updated_at'),
+    )
     
     agency_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -11,9 +18,23 @@ class Agency(db.Model):
     zip_code = db.Column(db.String(20))
     phone = db.Column(db.String(20))
     website = db.Column(db.String(200))
+    # Row version, bumped by the ORM on every UPDATE, and time of the last write
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __mapper_args__ = {'version_id_col': version}
     
-    # Relationships
-    agents = db.relationship('Agent', backref='agency', lazy=True, cascade='all, delete-orphan')
+    # Relationships (children are deleted by ON DELETE CASCADE, not loaded)
+    agents = db.relationship('Agent', backref='agency', lazy=True, cascade='all, delete-orphan',
+                             passive_deletes=True)
+    
+    # Aggregates (deferred; undefer them in list queries to count in SQL)
+    agent_count = column_property(
+        select(func.count(Agent.agent_id))
+        .where(Agent.agency_id == agency_id)
+        .correlate_except(Agent)
+        .scalar_subquery(),
+        deferred=True
+    )
     
     def __repr__(self):
         return f'<Agency {self.name}>'
@@ -27,5 +48,5 @@ class Agency(db.Model):
             'state': self.state,
             'zip_code': self.zip_code,
             'phone': self.phone,
-            'agent_count': len(self.agents) if self.agents else 0
+            'agent_count': self.agent_count or 0
         }
\ No newline at end of file
@@ -1,18 +1,40 @@
 from models.database import db
-from sqlalchemy.orm import relationship
+from models.policy import Policy
+from sqlalchemy import select, func
+from sqlalchemy.orm import relationship, column_property
+from datetime import datetime
 
 class Agent(db.Model):
     __tablename__ = 'agent'
+    __table_args__ = (
+        db.Index('ix_agent_updated_at', 'updated_at'),
+        db.Index('ix_agent_agency_id', 'agency_id'),
+        db.Index('ix_agent_last_name_first_name', 'last_name', 'first_name'),
+    )
     
     agent_id = db.Column(db.Integer, primary_key=True)
-    agency_id = db.Column(db.Integer, db.ForeignKey('agency.agency_id'), nullable=False)
+    agency_id = db.Column(db.Integer, db.ForeignKey('agency.agency_id', ondelete='CASCADE'), nullable=False)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(150))
     phone = db.Column(db.String(20))
+    # Row version, bumped by the ORM on every UPDATE, and time of the last write
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __mapper_args__ = {'version_id_col': version}
     
-    # Relationships
-    policies = db.relationship('Policy', backref='agent', lazy=True, cascade='all, delete-orphan')
+    # Relationships (children are deleted by ON DELETE CASCADE, not loaded)
+    policies = db.relationship('Policy', backref='agent', lazy=True, cascade='all, delete-orphan',
+                             passive_deletes=True)
+    
+    # Aggregates (deferred; undefer them in list queries to count in SQL)
+    policy_count = column_property(
+        select(func.count(Policy.policy_id))
+        .where(Policy.agent_id == agent_id)
+        .correlate_except(Policy)
+        .scalar_subquery(),
+        deferred=True
+    )
     
     def __repr__(self):
         return f'<Agent {self.first_name} {self.last_name}>'
@@ -30,5 +52,5 @@ class Agent(db.Model):
             'phone': self.phone,
             'full_name': self.full_name(),
             'agency_name': self.agency.name if self.agency else None,
-            'policy_count': len(self.policies) if self.policies else 0
+            'policy_count': self.policy_count or 0
         }
\ No newline at end of file
@@ -0,0 +1,17 @@
+from models.database import db
+from datetime import datetime
+
+class ChangeLog(db.Model):
+    """One insert, update or delete of an entity row, in commit order."""
+    __tablename__ = 'change_log'
+
+    OPERATIONS = ('insert', 'update', 'delete')
+
+    change_id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ChangeLog {self.change_id} {self.operation} {self.entity} {self.entity_id}>'
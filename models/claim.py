@@ -1,11 +1,23 @@
 from models.database import db
+from sqlalchemy.ext.hybrid import hybrid_method
 from datetime import datetime
 
 class Claim(db.Model):
     __tablename__ = 'claim'
     
+    # Status registry: the values the forms offer and the filters list
+    OPEN_STATUSES = ('Open', 'In Progress', 'Under Review')
+    CLOSED_STATUSES = ('Settled', 'Denied', 'Withdrawn', 'Closed')
+    STATUSES = OPEN_STATUSES + CLOSED_STATUSES
+    __table_args__ = (
+        db.Index('ix_claim_updated_at', 'updated_at'),
+        db.Index('ix_claim_policy_id', 'policy_id'),
+        db.Index('ix_claim_claim_date', 'claim_date'),
+        db.Index('ix_claim_status_claim_date', 'status', 'claim_date'),
+    )
+    
     claim_id = db.Column(db.Integer, primary_key=True)
-    policy_id = db.Column(db.Integer, db.ForeignKey('policy.policy_id'), nullable=False)
+    policy_id = db.Column(db.Integer, db.ForeignKey('policy.policy_id', ondelete='CASCADE'), nullable=False)
     claim_number = db.Column(db.String(50), nullable=False, unique=True)
     claim_date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     incident_date = db.Column(db.Date, nullable=False)
@@ -16,17 +28,32 @@ class Claim(db.Model):
     settlement_amount = db.Column(db.DECIMAL(12, 2))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Row version, bumped by the ORM on every UPDATE
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
     
     def __repr__(self):
         return f'<Claim {self.claim_number}>'
     
+    # Hybrids: on a claim they test the loaded status, on the class
+    # (Claim.is_open()) they are SQL expressions for filters and counts
+    @hybrid_method
     def is_open(self):
         """Check if the claim is currently open"""
-        return self.status in ['Open', 'In Progress', 'Under Review']
+        return self.status in self.OPEN_STATUSES
+    
+    @is_open.expression
+    def is_open(cls):
+        return cls.status.in_(cls.OPEN_STATUSES)
     
+    @hybrid_method
     def is_closed(self):
         """Check if the claim is closed"""
-        return self.status in ['Settled', 'Denied', 'Closed', 'Withdrawn']
+        return self.status in self.CLOSED_STATUSES
+    
+    @is_closed.expression
+    def is_closed(cls):
+        return cls.status.in_(cls.CLOSED_STATUSES)
     
     def days_since_filed(self):
         """Calculate days since claim was filed"""
@@ -1,9 +1,15 @@
 from models.database import db
-from sqlalchemy.orm import relationship
+from models.policy import Policy
+from sqlalchemy import select, func
+from sqlalchemy.orm import relationship, column_property
 from datetime import datetime
 
 class Customer(db.Model):
     __tablename__ = 'customer'
+    __table_args__ = (
+        db.Index('ix_customer_updated_at', 'updated_at'),
+        db.Index('ix_customer_last_name_first_name', 'last_name', 'first_name'),
+    )
     
     customer_id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
@@ -15,9 +21,23 @@ class Customer(db.Model):
     city = db.Column(db.String(100))
     state = db.Column(db.String(100))
     zip_code = db.Column(db.String(20))
+    # Row version, bumped by the ORM on every UPDATE, and time of the last write
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __mapper_args__ = {'version_id_col': version}
     
-    # Relationships
-    policies = db.relationship('Policy', backref='customer', lazy=True, cascade='all, delete-orphan')
+    # Relationships (children are deleted by ON DELETE CASCADE, not loaded)
+    policies = db.relationship('Policy', backref='customer', lazy=True, cascade='all, delete-orphan',
+                             passive_deletes=True)
+    
+    # Aggregates (deferred; undefer them in list queries to count in SQL)
+    policy_count = column_property(
+        select(func.count(Policy.policy_id))
+        .where(Policy.customer_id == customer_id)
+        .correlate_except(Policy)
+        .scalar_subquery(),
+        deferred=True
+    )
     
     def __repr__(self):
         return f'<Customer {self.first_name} {self.last_name}>'
@@ -52,5 +72,5 @@ class Customer(db.Model):
             'full_name': self.full_name(),
             'full_address': self.full_address(),
             'age': self.age(),
-            'policy_count': len(self.policies) if self.policies else 0
+            'policy_count': self.policy_count or 0
         }
\ No newline at end of file
@@ -1,6 +1,50 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event, Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 
 # Initialize database and migration objects
 db = SQLAlchemy()
 migrate = Migrate()
+
+
+def configure_sqlite(engine, pragmas):
+    """Run ``PRAGMA name = value`` for each pragma on every new SQLite connection."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+
+class days_between(FunctionElement):
+    """Whole days from ``start`` to ``end`` (``end - start``) for two date expressions."""
+    type = Integer()
+    inherit_cache = True
+    name = 'days_between'
+
+
+@compiles(days_between)
+def _days_between(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return f'({compiler.process(end, **kw)} - {compiler.process(start, **kw)})'
+
+
+@compiles(days_between, 'sqlite')
+def _days_between_sqlite(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return (f'CAST(julianday({compiler.process(end, **kw)}) - '
+            f'julianday({compiler.process(start, **kw)}) AS INTEGER)')
+
+
+@compiles(days_between, 'mysql')
+def _days_between_mysql(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return f'DATEDIFF({compiler.process(end, **kw)}, {compiler.process(start, **kw)})'
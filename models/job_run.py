@@ -0,0 +1,59 @@
+from models.database import db
+from datetime import datetime
+
+class JobRun(db.Model):
+    """One run of a scheduled maintenance job and the rows it changed."""
+    __tablename__ = 'job_run'
+    __table_args__ = (
+        db.Index('ix_job_run_job_started_at', 'job', 'started_at'),
+    )
+
+    job_run_id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='Running')
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    expired_count = db.Column(db.Integer, nullable=False, default=0)
+    activated_count = db.Column(db.Integer, nullable=False, default=0)
+    renewed_count = db.Column(db.Integer, nullable=False, default=0)
+    # Background deletes: the row being deleted and how far along it is
+    target = db.Column(db.String(100))
+    deleted_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<JobRun {self.job} {self.started_at}>'
+
+    def duration_seconds(self):
+        """Seconds the run took, or None while it is still running"""
+        if not self.finished_at:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+    def progress(self):
+        """Percentage of ``total_count`` deleted so far"""
+        if not self.total_count:
+            return 100.0 if self.finished_at else 0.0
+        return round(100.0 * self.deleted_count / self.total_count, 1)
+
+    def rows_changed(self):
+        return self.expired_count + self.activated_count + self.renewed_count + self.deleted_count
+
+    def to_dict(self):
+        return {
+            'job_run_id': self.job_run_id,
+            'job': self.job,
+            'status': self.status,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+            'duration_seconds': self.duration_seconds(),
+            'expired_count': self.expired_count,
+            'activated_count': self.activated_count,
+            'renewed_count': self.renewed_count,
+            'target': self.target,
+            'deleted_count': self.deleted_count,
+            'total_count': self.total_count,
+            'progress': self.progress(),
+            'error': self.error
+        }
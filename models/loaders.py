@@ -0,0 +1,99 @@
+"""
+Eager-loading presets for the list, detail and API views.
+
+Each function returns the loader options one view needs so that rendering
+its template (or serializing its rows) does not fire a lazy SELECT per row.
+Routes apply them with ``Model.query.options(*loaders.<preset>())``. The
+list pages themselves read column rows instead (``models.read_models``).
+
+The presets are functions rather than module constants because the
+``backref`` attributes (``Agent.agency``, ``Policy.customer``, ...) only
+exist once the mappers have been configured.
+"""
+from sqlalchemy.orm import joinedload, selectinload, undefer
+
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+
+
+# Agencies
+
+def agency_list():
+    return (undefer(Agency.agent_count),)
+
+
+def agency_detail():
+    return (selectinload(Agency.agents).undefer(Agent.policy_count),)
+
+
+# Agents
+
+def agent_list():
+    return (
+        joinedload(Agent.agency),
+        undefer(Agent.policy_count),
+    )
+
+
+def agent_detail():
+    # The page counts the agent's policies in SQL and reads the ones it
+    # lists as rows (agent_routes.view), so the collection is never loaded
+    return (joinedload(Agent.agency),)
+
+
+def agent_options():
+    """Agents rendered as ``<option>`` tags with their agency name."""
+    return (joinedload(Agent.agency),)
+
+
+# Customers
+
+def customer_list():
+    return (undefer(Customer.policy_count),)
+
+
+def customer_detail():
+    return (selectinload(Customer.policies),)
+
+
+# Policies
+
+def policy_list():
+    return (
+        joinedload(Policy.customer),
+        joinedload(Policy.agent),
+    )
+
+
+def policy_detail():
+    return (
+        joinedload(Policy.customer),
+        joinedload(Policy.agent).joinedload(Agent.agency),
+        selectinload(Policy.claims),
+    )
+
+
+def policy_api():
+    return (
+        joinedload(Policy.customer),
+        joinedload(Policy.agent),
+        undefer(Policy.claim_count),
+    )
+
+
+def policy_options():
+    """Policies rendered as ``<option>`` tags with their customer name."""
+    return (joinedload(Policy.customer),)
+
+
+# Claims
+
+def claim_list():
+    return (joinedload(Claim.policy).joinedload(Policy.customer),)
+
+
+def claim_detail():
+    return (joinedload(Claim.policy).joinedload(Policy.customer),)
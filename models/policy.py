@@ -1,12 +1,33 @@
-from models.database import db
+from models.database import db, days_between
+from models.claim import Claim
+from sqlalchemy import select, func, and_, or_, case, literal
+from sqlalchemy.ext.hybrid import hybrid_method
+from sqlalchemy.orm import column_property
 from datetime import datetime, timedelta
 
 class Policy(db.Model):
     __tablename__ = 'policy'
     
+    # Status registry: the values the forms offer and the filters list
+    STATUSES = ('Active', 'Pending', 'Cancelled', 'Expired')
+    # Days before the end date at which renewal_status() turns Critical / Warning
+    RENEWAL_CRITICAL_DAYS = 7
+    RENEWAL_WARNING_DAYS = 30
+    __table_args__ = (
+        db.Index('ix_policy_updated_at', 'updated_at'),
+        db.Index('ix_policy_agent_id', 'agent_id'),
+        db.Index('ix_policy_customer_id', 'customer_id'),
+        db.Index('ix_policy_start_date', 'start_date'),
+        db.Index('ix_policy_end_date', 'end_date'),
+        db.Index('ix_policy_policy_status_start_date', 'policy_status', 'start_date'),
+        db.Index('ix_policy_policy_status_policy_number', 'policy_status', 'policy_number'),
+        db.Index('ix_policy_policy_status_end_date', 'policy_status', 'end_date'),
+        db.Index('ix_policy_renewed_from_id', 'renewed_from_id'),
+    )
+    
     policy_id = db.Column(db.Integer, primary_key=True)
-    agent_id = db.Column(db.Integer, db.ForeignKey('agent.agent_id'), nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.customer_id'), nullable=False)
+    agent_id = db.Column(db.Integer, db.ForeignKey('agent.agent_id', ondelete='CASCADE'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.customer_id', ondelete='CASCADE'), nullable=False)
     policy_number = db.Column(db.String(50), nullable=False, unique=True)
     policy_type = db.Column(db.String(100), nullable=False)
     coverage_amount = db.Column(db.DECIMAL(12, 2), default=0.00)
@@ -14,46 +35,96 @@ class Policy(db.Model):
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date)
     policy_status = db.Column(db.String(50), default='Active')
+    # The policy this one renews, when the lifecycle job created it
+    renewed_from_id = db.Column(db.Integer, db.ForeignKey('policy.policy_id', ondelete='SET NULL'))
+    # Row version, bumped by the ORM on every UPDATE, and time of the last write
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __mapper_args__ = {'version_id_col': version}
+    
+    # Relationships (children are deleted by ON DELETE CASCADE, not loaded)
+    claims = db.relationship('Claim', backref='policy', lazy=True, cascade='all, delete-orphan',
+                             passive_deletes=True)
     
-    # Relationships
-    claims = db.relationship('Claim', backref='policy', lazy=True, cascade='all, delete-orphan')
+    # Aggregates (deferred; undefer them in list queries to count in SQL)
+    claim_count = column_property(
+        select(func.count(Claim.claim_id))
+        .where(Claim.policy_id == policy_id)
+        .correlate_except(Claim)
+        .scalar_subquery(),
+        deferred=True
+    )
     
     def __repr__(self):
         return f'<Policy {self.policy_number}>'
     
-    def is_active(self):
+    # Each check below is a hybrid: called on a policy it works on the loaded
+    # values, called on the class (Policy.is_active()) it is a SQL expression
+    # for filter(), order_by() and count queries. ``today`` defaults to the
+    # current date in both forms.
+    @hybrid_method
+    def is_active(self, today=None):
         """Check if the policy is currently active"""
-        today = datetime.today().date()
+        today = today or datetime.today().date()
         return (
             self.policy_status == 'Active' and
             self.start_date <= today and
             (self.end_date is None or self.end_date >= today)
         )
     
-    def days_until_renewal(self):
+    @is_active.expression
+    def is_active(cls, today=None):
+        today = today or datetime.today().date()
+        return and_(
+            cls.policy_status == 'Active',
+            cls.start_date <= today,
+            or_(cls.end_date.is_(None), cls.end_date >= today)
+        )
+    
+    @hybrid_method
+    def days_until_renewal(self, today=None):
         """Calculate days until renewal"""
         if not self.end_date:
             return None
-        today = datetime.today().date()
+        today = today or datetime.today().date()
         delta = self.end_date - today
         return delta.days
     
-    def renewal_status(self):
+    @days_until_renewal.expression
+    def days_until_renewal(cls, today=None):
+        today = today or datetime.today().date()
+        return days_between(cls.end_date, literal(today, db.Date))
+    
+    @hybrid_method
+    def renewal_status(self, today=None):
         """Return a status indicating renewal urgency"""
         if not self.end_date:
             return None
             
-        days = self.days_until_renewal()
+        days = self.days_until_renewal(today)
         
         if days < 0:
             return "Expired"
-        elif days <= 7:
+        elif days <= self.RENEWAL_CRITICAL_DAYS:
             return "Critical"
-        elif days <= 30:
+        elif days <= self.RENEWAL_WARNING_DAYS:
             return "Warning"
         else:
             return "OK"
     
+    @renewal_status.expression
+    def renewal_status(cls, today=None):
+        # Compares end_date with fixed dates rather than a computed day count,
+        # so a filter on one status can use the end_date indexes
+        today = today or datetime.today().date()
+        return case(
+            (cls.end_date.is_(None), None),
+            (cls.end_date < today, 'Expired'),
+            (cls.end_date <= today + timedelta(days=cls.RENEWAL_CRITICAL_DAYS), 'Critical'),
+            (cls.end_date <= today + timedelta(days=cls.RENEWAL_WARNING_DAYS), 'Warning'),
+            else_='OK'
+        )
+    
     def to_dict(self):
         return {
             'policy_id': self.policy_id,
@@ -66,10 +137,11 @@ class Policy(db.Model):
             'start_date': self.start_date.strftime('%Y-%m-%d') if self.start_date else None,
             'end_date': self.end_date.strftime('%Y-%m-%d') if self.end_date else None,
             'policy_status': self.policy_status,
+            'renewed_from_id': self.renewed_from_id,
             'is_active': self.is_active(),
             'days_until_renewal': self.days_until_renewal(),
             'renewal_status': self.renewal_status(),
             'agent_name': self.agent.full_name() if self.agent else None,
             'customer_name': self.customer.full_name() if self.customer else None,
-            'claim_count': len(self.claims) if hasattr(self, 'claims') else 0
+            'claim_count': self.claim_count or 0
         }
\ No newline at end of file
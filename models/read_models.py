@@ -0,0 +1,119 @@
+"""
+Read models for the list views.
+
+A list page prints a handful of columns of ten rows. Loading them as ORM
+entities builds an instance, its state and an identity map entry per row and
+reads every column, including large ones such as ``Claim.description``. A
+read model instead selects only the columns its template shows, with the
+related names joined into the same SELECT, and wraps each row in a small
+``__slots__`` object that carries the helper methods the template calls.
+
+Routes filter ``Model.query`` as before, narrow it with
+``read_models.<Row>.project(query)``, page it, and hand the template
+``<Row>.from_rows(pagination.items)``. The joins use aliases so they stay
+apart from the ones the search fallback adds.
+"""
+from sqlalchemy.orm import aliased
+
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+
+
+def _full_name(person, label):
+    return (person.first_name + ' ' + person.last_name).label(label)
+
+
+class ReadModel:
+    """One row of a list view; ``__slots__`` names the selected columns."""
+
+    __slots__ = ()
+
+    def __init__(self, row):
+        for name in self.__slots__:
+            setattr(self, name, getattr(row, name))
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls(row) for row in rows]
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {getattr(self, self.__slots__[0])}>'
+
+
+class AgencyRow(ReadModel):
+    __slots__ = ('agency_id', 'name', 'address', 'city', 'state', 'zip_code', 'phone', 'website',
+                 'agent_count')
+
+    @classmethod
+    def project(cls, query):
+        """``query`` over ``Agency`` narrowed to the agency list's columns."""
+        return query.with_entities(*[getattr(Agency, name) for name in cls.__slots__])
+
+
+class AgentRow(ReadModel):
+    __slots__ = ('agent_id', 'agency_id', 'first_name', 'last_name', 'email', 'phone',
+                 'agency_name', 'policy_count')
+
+    full_name = Agent.full_name
+
+    @classmethod
+    def project(cls, query):
+        """``query`` over ``Agent`` narrowed to the agent list's columns."""
+        agency = aliased(Agency)
+        return query.outerjoin(agency, Agent.agency_id == agency.agency_id).with_entities(
+            Agent.agent_id, Agent.agency_id, Agent.first_name, Agent.last_name, Agent.email,
+            Agent.phone, agency.name.label('agency_name'), Agent.policy_count)
+
+
+class CustomerRow(ReadModel):
+    __slots__ = ('customer_id', 'first_name', 'last_name', 'email', 'phone', 'city', 'state',
+                 'policy_count')
+
+    full_name = Customer.full_name
+
+    @classmethod
+    def project(cls, query):
+        """``query`` over ``Customer`` narrowed to the customer list's columns."""
+        return query.with_entities(*[getattr(Customer, name) for name in cls.__slots__])
+
+
+class PolicyRow(ReadModel):
+    __slots__ = ('policy_id', 'policy_number', 'policy_type', 'coverage_amount', 'premium',
+                 'start_date', 'end_date', 'policy_status', 'customer_id', 'customer_name',
+                 'agent_id', 'agent_name')
+
+    @classmethod
+    def project(cls, query):
+        """``query`` over ``Policy`` narrowed to the policy list's columns."""
+        customer, agent = aliased(Customer), aliased(Agent)
+        return query.outerjoin(customer, Policy.customer_id == customer.customer_id) \
+                    .outerjoin(agent, Policy.agent_id == agent.agent_id) \
+                    .with_entities(
+                        Policy.policy_id, Policy.policy_number, Policy.policy_type,
+                        Policy.coverage_amount, Policy.premium, Policy.start_date,
+                        Policy.end_date, Policy.policy_status, Policy.customer_id,
+                        _full_name(customer, 'customer_name'), Policy.agent_id,
+                        _full_name(agent, 'agent_name'))
+
+
+class ClaimRow(ReadModel):
+    # No description: the list never shows it, and it is the one large column
+    __slots__ = ('claim_id', 'claim_number', 'policy_id', 'policy_number', 'customer_id',
+                 'customer_name', 'claim_date', 'claim_amount', 'status')
+
+    days_since_filed = Claim.days_since_filed
+
+    @classmethod
+    def project(cls, query):
+        """``query`` over ``Claim`` narrowed to the claim list's columns."""
+        policy, customer = aliased(Policy), aliased(Customer)
+        return query.outerjoin(policy, Claim.policy_id == policy.policy_id) \
+                    .outerjoin(customer, policy.customer_id == customer.customer_id) \
+                    .with_entities(
+                        Claim.claim_id, Claim.claim_number, Claim.policy_id,
+                        policy.policy_number, policy.customer_id,
+                        _full_name(customer, 'customer_name'), Claim.claim_date,
+                        Claim.claim_amount, Claim.status)
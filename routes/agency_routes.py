@@ -1,13 +1,47 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from models.agency import Agency
+from models.agent import Agent
+from models.policy import Policy
+from models import loaders
+from models import read_models
+from services.api import api_list_response
+from services.export import csv_response
+from services import search
+from services import deletion
+from services.conditional import conditional, row, rows, table
+from services import cache
 from models.database import db
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
+from sqlalchemy import select
 
 agency_bp = Blueprint('agency', __name__)
 
+# Search filter shared by the list view and its export
+def _filter_agencies(query, search_term):
+    if search_term:
+        # Search by name, address, city, state, or phone
+        query = search.filter_agencies(query, search_term)
+    return query
+
+# Rows behind the agency page: the agency, its agents and their policy counts
+def _agency_state(agency_id):
+    agent_ids = select(Agent.agent_id).where(Agent.agency_id == agency_id)
+    return (row(Agency, agency_id), rows(Agent, Agent.agency_id == agency_id),
+            rows(Policy, Policy.agent_id.in_(agent_ids)))
+
+def _agencies_state():
+    return (table(Agency), table(Agent))
+
+# Cache tags (services.cache) of the rows the list and detail pages show
+def _agencies_tags():
+    return (cache.table(Agency), cache.table(Agent))
+
+def _agency_tags(agency_id):
+    return (cache.row(Agency, agency_id), cache.table(Agent), cache.table(Policy))
+
 # List all agencies
 @agency_bp.route('/', methods=['GET'])
+@cache.cached(_agencies_tags)
 def index():
     search_term = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
@@ -15,19 +49,7 @@ def index():
         page = 1
     per_page = current_app.config.get('ITEMS_PER_PAGE', 10)
 
-    query = Agency.query
-
-    if search_term:
-        # Search by name, address, city, state, or phone
-        query = query.filter(
-            or_(
-                Agency.name.ilike(f'%{search_term}%'),
-                Agency.address.ilike(f'%{search_term}%'),
-                Agency.city.ilike(f'%{search_term}%'),
-                Agency.state.ilike(f'%{search_term}%'),
-                Agency.phone.ilike(f'%{search_term}%')
-            )
-        )
+    query = read_models.AgencyRow.project(_filter_agencies(Agency.query, search_term))
 
     pagination = query.order_by(Agency.agency_id.asc()).paginate(page=page, per_page=per_page, error_out=False)
 
@@ -35,7 +57,7 @@ def index():
         page = pagination.pages
         pagination = query.order_by(Agency.agency_id.asc()).paginate(page=page, per_page=per_page, error_out=False)
 
-    agencies = pagination.items
+    agencies = read_models.AgencyRow.from_rows(pagination.items)
 
     if pagination.total and pagination.items:
         start_index = (pagination.page - 1) * pagination.per_page + 1
@@ -53,6 +75,21 @@ def index():
         end_index=end_index
     )
 
+# Export the filtered agency list as CSV
+@agency_bp.route('/export', methods=['GET'])
+def export():
+    query = _filter_agencies(Agency.query, request.args.get('search', '').strip())
+    return csv_response('agencies', query.order_by(Agency.agency_id.asc()), [
+        ('Name', Agency.name),
+        ('Address', Agency.address),
+        ('City', Agency.city),
+        ('State', Agency.state),
+        ('Zip Code', Agency.zip_code),
+        ('Phone', Agency.phone),
+        ('Website', Agency.website),
+        ('Agents', Agency.agent_count),
+    ])
+
 # Show agency creation form
 @agency_bp.route('/create', methods=['GET'])
 def create_form():
@@ -93,8 +130,10 @@ def create():
 
 # Show agency details
 @agency_bp.route('/<int:agency_id>', methods=['GET'])
+@conditional(_agency_state)
+@cache.cached(_agency_tags)
 def view(agency_id):
-    agency = Agency.query.get_or_404(agency_id)
+    agency = Agency.query.options(*loaders.agency_detail()).get_or_404(agency_id)
     return render_template('agency/view.html', agency=agency)
 
 # Show agency edit form
@@ -141,6 +180,15 @@ def delete(agency_id):
     agency = Agency.query.get_or_404(agency_id)
     
     try:
+        # Large subtrees are deleted in the background, a chunk at a time
+        size = deletion.background_size('agency', agency_id)
+        if size:
+            job_run = deletion.start('agency', agency_id, total=size)
+            flash(f'Deleting agency and {size - 1} related records in the background '
+                  f'(job {job_run.job_run_id}).', 'info')
+            return redirect(url_for('agency.index'))
+        
+        # Agents, policies and claims go with it through ON DELETE CASCADE
         db.session.delete(agency)
         db.session.commit()
         flash('Agency deleted successfully!', 'success')
@@ -153,6 +201,6 @@ def delete(agency_id):
 
 # API endpoint to get agency data
 @agency_bp.route('/api/agencies', methods=['GET'])
+@conditional(_agencies_state)
 def api_agencies():
-    agencies = Agency.query.all()
-    return jsonify([agency.to_dict() for agency in agencies])
\ No newline at end of file
+    return api_list_response(Agency)
\ No newline at end of file
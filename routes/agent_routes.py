@@ -1,14 +1,64 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from models.agent import Agent
 from models.agency import Agency
+from models.customer import Customer
+from models.policy import Policy
+from models import loaders
+from models import read_models
+from services.pagination import keyset_paginate, keyset_requested
+from services.agent_stats import get_agent_stats
+from services.api import api_list_response
+from services import serializers
+from services.export import csv_response
+from services import search
+from services import lookup
+from services.conditional import conditional, row, rows, table
+from services import cache
 from models.database import db
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
+from sqlalchemy import select
 
 agent_bp = Blueprint('agent', __name__)
 
+# Search filter shared by the list view and its export
+def _filter_agents(query, search_term):
+    if search_term:
+        # Search by name, email, or phone
+        query = search.filter_agents(query, search_term)
+    return query
+
+# Rows behind the agent page: the agent, its agency, its policies and their customers
+def _agent_state(agent_id):
+    agency_id = select(Agent.agency_id).where(Agent.agent_id == agent_id).scalar_subquery()
+    customer_ids = select(Policy.customer_id).where(Policy.agent_id == agent_id)
+    return (row(Agent, agent_id), row(Agency, agency_id), rows(Policy, Policy.agent_id == agent_id),
+            rows(Customer, Customer.customer_id.in_(customer_ids)))
+
+def _agent_stats_state(agent_id):
+    return (row(Agent, agent_id), rows(Policy, Policy.agent_id == agent_id))
+
+def _agency_agents_state(agency_id):
+    agent_ids = select(Agent.agent_id).where(Agent.agency_id == agency_id)
+    return (row(Agency, agency_id), rows(Agent, Agent.agency_id == agency_id),
+            rows(Policy, Policy.agent_id.in_(agent_ids)))
+
+def _agents_state():
+    return (table(Agent), table(Agency), table(Policy))
+
+# Cache tags (services.cache) of the rows the list and detail pages show
+def _agents_tags():
+    return (cache.table(Agent), cache.table(Agency), cache.table(Policy))
+
+def _agent_tags(agent_id):
+    return (cache.row(Agent, agent_id), cache.table(Agency), cache.table(Policy),
+            cache.table(Customer))
+
+def _agency_agents_tags(agency_id):
+    return (cache.row(Agency, agency_id), cache.table(Agent), cache.table(Policy))
+
 # List all agents
 @agent_bp.route('/', methods=['GET'])
+@cache.cached(_agents_tags)
 def index():
     search_term = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
@@ -16,41 +66,40 @@ def index():
         page = 1
     per_page = current_app.config.get('ITEMS_PER_PAGE', 10)
 
-    query = Agent.query
+    query = read_models.AgentRow.project(_filter_agents(Agent.query, search_term))
 
-    if search_term:
-        # Search by name, email, or phone
-        query = query.filter(
-            or_(
-                Agent.first_name.ilike(f'%{search_term}%'),
-                Agent.last_name.ilike(f'%{search_term}%'),
-                Agent.email.ilike(f'%{search_term}%'),
-                Agent.phone.ilike(f'%{search_term}%')
-            )
+    if keyset_requested(request.args):
+        pagination = keyset_paginate(
+            query,
+            [Agent.last_name, Agent.first_name, Agent.agent_id],
+            cursor=request.args.get('cursor'),
+            per_page=per_page
         )
-
-    pagination = query.order_by(Agent.last_name.asc(), Agent.first_name.asc()).paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
-    )
-
-    if pagination.total and page > pagination.pages:
-        page = pagination.pages
+        start_index = 1 if pagination.items else 0
+        end_index = len(pagination.items)
+    else:
         pagination = query.order_by(Agent.last_name.asc(), Agent.first_name.asc()).paginate(
             page=page,
             per_page=per_page,
             error_out=False
         )
 
-    agents = pagination.items
+        if pagination.total and page > pagination.pages:
+            page = pagination.pages
+            pagination = query.order_by(Agent.last_name.asc(), Agent.first_name.asc()).paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
 
-    if pagination.total and pagination.items:
-        start_index = (pagination.page - 1) * pagination.per_page + 1
-        end_index = start_index + len(pagination.items) - 1
-    else:
-        start_index = 0
-        end_index = 0
+        if pagination.total and pagination.items:
+            start_index = (pagination.page - 1) * pagination.per_page + 1
+            end_index = start_index + len(pagination.items) - 1
+        else:
+            start_index = 0
+            end_index = 0
+
+    agents = read_models.AgentRow.from_rows(pagination.items)
 
     return render_template(
         'agent/index.html',
@@ -61,6 +110,21 @@ def index():
         end_index=end_index
     )
 
+# Export the filtered agent list as CSV
+@agent_bp.route('/export', methods=['GET'])
+def export():
+    query = _filter_agents(Agent.query, request.args.get('search', '').strip())
+    query = query.outerjoin(Agency, Agent.agency_id == Agency.agency_id) \
+                 .order_by(Agent.last_name.asc(), Agent.first_name.asc(), Agent.agent_id.asc())
+    return csv_response('agents', query, [
+        ('First Name', Agent.first_name),
+        ('Last Name', Agent.last_name),
+        ('Email', Agent.email),
+        ('Phone', Agent.phone),
+        ('Agency', Agency.name),
+        ('Policies', Agent.policy_count),
+    ])
+
 # Show agent creation form
 @agent_bp.route('/create', methods=['GET'])
 def create_form():
@@ -95,9 +159,17 @@ def create():
 
 # Show agent details
 @agent_bp.route('/<int:agent_id>', methods=['GET'])
+@conditional(_agent_state)
+@cache.cached(_agent_tags)
 def view(agent_id):
-    agent = Agent.query.get_or_404(agent_id)
-    return render_template('agent/view.html', agent=agent)
+    agent = Agent.query.options(*loaders.agent_detail()).get_or_404(agent_id)
+    stats = get_agent_stats(agent_id)
+    # Only the most recent page of policies; the totals come from stats
+    policies = read_models.PolicyRow.project(Policy.query.filter(Policy.agent_id == agent_id)) \
+        .order_by(Policy.start_date.desc(), Policy.policy_id.desc()) \
+        .limit(current_app.config.get('ITEMS_PER_PAGE', 10)).all()
+    return render_template('agent/view.html', agent=agent, stats=stats,
+                           policies=read_models.PolicyRow.from_rows(policies))
 
 # Show agent edit form
 @agent_bp.route('/<int:agent_id>/edit', methods=['GET'])
@@ -149,12 +221,29 @@ def delete(agent_id):
 
 # API endpoint to get agents by agency
 @agent_bp.route('/api/by-agency/<int:agency_id>', methods=['GET'])
+@conditional(_agency_agents_state)
+@cache.cached(_agency_agents_tags)
 def api_agents_by_agency(agency_id):
-    agents = Agent.query.filter_by(agency_id=agency_id).all()
-    return jsonify([agent.to_dict() for agent in agents])
+    schema = serializers.schema_for(Agent)
+    rows = db.session.execute(schema.select().where(Agent.agency_id == agency_id)).all()
+    return serializers.json_response(schema.serialize(rows))
+
+# API endpoint to get policy statistics for an agent
+@agent_bp.route('/api/<int:agent_id>/stats', methods=['GET'])
+@conditional(_agent_stats_state)
+def api_agent_stats(agent_id):
+    Agent.query.get_or_404(agent_id)
+    return jsonify(get_agent_stats(agent_id))
 
 # API endpoint to get all agents
 @agent_bp.route('/api/agents', methods=['GET'])
+@conditional(_agents_state)
 def api_agents():
-    agents = Agent.query.all()
-    return jsonify([agent.to_dict() for agent in agents])
\ No newline at end of file
+    return api_list_response(Agent)
+
+# API endpoint for the agent typeahead on the policy forms
+@agent_bp.route('/api/lookup', methods=['GET'])
+def api_lookup():
+    term = request.args.get('q', '').strip()
+    limit = request.args.get('limit', type=int)
+    return jsonify(lookup.lookup_agents(term, limit=limit))
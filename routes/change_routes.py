@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify, request, current_app
+from services import changes
+
+change_bp = Blueprint('change', __name__)
+
+# API endpoint for the incremental change feed
+@change_bp.route('/changes', methods=['GET'])
+def api_changes():
+    since = request.args.get('since', type=int)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, current_app.config.get('API_MAX_LIMIT', 1000)))
+    try:
+        if since is None:
+            # No cursor yet: hand out the current head to sync from after a full dump
+            return jsonify({'changes': [], 'next_cursor': changes.head(), 'has_more': False})
+        entries, next_cursor, has_more = changes.feed(since, limit)
+    except changes.FeedUnavailable as e:
+        return jsonify({'error': str(e)}), 501
+    return jsonify({'changes': entries, 'next_cursor': next_cursor, 'has_more': has_more})
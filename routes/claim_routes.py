@@ -1,16 +1,60 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from models.claim import Claim
 from models.policy import Policy
+from models.customer import Customer
+from models import loaders
+from models import read_models
+from services.pagination import keyset_paginate, keyset_requested
+from services.api import api_list_response
+from services import serializers
+from services.export import csv_response
+from services import search
+from services import lookup
+from services import validation
+from services.conditional import conditional, row, rows, table
+from services import cache
 from models.database import db
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+from sqlalchemy import select
 from datetime import datetime
-import uuid
 
 claim_bp = Blueprint('claim', __name__)
 
+# Search and status filters shared by the list view and its export
+def _filter_claims(query, search_term, status_filter):
+    if search_term:
+        # Search by claim number, policy number, or customer name
+        query = search.filter_claims(query, search_term)
+    
+    if status_filter:
+        query = query.filter(Claim.status == status_filter)
+    return query
+
+# Rows behind the claim page: the claim, its policy and the policy's customer
+def _claim_state(claim_id):
+    policy_id = select(Claim.policy_id).where(Claim.claim_id == claim_id).scalar_subquery()
+    customer_id = select(Policy.customer_id).where(Policy.policy_id == policy_id).scalar_subquery()
+    return (row(Claim, claim_id), row(Policy, policy_id), row(Customer, customer_id))
+
+def _policy_claims_state(policy_id):
+    customer_id = select(Policy.customer_id).where(Policy.policy_id == policy_id).scalar_subquery()
+    return (row(Policy, policy_id), row(Customer, customer_id),
+            rows(Claim, Claim.policy_id == policy_id))
+
+def _claims_state():
+    return (table(Claim), table(Policy), table(Customer))
+
+# Cache tags (services.cache) of the rows the list and detail pages show
+def _claims_tags():
+    return (cache.table(Claim), cache.table(Policy), cache.table(Customer))
+
+def _claim_tags(claim_id):
+    return (cache.row(Claim, claim_id), cache.table(Policy), cache.table(Customer))
+
 # List all claims
 @claim_bp.route('/', methods=['GET'])
+@cache.cached(_claims_tags)
 def index():
     search_term = request.args.get('search', '').strip()
     status_filter = request.args.get('status', '').strip()
@@ -19,39 +63,38 @@ def index():
         page = 1
     per_page = current_app.config.get('ITEMS_PER_PAGE', 10)
 
-    query = Claim.query
-    
-    if search_term:
-        # Search by claim number, policy number, or customer name
-        query = query.join(Policy).filter(
-            or_(
-                Claim.claim_number.ilike(f'%{search_term}%'),
-                Policy.policy_number.ilike(f'%{search_term}%')
-            )
-        )
-    
-    if status_filter:
-        query = query.filter(Claim.status == status_filter)
+    query = read_models.ClaimRow.project(
+        _filter_claims(Claim.query, search_term, status_filter))
         
-    claims_query = query.order_by(Claim.claim_date.desc())
-    pagination = claims_query.paginate(page=page, per_page=per_page, error_out=False)
-
-    if pagination.total and page > pagination.pages:
-        page = pagination.pages
+    if keyset_requested(request.args):
+        pagination = keyset_paginate(
+            query,
+            [Claim.claim_date, Claim.claim_id],
+            cursor=request.args.get('cursor'),
+            per_page=per_page,
+            descending=True
+        )
+        start_index = 1 if pagination.items else 0
+        end_index = len(pagination.items)
+    else:
+        claims_query = query.order_by(Claim.claim_date.desc())
         pagination = claims_query.paginate(page=page, per_page=per_page, error_out=False)
 
-    claims = pagination.items
+        if pagination.total and page > pagination.pages:
+            page = pagination.pages
+            pagination = claims_query.paginate(page=page, per_page=per_page, error_out=False)
 
-    if pagination.total and pagination.items:
-        start_index = (pagination.page - 1) * pagination.per_page + 1
-        end_index = start_index + len(pagination.items) - 1
-    else:
-        start_index = 0
-        end_index = 0
+        if pagination.total and pagination.items:
+            start_index = (pagination.page - 1) * pagination.per_page + 1
+            end_index = start_index + len(pagination.items) - 1
+        else:
+            start_index = 0
+            end_index = 0
+
+    claims = read_models.ClaimRow.from_rows(pagination.items)
     
-    # Get unique statuses for filter dropdown
-    statuses = db.session.query(Claim.status).distinct().all()
-    statuses = [status[0] for status in statuses]
+    # Statuses for the filter dropdown come from the registry, not a table scan
+    statuses = Claim.STATUSES
     
     return render_template('claim/index.html',
                           claims=claims,
@@ -62,11 +105,34 @@ def index():
                           start_index=start_index,
                           end_index=end_index)
 
+# Export the filtered claim list as CSV
+@claim_bp.route('/export', methods=['GET'])
+def export():
+    query = _filter_claims(Claim.query,
+                           request.args.get('search', '').strip(),
+                           request.args.get('status', '').strip())
+    # Aliases keep these joins apart from the one the search fallback adds
+    policy, customer = aliased(Policy), aliased(Customer)
+    query = query.outerjoin(policy, Claim.policy_id == policy.policy_id) \
+                 .outerjoin(customer, policy.customer_id == customer.customer_id) \
+                 .order_by(Claim.claim_date.desc(), Claim.claim_id.desc())
+    return csv_response('claims', query, [
+        ('Claim Number', Claim.claim_number),
+        ('Policy Number', policy.policy_number),
+        ('Customer', customer.first_name + ' ' + customer.last_name),
+        ('Claim Date', Claim.claim_date),
+        ('Incident Date', Claim.incident_date),
+        ('Claim Amount', Claim.claim_amount),
+        ('Status', Claim.status),
+        ('Resolution Date', Claim.resolution_date),
+        ('Settlement Amount', Claim.settlement_amount),
+        ('Description', Claim.description),
+    ])
+
 # Show claim creation form
 @claim_bp.route('/create', methods=['GET'])
 def create_form():
-    policies = Policy.query.filter(Policy.policy_status == 'Active').all()
-    return render_template('claim/create.html', policies=policies)
+    return render_template('claim/create.html')
 
 # Create claim for specific policy
 @claim_bp.route('/policy/<int:policy_id>/create', methods=['GET'])
@@ -78,32 +144,16 @@ def create_for_policy(policy_id):
 @claim_bp.route('/create', methods=['POST'])
 def create():
     try:
-        # Validate required fields
-        policy_id = request.form.get('policy_id')
-        if not policy_id:
-            flash('Policy is required', 'danger')
-            policies = Policy.query.filter(Policy.policy_status == 'Active').all()
-            return render_template('claim/create.html', policies=policies)
-        
-        incident_date = request.form.get('incident_date')
-        if not incident_date:
-            flash('Incident date is required', 'danger')
-            policies = Policy.query.filter(Policy.policy_status == 'Active').all()
-            return render_template('claim/create.html', policies=policies)
-        
-        # Generate unique claim number
-        claim_number = f"CLM-{uuid.uuid4().hex[:8].upper()}"
+        # Validate with the rules shared with the CSV import
+        try:
+            values = validation.claim_values(request.form)
+        except validation.ValidationError as e:
+            flash(str(e), 'danger')
+            return render_template('claim/create.html',
+                                  selected_policy=lookup.selected_option(Policy, request.form.get('policy_id')))
         
         # Create new claim
-        new_claim = Claim(
-            policy_id=policy_id,
-            claim_number=claim_number,
-            claim_date=datetime.today().date(),
-            incident_date=datetime.strptime(incident_date, '%Y-%m-%d').date(),
-            description=request.form.get('description', '').strip(),
-            claim_amount=request.form.get('claim_amount', 0),
-            status='Open'
-        )
+        new_claim = Claim(**values)
         
         # Add to database
         db.session.add(new_claim)
@@ -115,19 +165,21 @@ def create():
     except SQLAlchemyError as e:
         db.session.rollback()
         flash(f'Error creating claim: {str(e)}', 'danger')
-        policies = Policy.query.filter(Policy.policy_status == 'Active').all()
-        return render_template('claim/create.html', policies=policies)
+        return render_template('claim/create.html',
+                              selected_policy=lookup.selected_option(Policy, request.form.get('policy_id')))
 
 # Show claim details
 @claim_bp.route('/<int:claim_id>', methods=['GET'])
+@conditional(_claim_state)
+@cache.cached(_claim_tags)
 def view(claim_id):
-    claim = Claim.query.get_or_404(claim_id)
+    claim = Claim.query.options(*loaders.claim_detail()).get_or_404(claim_id)
     return render_template('claim/view.html', claim=claim)
 
 # Show claim edit form
 @claim_bp.route('/<int:claim_id>/edit', methods=['GET'])
 def edit_form(claim_id):
-    claim = Claim.query.get_or_404(claim_id)
+    claim = Claim.query.options(*loaders.claim_detail()).get_or_404(claim_id)
     return render_template('claim/edit.html', claim=claim)
 
 # Process claim update
@@ -136,16 +188,20 @@ def edit(claim_id):
     claim = Claim.query.get_or_404(claim_id)
     
     try:
+        # Validate with the rules shared with the create form and CSV import
+        try:
+            values = validation.claim_update_values(request.form)
+        except validation.ValidationError as e:
+            flash(str(e), 'danger')
+            return render_template('claim/edit.html', claim=claim)
+        
         # Update claim
-        claim.description = request.form.get('description', '').strip()
-        claim.claim_amount = request.form.get('claim_amount', 0)
-        claim.status = request.form.get('status')
+        for name, value in values.items():
+            setattr(claim, name, value)
         
         # If status is closed/settled, update resolution fields
-        if claim.status in ['Settled', 'Denied', 'Closed', 'Withdrawn']:
+        if claim.is_closed():
             claim.resolution_date = datetime.today().date()
-            if claim.status == 'Settled':
-                claim.settlement_amount = request.form.get('settlement_amount', 0)
         
         # Commit changes
         db.session.commit()
@@ -176,12 +232,14 @@ def delete(claim_id):
 
 # API endpoint to get claims for a policy
 @claim_bp.route('/api/policy/<int:policy_id>/claims', methods=['GET'])
+@conditional(_policy_claims_state)
 def api_policy_claims(policy_id):
-    claims = Claim.query.filter_by(policy_id=policy_id).all()
-    return jsonify([claim.to_dict() for claim in claims])
+    schema = serializers.schema_for(Claim)
+    rows = db.session.execute(schema.select().where(Claim.policy_id == policy_id)).all()
+    return serializers.json_response(schema.serialize(rows))
 
 # API endpoint to get all claims
 @claim_bp.route('/api/claims', methods=['GET'])
+@conditional(_claims_state)
 def api_claims():
-    claims = Claim.query.all()
-    return jsonify([claim.to_dict() for claim in claims]) 
\ No newline at end of file
+    return api_list_response(Claim) 
\ No newline at end of file
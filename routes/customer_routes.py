@@ -1,14 +1,46 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from models.customer import Customer
+from models.policy import Policy
+from models import loaders
+from models import read_models
+from services.pagination import keyset_paginate, keyset_requested
+from services.api import api_list_response
+from services.export import csv_response
+from services import search
+from services import lookup
+from services import validation
+from services import deletion
+from services.conditional import conditional, row, rows, table
+from services import cache
 from models.database import db
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
-from datetime import datetime
 
 customer_bp = Blueprint('customer', __name__)
 
+# Search filter shared by the list view and its export
+def _filter_customers(query, search_term):
+    if search_term:
+        # Search by name, email, or phone
+        query = search.filter_customers(query, search_term)
+    return query
+
+# Rows behind the customer page: the customer and its policies
+def _customer_state(customer_id):
+    return (row(Customer, customer_id), rows(Policy, Policy.customer_id == customer_id))
+
+def _customers_state():
+    return (table(Customer), table(Policy))
+
+# Cache tags (services.cache) of the rows the list and detail pages show
+def _customers_tags():
+    return (cache.table(Customer), cache.table(Policy))
+
+def _customer_tags(customer_id):
+    return (cache.row(Customer, customer_id), cache.table(Policy))
+
 # List all customers
 @customer_bp.route('/', methods=['GET'])
+@cache.cached(_customers_tags)
 def index():
     search_term = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
@@ -16,41 +48,40 @@ def index():
         page = 1
     per_page = current_app.config.get('ITEMS_PER_PAGE', 10)
 
-    query = Customer.query
+    query = read_models.CustomerRow.project(_filter_customers(Customer.query, search_term))
 
-    if search_term:
-        # Search by name, email, or phone
-        query = query.filter(
-            or_(
-                Customer.first_name.ilike(f'%{search_term}%'),
-                Customer.last_name.ilike(f'%{search_term}%'),
-                Customer.email.ilike(f'%{search_term}%'),
-                Customer.phone.ilike(f'%{search_term}%')
-            )
+    if keyset_requested(request.args):
+        pagination = keyset_paginate(
+            query,
+            [Customer.last_name, Customer.first_name, Customer.customer_id],
+            cursor=request.args.get('cursor'),
+            per_page=per_page
         )
-
-    pagination = query.order_by(Customer.last_name.asc(), Customer.first_name.asc()).paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
-    )
-
-    if pagination.total and page > pagination.pages:
-        page = pagination.pages
+        start_index = 1 if pagination.items else 0
+        end_index = len(pagination.items)
+    else:
         pagination = query.order_by(Customer.last_name.asc(), Customer.first_name.asc()).paginate(
             page=page,
             per_page=per_page,
             error_out=False
         )
 
-    customers = pagination.items
+        if pagination.total and page > pagination.pages:
+            page = pagination.pages
+            pagination = query.order_by(Customer.last_name.asc(), Customer.first_name.asc()).paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
 
-    if pagination.total and pagination.items:
-        start_index = (pagination.page - 1) * pagination.per_page + 1
-        end_index = start_index + len(pagination.items) - 1
-    else:
-        start_index = 0
-        end_index = 0
+        if pagination.total and pagination.items:
+            start_index = (pagination.page - 1) * pagination.per_page + 1
+            end_index = start_index + len(pagination.items) - 1
+        else:
+            start_index = 0
+            end_index = 0
+
+    customers = read_models.CustomerRow.from_rows(pagination.items)
 
     return render_template(
         'customer/index.html',
@@ -61,6 +92,23 @@ def index():
         end_index=end_index
     )
 
+# Export the filtered customer list as CSV
+@customer_bp.route('/export', methods=['GET'])
+def export():
+    query = _filter_customers(Customer.query, request.args.get('search', '').strip())
+    query = query.order_by(Customer.last_name.asc(), Customer.first_name.asc(), Customer.customer_id.asc())
+    return csv_response('customers', query, [
+        ('First Name', Customer.first_name),
+        ('Last Name', Customer.last_name),
+        ('Date of Birth', Customer.date_of_birth),
+        ('Email', Customer.email),
+        ('Phone', Customer.phone),
+        ('Address', Customer.address),
+        ('City', Customer.city),
+        ('State', Customer.state),
+        ('Zip Code', Customer.zip_code),
+    ])
+
 # Show customer creation form
 @customer_bp.route('/create', methods=['GET'])
 def create_form():
@@ -70,36 +118,15 @@ def create_form():
 @customer_bp.route('/create', methods=['POST'])
 def create():
     try:
-        # Validate required fields
-        first_name = request.form.get('first_name')
-        last_name = request.form.get('last_name')
-        
-        if not first_name or first_name.strip() == '':
-            flash('First name is required', 'danger')
+        # Validate with the rules shared with the CSV import
+        try:
+            values = validation.customer_values(request.form)
+        except validation.ValidationError as e:
+            flash(str(e), 'danger')
             return render_template('customer/create.html')
         
-        if not last_name or last_name.strip() == '':
-            flash('Last name is required', 'danger')
-            return render_template('customer/create.html')
-        
-        # Parse date of birth if provided
-        dob_str = request.form.get('date_of_birth')
-        dob = None
-        if dob_str:
-            dob = datetime.strptime(dob_str, '%Y-%m-%d').date()
-        
         # Create new customer from form data
-        new_customer = Customer(
-            first_name=first_name.strip(),
-            last_name=last_name.strip(),
-            date_of_birth=dob,
-            email=request.form.get('email', '').strip(),
-            phone=request.form.get('phone', '').strip(),
-            address=request.form.get('address', '').strip(),
-            city=request.form.get('city', '').strip(),
-            state=request.form.get('state', '').strip(),
-            zip_code=request.form.get('zip_code', '').strip()
-        )
+        new_customer = Customer(**values)
         
         # Add to database
         db.session.add(new_customer)
@@ -115,8 +142,10 @@ def create():
 
 # Show customer details
 @customer_bp.route('/<int:customer_id>', methods=['GET'])
+@conditional(_customer_state)
+@cache.cached(_customer_tags)
 def view(customer_id):
-    customer = Customer.query.get_or_404(customer_id)
+    customer = Customer.query.options(*loaders.customer_detail()).get_or_404(customer_id)
     return render_template('customer/view.html', customer=customer)
 
 # Show customer edit form
@@ -131,32 +160,16 @@ def edit(customer_id):
     customer = Customer.query.get_or_404(customer_id)
     
     try:
-        # Validate required fields
-        first_name = request.form.get('first_name')
-        last_name = request.form.get('last_name')
-        
-        if not first_name or first_name.strip() == '':
-            flash('First name is required', 'danger')
+        # Validate with the rules shared with the create form and CSV import
+        try:
+            values = validation.customer_values(request.form)
+        except validation.ValidationError as e:
+            flash(str(e), 'danger')
             return render_template('customer/edit.html', customer=customer)
         
-        if not last_name or last_name.strip() == '':
-            flash('Last name is required', 'danger')
-            return render_template('customer/edit.html', customer=customer)
-        
-        # Parse date of birth if provided
-        dob_str = request.form.get('date_of_birth')
-        if dob_str:
-            customer.date_of_birth = datetime.strptime(dob_str, '%Y-%m-%d').date()
-        
         # Update customer from form data
-        customer.first_name = first_name.strip()
-        customer.last_name = last_name.strip()
-        customer.email = request.form.get('email', '').strip()
-        customer.phone = request.form.get('phone', '').strip()
-        customer.address = request.form.get('address', '').strip()
-        customer.city = request.form.get('city', '').strip()
-        customer.state = request.form.get('state', '').strip()
-        customer.zip_code = request.form.get('zip_code', '').strip()
+        for name, value in values.items():
+            setattr(customer, name, value)
         
         # Commit changes
         db.session.commit()
@@ -175,6 +188,15 @@ def delete(customer_id):
     customer = Customer.query.get_or_404(customer_id)
     
     try:
+        # Large subtrees are deleted in the background, a chunk at a time
+        size = deletion.background_size('customer', customer_id)
+        if size:
+            job_run = deletion.start('customer', customer_id, total=size)
+            flash(f'Deleting customer and {size - 1} related records in the background '
+                  f'(job {job_run.job_run_id}).', 'info')
+            return redirect(url_for('customer.index'))
+        
+        # Policies and claims go with it through ON DELETE CASCADE
         db.session.delete(customer)
         db.session.commit()
         flash('Customer deleted successfully!', 'success')
@@ -187,6 +209,13 @@ def delete(customer_id):
 
 # API endpoint to get all customers
 @customer_bp.route('/api/customers', methods=['GET'])
+@conditional(_customers_state)
 def api_customers():
-    customers = Customer.query.all()
-    return jsonify([customer.to_dict() for customer in customers])
\ No newline at end of file
+    return api_list_response(Customer)
+
+# API endpoint for the customer typeahead on the policy forms
+@customer_bp.route('/api/lookup', methods=['GET'])
+def api_lookup():
+    term = request.args.get('q', '').strip()
+    limit = request.args.get('limit', type=int)
+    return jsonify(lookup.lookup_customers(term, limit=limit))
@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+from services import importer
+from services.validation import ValidationError
+import io
+
+import_bp = Blueprint('import', __name__)
+
+# Rejected rows returned in the response body; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# API endpoint to bulk import customers, policies or claims from an uploaded CSV file
+@import_bp.route('/api/<entity>', methods=['POST'])
+def api_import(entity):
+    if entity not in importer.IMPORTERS:
+        return jsonify({'error': f"Unknown import type '{entity}'"}), 404
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': "Upload a CSV file in the 'file' field"}), 400
+
+    errors = []
+
+    def on_error(line, row, message):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line, 'error': message})
+
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        result = importer.import_csv(entity, stream, on_error=on_error)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except UnicodeDecodeError:
+        return jsonify({'error': 'The file is not UTF-8 encoded text'}), 400
+
+    return jsonify({**result.to_dict(), 'errors': errors})
@@ -0,0 +1,10 @@
+from flask import Blueprint, jsonify
+from models.job_run import JobRun
+
+job_bp = Blueprint('job', __name__)
+
+# API endpoint to follow a lifecycle run or background delete
+@job_bp.route('/api/<int:job_run_id>', methods=['GET'])
+def api_job(job_run_id):
+    job_run = JobRun.query.get_or_404(job_run_id)
+    return jsonify(job_run.to_dict())
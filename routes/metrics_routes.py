@@ -0,0 +1,11 @@
+from flask import Blueprint, Response, abort, current_app
+from services import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Prometheus scrape endpoint (this worker process's series)
+@metrics_bp.route('/metrics', methods=['GET'])
+def scrape():
+    if not current_app.config.get('METRICS_ENABLED'):
+        abort(404)
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
@@ -2,16 +2,75 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from models.policy import Policy
 from models.agent import Agent
 from models.customer import Customer
+from models.agency import Agency
+from models.claim import Claim
+from models import loaders
+from models import read_models
+from services.pagination import keyset_paginate, keyset_requested
+from services.api import api_list_response
+from services import serializers
+from services.export import csv_response
+from services import search
+from services import lookup
+from services import validation
+from services import renewals as renewal_worklist
+from services.conditional import conditional, row, rows, table
+from services import cache
 from models.database import db
 
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
-from datetime import datetime
+from sqlalchemy.orm import aliased
+from sqlalchemy import select
 
 policy_bp = Blueprint('policy', __name__)
 
+# Search and status filters shared by the list view and its export
+def _filter_policies(query, search_term, status_filter):
+    if search_term:
+        # Search by policy number, policy type, or customer/agent names
+        query = search.filter_policies(query, search_term)
+
+    if status_filter:
+        query = query.filter(Policy.policy_status == status_filter)
+    return query
+
+# Rows behind the policy page: the policy, its customer, agent, agency and claims
+def _policy_state(policy_id):
+    policy = select(Policy).where(Policy.policy_id == policy_id).subquery()
+    agency_id = select(Agent.agency_id).where(Agent.agent_id == policy.c.agent_id).scalar_subquery()
+    return (row(Policy, policy_id), row(Customer, select(policy.c.customer_id).scalar_subquery()),
+            row(Agent, select(policy.c.agent_id).scalar_subquery()), row(Agency, agency_id),
+            rows(Claim, Claim.policy_id == policy_id))
+
+# Policies serialize with their agent and customer names and claim counts
+def _policy_list_state(*criteria):
+    agent_ids = select(Policy.agent_id).where(*criteria)
+    customer_ids = select(Policy.customer_id).where(*criteria)
+    policy_ids = select(Policy.policy_id).where(*criteria)
+    return (rows(Policy, *criteria), rows(Agent, Agent.agent_id.in_(agent_ids)),
+            rows(Customer, Customer.customer_id.in_(customer_ids)),
+            rows(Claim, Claim.policy_id.in_(policy_ids)))
+
+def _customer_policies_state(customer_id):
+    return _policy_list_state(Policy.customer_id == customer_id)
+
+def _agent_policies_state(agent_id):
+    return _policy_list_state(Policy.agent_id == agent_id)
+
+def _policies_state():
+    return (table(Policy), table(Customer), table(Agent), table(Claim))
+
+# Cache tags (services.cache) of the rows the list and detail pages show
+def _policies_tags():
+    return (cache.table(Policy), cache.table(Customer), cache.table(Agent))
+
+def _policy_tags(policy_id):
+    return (cache.row(Policy, policy_id), cache.table(Customer), cache.table(Agent),
+            cache.table(Agency), cache.table(Claim))
+
 # List all policies
 @policy_bp.route('/', methods=['GET'])
+@cache.cached(_policies_tags)
 def index():
     search_term = request.args.get('search', '').strip()
     status_filter = request.args.get('status', '').strip()
@@ -20,43 +79,38 @@ def index():
         page = 1
     per_page = current_app.config.get('ITEMS_PER_PAGE', 10)
 
-    query = Policy.query
-    
-    if search_term:
-        # Search by policy number, policy type, or customer/agent names
-        query = query.join(Customer).join(Agent).filter(
-            or_(
-                Policy.policy_number.ilike(f'%{search_term}%'),
-                Policy.policy_type.ilike(f'%{search_term}%'),
-                Customer.first_name.ilike(f'%{search_term}%'),
-                Customer.last_name.ilike(f'%{search_term}%'),
-                Agent.first_name.ilike(f'%{search_term}%'),
-                Agent.last_name.ilike(f'%{search_term}%')
-            )
-        )
-
-    if status_filter:
-        query = query.filter(Policy.policy_status == status_filter)
-
-    policies_query = query.order_by(Policy.start_date.desc())
-    pagination = policies_query.paginate(page=page, per_page=per_page, error_out=False)
+    query = read_models.PolicyRow.project(
+        _filter_policies(Policy.query, search_term, status_filter))
 
-    if pagination.total and page > pagination.pages:
-        page = pagination.pages
+    if keyset_requested(request.args):
+        pagination = keyset_paginate(
+            query,
+            [Policy.start_date, Policy.policy_id],
+            cursor=request.args.get('cursor'),
+            per_page=per_page,
+            descending=True
+        )
+        start_index = 1 if pagination.items else 0
+        end_index = len(pagination.items)
+    else:
+        policies_query = query.order_by(Policy.start_date.desc())
         pagination = policies_query.paginate(page=page, per_page=per_page, error_out=False)
 
-    policies = pagination.items
+        if pagination.total and page > pagination.pages:
+            page = pagination.pages
+            pagination = policies_query.paginate(page=page, per_page=per_page, error_out=False)
 
-    if pagination.total and pagination.items:
-        start_index = (pagination.page - 1) * pagination.per_page + 1
-        end_index = start_index + len(pagination.items) - 1
-    else:
-        start_index = 0
-        end_index = 0
+        if pagination.total and pagination.items:
+            start_index = (pagination.page - 1) * pagination.per_page + 1
+            end_index = start_index + len(pagination.items) - 1
+        else:
+            start_index = 0
+            end_index = 0
+
+    policies = read_models.PolicyRow.from_rows(pagination.items)
     
-    # Get unique statuses for filter dropdown
-    statuses = db.session.query(Policy.policy_status).distinct().all()
-    statuses = [status[0] for status in statuses]
+    # Statuses for the filter dropdown come from the registry, not a table scan
+    statuses = Policy.STATUSES
     
     return render_template('policy/index.html',
                           policies=policies,
@@ -67,78 +121,89 @@ def index():
                           start_index=start_index,
                           end_index=end_index)
 
+# Export the filtered policy list as CSV
+@policy_bp.route('/export', methods=['GET'])
+def export():
+    query = _filter_policies(Policy.query,
+                             request.args.get('search', '').strip(),
+                             request.args.get('status', '').strip())
+    # Aliases keep these joins apart from the ones the search fallback adds
+    customer, agent = aliased(Customer), aliased(Agent)
+    query = query.outerjoin(customer, Policy.customer_id == customer.customer_id) \
+                 .outerjoin(agent, Policy.agent_id == agent.agent_id) \
+                 .order_by(Policy.start_date.desc(), Policy.policy_id.desc())
+    return csv_response('policies', query, [
+        ('Policy Number', Policy.policy_number),
+        ('Policy Type', Policy.policy_type),
+        ('Customer', customer.first_name + ' ' + customer.last_name),
+        ('Agent', agent.first_name + ' ' + agent.last_name),
+        ('Coverage Amount', Policy.coverage_amount),
+        ('Premium', Policy.premium),
+        ('Start Date', Policy.start_date),
+        ('End Date', Policy.end_date),
+        ('Status', Policy.policy_status),
+    ])
+
+# Agent and customer shown in the typeahead pickers when a form is re-rendered
+def _selected(agent_id, customer_id):
+    return {
+        'agent': lookup.selected_option(Agent, agent_id),
+        'customer': lookup.selected_option(Customer, customer_id),
+    }
+
+# Worklist filters: the bucket plus an optional agent or agency
+def _renewal_filters():
+    bucket = request.args.get('bucket', '').strip() or None
+    if bucket and bucket not in renewal_worklist.BUCKETS:
+        bucket = None
+    return {
+        'bucket': bucket,
+        'agent_id': request.args.get('agent_id', type=int),
+        'agency_id': request.args.get('agency_id', type=int),
+    }
+
+# Renewal worklist, soonest end date first
+@policy_bp.route('/renewals', methods=['GET'])
+def renewals():
+    filters = _renewal_filters()
+    per_page = current_app.config.get('ITEMS_PER_PAGE', 10)
+
+    pagination = keyset_paginate(
+        renewal_worklist.worklist(Policy.query.options(*loaders.policy_list()), **filters),
+        [Policy.end_date, Policy.policy_id],
+        cursor=request.args.get('cursor'),
+        per_page=per_page
+    )
+    counts = renewal_worklist.bucket_counts(filters['agent_id'], filters['agency_id'])
+
+    return render_template('policy/renewals.html',
+                          policies=pagination.items,
+                          pagination=pagination,
+                          counts=counts,
+                          buckets=renewal_worklist.BUCKETS,
+                          agencies=Agency.query.order_by(Agency.name).all(),
+                          selected_agent=lookup.selected_option(Agent, filters['agent_id']),
+                          **filters)
+
 # Show policy creation form
 @policy_bp.route('/create', methods=['GET'])
 def create_form():
-    agents = Agent.query.all()
-    customers = Customer.query.all()
-    return render_template('policy/create.html', agents=agents, customers=customers)
+    return render_template('policy/create.html')
 
 # Process policy creation
 @policy_bp.route('/create', methods=['POST'])
 def create():
     try:
-        # Validate required fields
-        agent_id = request.form.get('agent_id')
-        customer_id = request.form.get('customer_id')
-        policy_number = request.form.get('policy_number')
-        policy_type = request.form.get('policy_type')
-        start_date_str = request.form.get('start_date')
-        
-        if not agent_id:
-            flash('Agent is required', 'danger')
-            agents = Agent.query.all()
-            customers = Customer.query.all()
-            return render_template('policy/create.html', agents=agents, customers=customers)
-        
-        if not customer_id:
-            flash('Customer is required', 'danger')
-            agents = Agent.query.all()
-            customers = Customer.query.all()
-            return render_template('policy/create.html', agents=agents, customers=customers)
-        
-        if not policy_number or policy_number.strip() == '':
-            flash('Policy number is required', 'danger')
-            agents = Agent.query.all()
-            customers = Customer.query.all()
-            return render_template('policy/create.html', agents=agents, customers=customers)
-        
-        if not policy_type or policy_type.strip() == '':
-            flash('Policy type is required', 'danger')
-            agents = Agent.query.all()
-            customers = Customer.query.all()
-            return render_template('policy/create.html', agents=agents, customers=customers)
-        
-        if not start_date_str:
-            flash('Start date is required', 'danger')
-            agents = Agent.query.all()
-            customers = Customer.query.all()
-            return render_template('policy/create.html', agents=agents, customers=customers)
-        
-        # Parse dates
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        
-        end_date_str = request.form.get('end_date')
-        end_date = None
-        if end_date_str:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        
-        # Parse decimal values
-        coverage_amount = request.form.get('coverage_amount', 0)
-        premium = request.form.get('premium', 0)
+        # Validate with the rules shared with the CSV import
+        try:
+            values = validation.policy_values(request.form)
+        except validation.ValidationError as e:
+            flash(str(e), 'danger')
+            return render_template('policy/create.html',
+                                  **_selected(request.form.get('agent_id'), request.form.get('customer_id')))
         
         # Create new policy from form data
-        new_policy = Policy(
-            agent_id=agent_id,
-            customer_id=customer_id,
-            policy_number=policy_number.strip(),
-            policy_type=policy_type.strip(),
-            coverage_amount=coverage_amount,
-            premium=premium,
-            start_date=start_date,
-            end_date=end_date,
-            policy_status=request.form.get('policy_status', 'Active')
-        )
+        new_policy = Policy(**values)
         
         # Add to database
         db.session.add(new_policy)
@@ -149,24 +214,24 @@ def create():
     
     except SQLAlchemyError as e:
         db.session.rollback()
-        agents = Agent.query.all()
-        customers = Customer.query.all()
         flash(f'Error creating policy: {str(e)}', 'danger')
-        return render_template('policy/create.html', agents=agents, customers=customers)
+        return render_template('policy/create.html',
+                              **_selected(request.form.get('agent_id'), request.form.get('customer_id')))
 
 # Show policy details
 @policy_bp.route('/<int:policy_id>', methods=['GET'])
+@conditional(_policy_state)
+@cache.cached(_policy_tags)
 def view(policy_id):
-    policy = Policy.query.get_or_404(policy_id)
+    policy = Policy.query.options(*loaders.policy_detail()).get_or_404(policy_id)
     return render_template('policy/view.html', policy=policy)
 
 # Show policy edit form
 @policy_bp.route('/<int:policy_id>/edit', methods=['GET'])
 def edit_form(policy_id):
     policy = Policy.query.get_or_404(policy_id)
-    agents = Agent.query.all()
-    customers = Customer.query.all()
-    return render_template('policy/edit.html', policy=policy, agents=agents, customers=customers)
+    return render_template('policy/edit.html', policy=policy,
+                          **_selected(policy.agent_id, policy.customer_id))
 
 # Process policy update
 @policy_bp.route('/<int:policy_id>/edit', methods=['POST'])
@@ -174,25 +239,17 @@ def edit(policy_id):
     policy = Policy.query.get_or_404(policy_id)
     
     try:
-        # Parse dates
-        start_date_str = request.form.get('start_date')
-        if start_date_str:
-            policy.start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        
-        end_date_str = request.form.get('end_date')
-        if end_date_str:
-            policy.end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        else:
-            policy.end_date = None
+        # Validate with the rules shared with the create form and CSV import
+        try:
+            values = validation.policy_values(request.form)
+        except validation.ValidationError as e:
+            flash(str(e), 'danger')
+            return render_template('policy/edit.html', policy=policy,
+                                  **_selected(request.form.get('agent_id'), request.form.get('customer_id')))
         
         # Update policy from form data
-        policy.agent_id = request.form.get('agent_id')
-        policy.customer_id = request.form.get('customer_id')
-        policy.policy_number = request.form.get('policy_number')
-        policy.policy_type = request.form.get('policy_type')
-        policy.coverage_amount = request.form.get('coverage_amount', 0)
-        policy.premium = request.form.get('premium', 0)
-        policy.policy_status = request.form.get('policy_status')
+        for name, value in values.items():
+            setattr(policy, name, value)
         
         # Commit changes
         db.session.commit()
@@ -202,10 +259,9 @@ def edit(policy_id):
     
     except SQLAlchemyError as e:
         db.session.rollback()
-        agents = Agent.query.all()
-        customers = Customer.query.all()
         flash(f'Error updating policy: {str(e)}', 'danger')
-        return render_template('policy/edit.html', policy=policy, agents=agents, customers=customers)
+        return render_template('policy/edit.html', policy=policy,
+                              **_selected(request.form.get('agent_id'), request.form.get('customer_id')))
 
 # Delete policy
 @policy_bp.route('/<int:policy_id>/delete', methods=['POST'])
@@ -225,18 +281,51 @@ def delete(policy_id):
 
 # API endpoint to get policies
 @policy_bp.route('/api/policies', methods=['GET'])
+@conditional(_policies_state)
 def api_policies():
-    policies = Policy.query.all()
-    return jsonify([policy.to_dict() for policy in policies])
+    return api_list_response(Policy)
+
+# API endpoint for the renewal worklist
+@policy_bp.route('/api/renewals', methods=['GET'])
+def api_renewals():
+    filters = _renewal_filters()
+    limit = request.args.get('limit', current_app.config.get('ITEMS_PER_PAGE', 10), type=int)
+    limit = max(1, min(limit, current_app.config.get('API_MAX_LIMIT', 1000)))
+
+    schema = serializers.schema_for(Policy)
+    pagination = keyset_paginate(
+        renewal_worklist.worklist(schema.query(), **filters),
+        [Policy.end_date, Policy.policy_id],
+        cursor=request.args.get('cursor'),
+        per_page=limit
+    )
+    return jsonify({
+        'buckets': renewal_worklist.bucket_counts(filters['agent_id'], filters['agency_id']),
+        'policies': schema.serialize(pagination.items),
+        'next_cursor': pagination.next_cursor,
+    })
+
+# API endpoint for the policy typeahead on the claim form
+@policy_bp.route('/api/lookup', methods=['GET'])
+def api_lookup():
+    term = request.args.get('q', '').strip()
+    status = request.args.get('status', '').strip() or None
+    active = request.args.get('active', '').strip() in ('1', 'true')
+    limit = request.args.get('limit', type=int)
+    return jsonify(lookup.lookup_policies(term, limit=limit, status=status, active=active))
 
 # API endpoint to get policies for a specific customer
 @policy_bp.route('/api/by-customer/<int:customer_id>', methods=['GET'])
+@conditional(_customer_policies_state)
 def api_policies_by_customer(customer_id):
-    policies = Policy.query.filter_by(customer_id=customer_id).all()
-    return jsonify([policy.to_dict() for policy in policies])
+    schema = serializers.schema_for(Policy)
+    rows = db.session.execute(schema.select().where(Policy.customer_id == customer_id)).all()
+    return serializers.json_response(schema.serialize(rows))
 
 # API endpoint to get policies for a specific agent
 @policy_bp.route('/api/by-agent/<int:agent_id>', methods=['GET'])
+@conditional(_agent_policies_state)
 def api_policies_by_agent(agent_id):
-    policies = Policy.query.filter_by(agent_id=agent_id).all()
-    return jsonify([policy.to_dict() for policy in policies])
\ No newline at end of file
+    schema = serializers.schema_for(Policy)
+    rows = db.session.execute(schema.select().where(Policy.agent_id == agent_id)).all()
+    return serializers.json_response(schema.serialize(rows))
\ No newline at end of file
@@ -0,0 +1,18 @@
+from flask import Blueprint, request, jsonify
+from services import search
+
+search_bp = Blueprint('search', __name__)
+
+# API endpoint for ranked prefix search across customers, agents, policies and claims
+@search_bp.route('/api/search', methods=['GET'])
+def api_search():
+    term = request.args.get('q', '').strip()
+    entity = request.args.get('type', '').strip()
+    limit = request.args.get('limit', 10, type=int)
+    limit = max(1, min(limit, 50))
+
+    if entity and entity not in search.SEARCH_INDEXES:
+        return jsonify({'error': f"Unknown type '{entity}'"}), 400
+
+    hits = search.prefix_search(term, entities=[entity] if entity else None, limit=limit)
+    return jsonify(hits)
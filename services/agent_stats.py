@@ -0,0 +1,34 @@
+"""
+Policy statistics for a single agent, aggregated in the database.
+"""
+from sqlalchemy import select, func, case, distinct
+
+from models.database import db
+from models.policy import Policy
+
+
+def get_agent_stats(agent_id):
+    """Return policy totals for an agent using one grouped query.
+
+    The result does not depend on how many policies the agent has been
+    loaded into memory; only the aggregate row crosses the wire.
+    """
+    is_active = Policy.policy_status == 'Active'
+    row = db.session.execute(
+        select(
+            func.count(Policy.policy_id).label('policy_count'),
+            func.count(case((is_active, Policy.policy_id))).label('active_policy_count'),
+            func.count(distinct(Policy.customer_id)).label('customer_count'),
+            func.coalesce(func.sum(Policy.premium), 0).label('total_premium'),
+            func.coalesce(func.sum(case((is_active, Policy.premium))), 0).label('active_premium'),
+        ).where(Policy.agent_id == agent_id)
+    ).one()
+
+    return {
+        'agent_id': agent_id,
+        'policy_count': row.policy_count,
+        'active_policy_count': row.active_policy_count,
+        'customer_count': row.customer_count,
+        'total_premium': float(row.total_premium),
+        'active_premium': float(row.active_premium),
+    }
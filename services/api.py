@@ -0,0 +1,143 @@
+"""
+Shared implementation of the ``/api/...`` list endpoints.
+
+Query parameters understood by every list endpoint:
+
+- ``limit`` / ``cursor``: return at most ``limit`` rows after ``cursor``.
+  The cursor for the next page is sent in the ``X-Next-Cursor`` header and
+  as a ``Link: <...>; rel="next"`` header.
+- ``fields``: comma-separated column names. Only those columns are selected
+  and returned, without loading ORM objects or related rows.
+- ``format=ndjson``: one JSON object per line instead of a JSON array.
+
+Without ``limit`` the whole table is streamed with ``yield_per`` so memory
+stays flat regardless of the number of rows. Rows are read as column tuples
+and serialized and encoded a batch at a time (``services.serializers``).
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, current_app, jsonify, request, stream_with_context, url_for
+from sqlalchemy import select
+
+from models.database import db
+from services import serializers
+from services.pagination import decode_cursor, encode_cursor
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _projection(model, fields):
+    """Map requested field names to column attributes, or raise ``ValueError``."""
+    columns = model.__table__.columns
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in columns]
+    if unknown or not names:
+        raise ValueError(
+            f"Unknown field(s): {', '.join(unknown) or '(none given)'}. "
+            f"Available: {', '.join(columns.keys())}"
+        )
+    return names
+
+
+def _batches(statement, params=None, limit=None):
+    """The rows of ``statement``: one list when ``limit`` is given, else lists of at most ``API_STREAM_BATCH``."""
+    # Plain column tuples: run on the session's connection, skipping the ORM
+    # result layer
+    connection = db.session.connection()
+    if limit is not None:
+        return [connection.execute(statement, params).fetchmany(limit)]
+    batch = current_app.config.get('API_STREAM_BATCH', 500)
+    return connection.execute(statement, params, execution_options={'yield_per': batch}).partitions()
+
+
+def _json_array(batches, to_items):
+    yield b'['
+    first = True
+    for batch in batches:
+        items = to_items(batch)
+        if not items:
+            continue
+        # Each batch is encoded as one array; drop its brackets to splice it in
+        chunk = serializers.dumps(items)[1:-1]
+        yield chunk if first else b',' + chunk
+        first = False
+    yield b']'
+
+
+def _ndjson(batches, to_items):
+    for batch in batches:
+        yield b''.join(serializers.dumps(item) + b'\n' for item in to_items(batch))
+
+
+def api_list_response(model):
+    """Build the response for a list endpoint over ``model``.
+
+    Whole rows are serialized in batches by the model's
+    ``serializers.schema_for`` schema.
+    """
+    pk = getattr(model, model.__mapper__.primary_key[0].key)
+
+    cursor = request.args.get('cursor')
+    last_key = decode_cursor([pk], cursor)[1][0] if cursor else None
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, current_app.config.get('API_MAX_LIMIT', 1000)))
+
+    fields = request.args.get('fields')
+    if fields:
+        try:
+            names = _projection(model, fields)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        selected = [pk] + [getattr(model, name) for name in names if name != pk.key]
+        statement = select(*selected)
+        if last_key is not None:
+            statement = statement.where(pk > last_key)
+        statement = statement.order_by(pk.asc())
+        if limit is not None:
+            statement = statement.limit(limit + 1)
+        params = None
+
+        def to_items(rows):
+            return [{name: _json_value(getattr(row, name)) for name in names} for row in rows]
+    else:
+        schema = serializers.schema_for(model)
+        statement = schema.page(after=last_key is not None, limit=limit is not None)
+        params = {}
+        if last_key is not None:
+            params['after'] = last_key
+        if limit is not None:
+            params['limit'] = limit + 1
+        to_items = schema.serialize
+
+    next_cursor = None
+    if limit is not None:
+        rows, = _batches(statement, params, limit + 1)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([pk], rows[-1], 'next')
+        batches = [rows]
+    else:
+        batches = _batches(statement, params)
+
+    if request.args.get('format') == 'ndjson':
+        body, mimetype = _ndjson(batches, to_items), 'application/x-ndjson'
+    else:
+        body, mimetype = _json_array(batches, to_items), 'application/json'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **request.view_args, **args)}>; rel="next"'
+    return response
@@ -0,0 +1,416 @@
+"""
+Application cache: rendered pages and computed values, invalidated by tags.
+
+Every cached value is stored with the tags of the rows it was built from:
+``row(Model, key)`` for one row and ``table(Model)`` for any row of a table.
+Each tag has a random token in the store. An entry is stored with the tokens
+its tags had when it was computed, and is only served while all of them are
+unchanged. Invalidating a tag writes it a new token, so every entry tagged
+with it is dropped at once without being looked up. The entry and its tags'
+tokens are read in one round trip. Entry and tag keys include a hash of the
+app's database URL, so apps on different databases can share one store.
+
+After each commit the rows the transaction wrote (``changes.committed``,
+which also covers the set-based writers and ``ON DELETE CASCADE``) have
+their row tag and their table tag invalidated.
+
+The store is chosen with ``CACHE_BACKEND``:
+
+- ``filesystem`` (default): pickled files under ``CACHE_DIR`` (default
+  ``instance/cache``), shared by the workers of one host.
+- ``memory``: an LRU of ``CACHE_MAX_ENTRIES`` entries in each process. A
+  commit only invalidates the process that made it, so with several Gunicorn
+  workers the others would serve stale pages until ``CACHE_DEFAULT_TTL``
+  runs out; use it for a single process (``flask run``, the tests).
+- ``network``: a key-value server at ``CACHE_URL``, shared by every host.
+  ``redis://`` URLs need the ``redis`` package; ``local://`` is an in-process
+  stand-in with the same client interface, for development and tests.
+- ``none``: nothing is cached.
+
+``@cached(tags)`` caches the 200 responses of a GET view; ``remember``
+caches any value. Hits and misses are counted per endpoint (or name) and
+reported at ``/metrics`` while ``METRICS_ENABLED`` is on.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from flask import current_app, has_app_context, make_response, request, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from services import changes
+from services.conditional import CODE_STAMP
+
+
+_TAG_PREFIX = 'tag:'
+
+
+class MemoryBackend:
+    """Least recently used entries in this process, at most ``max_entries``."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                item = self._entries.get(key)
+                if item is not None and item[0] < now:
+                    del self._entries[key]
+                    item = None
+                if item is not None:
+                    self._entries.move_to_end(key)
+                values.append(None if item is None else item[1])
+        return values
+
+    def set_many(self, items, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else float('inf')
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileBackend:
+    """One pickled file per entry under ``directory``, shared by the processes of a host.
+
+    Files are written to a temporary name and renamed into place, so a
+    reader never sees half an entry. Once there are more than
+    ``max_entries`` files the least recently written ones are removed.
+    """
+
+    # Sets between two checks of the number of files
+    _PRUNE_EVERY = 64
+
+    def __init__(self, directory, max_entries=1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._sets = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.cache')
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return value if expires_at is None or expires_at > time.time() else None
+
+    def get_many(self, keys):
+        return [self._read(key) for key in keys]
+
+    def set_many(self, items, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        for key, value in items.items():
+            fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((expires_at, value), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self._path(key))
+        self._sets += len(items)
+        if self._sets >= self._PRUNE_EVERY:
+            self._sets = 0
+            self._prune()
+
+    def _prune(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_entries)]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(('.cache', '.tmp')):
+                self._remove(entry.path)
+
+
+class LocalClient:
+    """In-process stand-in for a networked key-value client (``local://``).
+
+    It has the four methods ``NetworkBackend`` calls, with the signatures of
+    the ``redis`` client's: ``mget``, ``set(key, value, ex=None)``,
+    ``delete(*keys)`` and ``flushdb``. Values are bytes, as on the wire.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def mget(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            items = [self._values.get(key) for key in keys]
+        return [value if expires_at is None or expires_at > now else None
+                for expires_at, value in (item or (None, None) for item in items)]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._values[key] = (time.monotonic() + ex if ex else None, bytes(value))
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+
+    def flushdb(self):
+        with self._lock:
+            self._values.clear()
+
+
+class NetworkBackend:
+    """Entries in a networked key-value store, shared by every process and host.
+
+    ``clear`` empties the client's whole database, so give the cache its own.
+    """
+
+    def __init__(self, client, prefix='insuremate:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [None if value is None else pickle.loads(value) for value in values]
+
+    def set_many(self, items, ttl=None):
+        for key, value in items.items():
+            self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                            ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        self.client.flushdb()
+
+
+def _network_client(url):
+    if url.startswith('local://'):
+        return LocalClient()
+    try:
+        import redis
+    except ImportError as e:  # optional: only needed for a redis:// CACHE_URL
+        raise RuntimeError(f'CACHE_URL {url} needs the redis package') from e
+    return redis.Redis.from_url(url)
+
+
+def create_backend(app):
+    """The store ``CACHE_BACKEND`` names, or ``None`` for ``none``."""
+    name = app.config.get('CACHE_BACKEND', 'filesystem')
+    max_entries = app.config.get('CACHE_MAX_ENTRIES', 1024)
+    if name == 'none':
+        return None
+    if name == 'memory':
+        return MemoryBackend(max_entries)
+    if name == 'filesystem':
+        directory = app.config.get('CACHE_DIR') or os.path.join(app.instance_path, 'cache')
+        return FileBackend(directory, max_entries)
+    if name == 'network':
+        return NetworkBackend(_network_client(app.config.get('CACHE_URL') or 'local://'))
+    raise ValueError(f'Unknown CACHE_BACKEND {name!r}: use memory, filesystem, network or none')
+
+
+def init_app(app):
+    """Open the store ``CACHE_BACKEND`` names for ``app``."""
+    app.extensions['cache'] = create_backend(app)
+
+
+def _backend():
+    return current_app.extensions.get('cache')
+
+
+@functools.lru_cache(maxsize=32)
+def _database_scope(uri):
+    return hashlib.sha1(uri.encode('utf-8')).hexdigest()[:16]
+
+
+def _scoped(key):
+    # Apps on other databases can share the store (one CACHE_DIR per host),
+    # so every entry and tag key carries a hash of this app's database URL
+    uri = str(current_app.config.get('SQLALCHEMY_DATABASE_URI') or '')
+    return f'{_database_scope(uri)}:{key}'
+
+
+def _tag_key(tag):
+    return _scoped(_TAG_PREFIX + tag)
+
+
+# Tags
+
+def row(model, key):
+    """The tag of the ``model`` row with primary key ``key``."""
+    return f'{model.__tablename__}:{key}'
+
+
+def table(model):
+    """The tag of every row of ``model``."""
+    return model.__tablename__
+
+
+def _tokens(backend, tags, found):
+    # A tag without a token (never invalidated, or evicted) gets one now, so an
+    # entry is never stored against a token that could come back
+    missing = {_tag_key(tag): secrets.token_hex(8)
+               for tag, token in zip(tags, found) if token is None}
+    if missing:
+        backend.set_many(missing)
+    return tuple(token if token is not None else missing[_tag_key(tag)]
+                 for tag, token in zip(tags, found))
+
+
+def invalidate(*tags):
+    """Drop every entry tagged with one of ``tags``."""
+    backend = _backend()
+    if backend is not None and tags:
+        backend.set_many({_tag_key(tag): secrets.token_hex(8) for tag in tags})
+
+
+def delete(key):
+    """Drop the entry ``key``."""
+    backend = _backend()
+    if backend is not None:
+        backend.delete(_scoped(key))
+
+
+def clear():
+    """Drop every entry and tag."""
+    backend = _backend()
+    if backend is not None:
+        backend.clear()
+
+
+# Hit and miss counts per endpoint (or name), per process, kept with the
+# other request metrics (METRICS_ENABLED)
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _count(name, hit):
+    if not current_app.config.get('METRICS_ENABLED'):
+        return
+    with _stats_lock:
+        counts = _stats.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def stats():
+    """``{name: {'hits': n, 'misses': n}}`` for every endpoint or name looked up."""
+    with _stats_lock:
+        return {name: {'hits': hits, 'misses': misses}
+                for name, (hits, misses) in sorted(_stats.items())}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+_MISS = object()
+
+
+def _lookup(backend, key, tags):
+    """``(value or _MISS, current tokens of tags)`` in one read."""
+    entry, *found = backend.get_many([key] + [_tag_key(tag) for tag in tags])
+    tokens = _tokens(backend, tags, found)
+    if entry is not None and entry[0] == tokens:
+        return entry[1], tokens
+    return _MISS, tokens
+
+
+def remember(key, tags, compute, ttl=None, name=None):
+    """The cached value of ``key``, or ``compute()`` stored under it with ``tags``.
+
+    ``ttl`` defaults to ``CACHE_DEFAULT_TTL``; 0 turns caching off.
+    """
+    backend = _backend()
+    ttl = current_app.config.get('CACHE_DEFAULT_TTL', 0) if ttl is None else ttl
+    if backend is None or ttl <= 0:
+        return compute()
+
+    value, tokens = _lookup(backend, _scoped(key), tuple(tags))
+    _count(name or key, value is not _MISS)
+    if value is _MISS:
+        value = compute()
+        backend.set_many({_scoped(key): (tokens, value)}, ttl)
+    return value
+
+
+def _view_key():
+    # The deployed code and today's date are part of every page, as in the ETags
+    parts = (CODE_STAMP, date.today().isoformat(), request.full_path)
+    return _scoped('view:' + hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest())
+
+
+def cached(tags):
+    """Serve GETs of the decorated view from the cache while ``tags(**view_args)`` are unchanged."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(**view_args):
+            backend = _backend()
+            ttl = current_app.config.get('CACHE_DEFAULT_TTL', 0)
+            # A pending flash message is part of the next page only
+            if backend is None or ttl <= 0 or request.method != 'GET' or '_flashes' in session:
+                return view(**view_args)
+
+            key = _view_key()
+            entry, tokens = _lookup(backend, key, tuple(tags(**view_args)))
+            _count(request.endpoint, entry is not _MISS)
+            if entry is not _MISS:
+                body, status, content_type = entry
+                return current_app.response_class(body, status, content_type=content_type)
+
+            response = make_response(view(**view_args))
+            if response.status_code == 200 and not response.is_streamed and not session.modified:
+                entry = (response.get_data(), response.status_code, response.content_type)
+                backend.set_many({key: (tokens, entry)}, ttl)
+            return response
+        return wrapped
+    return decorator
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(db_session):
+    keys = changes.committed(db_session)
+    if keys and has_app_context():
+        tags = {tag for entity, entity_id in keys for tag in (entity, f'{entity}:{entity_id}')}
+        invalidate(*tags)
@@ -0,0 +1,236 @@
+"""
+Incremental change feed: an append-only log of entity writes, read by cursor.
+
+Every insert, update and delete of an agency, agent, customer, policy or
+claim adds a ``ChangeLog`` row. ORM writes are picked up by session events.
+The set-based writers (lifecycle job, CSV import, seed, background deletes)
+bypass those events and call ``record`` with the keys they wrote. Rows whose
+parent delete cascades in the database (``ON DELETE CASCADE``) are looked
+up before the delete is flushed. The renewals of a deleted policy have their
+link cleared by ``clear_renewal_links`` first, as an ``UPDATE`` that bumps
+their version, rather than by ``ON DELETE SET NULL``.
+The pending changes are kept in ``session.info`` and written with one
+executemany ``INSERT`` just before the transaction commits; a rollback
+discards them. ``committed`` hands the same keys to ``after_commit``
+listeners such as the view cache.
+
+``feed`` reads the log after a cursor. Several changes to one row collapse
+into one entry carrying the row as it is now, and a row that no longer
+exists is sent as a tombstone. A sync therefore costs work in proportion to
+the changes since its cursor, not to the size of the tables.
+
+The ``change_id`` order is the commit order only because SQLite runs one
+write transaction at a time. On a server database two transactions can
+commit in the other order from their ids, and a client whose cursor moved
+past the later id would never see the earlier one, so ``head`` and ``feed``
+raise ``FeedUnavailable`` on any other dialect.
+"""
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import event, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Session
+
+from models.database import db
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from models.change_log import ChangeLog
+from services import serializers
+
+
+# Entity name in the feed -> model
+ENTITIES = {model.__tablename__: model for model in (Agency, Agent, Customer, Policy, Claim)}
+
+_TRACKED_MODELS = tuple(ENTITIES.values())
+
+_PENDING = 'pending_changes'
+_COMMITTING = 'committing_changes'
+
+
+def _entity(model):
+    return model.__tablename__
+
+
+def _key(obj):
+    return obj.__mapper__.primary_key_from_instance(obj)[0]
+
+
+def record(model, ids, operation):
+    """Log ``operation`` on the ``model`` rows ``ids`` when the session next commits."""
+    pending = db.session.info.setdefault(_PENDING, {})
+    entity = _entity(model)
+    for entity_id in ids:
+        pending[(entity, entity_id)] = operation
+
+
+def clear_renewal_links(policy_ids):
+    """Clear ``renewed_from_id`` on the renewals of ``policy_ids`` before those are deleted.
+
+    ``ON DELETE SET NULL`` would clear it without bumping the renewal's
+    ``version`` and ``updated_at``, leaving its ETag and feed entry stale.
+    Renewals that are themselves in ``policy_ids`` are left to the delete.
+    """
+    renewals = db.session.scalars(
+        update(Policy)
+        .where(Policy.renewed_from_id.in_(policy_ids), Policy.policy_id.not_in(policy_ids))
+        .values(renewed_from_id=None, version=Policy.version + 1, updated_at=datetime.utcnow())
+        .returning(Policy.policy_id)
+        .execution_options(synchronize_session='fetch')).all()
+    record(Policy, renewals, 'update')
+
+
+def _keys(model, where, operation):
+    pk = getattr(model, model.__mapper__.primary_key[0].key)
+    return select(literal(_entity(model)), pk, literal(operation)).where(where)
+
+
+def _cascaded(obj):
+    """SELECTs of (entity, id, operation) for the rows the database changes when ``obj`` is deleted."""
+    if isinstance(obj, Policy):
+        return [_keys(Claim, Claim.policy_id == obj.policy_id, 'delete')]
+    if isinstance(obj, Agency):
+        agents = select(Agent.agent_id).where(Agent.agency_id == obj.agency_id)
+        owned = Policy.agent_id.in_(agents)
+        steps = [_keys(Agent, Agent.agency_id == obj.agency_id, 'delete')]
+    elif isinstance(obj, Agent):
+        owned = Policy.agent_id == obj.agent_id
+        steps = []
+    elif isinstance(obj, Customer):
+        owned = Policy.customer_id == obj.customer_id
+        steps = []
+    else:
+        return []
+    policies = select(Policy.policy_id).where(owned)
+    return steps + [_keys(Policy, owned, 'delete'),
+                    _keys(Claim, Claim.policy_id.in_(policies), 'delete')]
+
+
+@event.listens_for(Session, 'before_flush')
+def _record_cascades(session, flush_context, instances):
+    selects = [keys for obj in session.deleted if isinstance(obj, _TRACKED_MODELS)
+               for keys in _cascaded(obj)]
+    if not selects:
+        return
+    # One round trip for every delete in the flush
+    pending = session.info.setdefault(_PENDING, {})
+    policies = [obj.policy_id for obj in session.deleted if isinstance(obj, Policy)]
+    for entity, entity_id, operation in session.execute(union_all(*selects)):
+        pending.setdefault((entity, entity_id), operation)
+        if entity == 'policy' and operation == 'delete':
+            policies.append(entity_id)
+    if policies:
+        clear_renewal_links(policies)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed(session, flush_context):
+    pending = session.info.setdefault(_PENDING, {})
+    for obj in session.new:
+        if isinstance(obj, _TRACKED_MODELS):
+            pending[(_entity(obj), _key(obj))] = 'insert'
+    for obj in session.dirty:
+        if isinstance(obj, _TRACKED_MODELS) and session.is_modified(obj, include_collections=False):
+            # An insert and later update in one transaction is still an insert
+            pending.setdefault((_entity(obj), _key(obj)), 'update')
+    for obj in session.deleted:
+        if isinstance(obj, _TRACKED_MODELS):
+            pending[(_entity(obj), _key(obj))] = 'delete'
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_changes(session):
+    # Flush first so the last changes of the transaction reach session.info
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        session.info[_COMMITTING] = list(pending)
+        now = datetime.utcnow()
+        session.execute(insert(ChangeLog.__table__), [
+            {'entity': entity, 'entity_id': entity_id, 'operation': operation, 'changed_at': now}
+            for (entity, entity_id), operation in pending.items()
+        ])
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop(_PENDING, None)
+    session.info.pop(_COMMITTING, None)
+
+
+def committed(session):
+    """The ``(entity, id)`` keys written by the transaction ``session`` just committed.
+
+    For ``after_commit`` listeners; each commit's keys are handed out once.
+    """
+    return session.info.pop(_COMMITTING, [])
+
+
+class FeedUnavailable(RuntimeError):
+    """The database does not commit changes in ``change_id`` order."""
+
+
+def _require_single_writer():
+    dialect = db.engine.dialect.name
+    if dialect != 'sqlite':
+        raise FeedUnavailable(
+            f'The change feed needs SQLite, which commits in change_id order; not {dialect}')
+
+
+def head():
+    """The ``change_id`` of the latest change, 0 while the log is empty."""
+    _require_single_writer()
+    return db.session.scalar(select(func.max(ChangeLog.change_id))) or 0
+
+
+def _current_rows(entity, ids, today):
+    schema = serializers.schema_for(ENTITIES[entity])
+    rows = db.session.execute(schema.select().where(schema.pk.in_(ids))).all()
+    return {item[schema.pk.key]: item for item in schema.serialize(rows, today)}
+
+
+def feed(since, limit=None):
+    """The changes after ``since`` as ``(entries, last change_id read, more follow)``.
+
+    Each entry is ``{change_id, entity, id, operation, changed_at, data}``
+    with ``data`` the row as the list APIs return it, or ``None`` for a tombstone.
+    """
+    _require_single_writer()
+    limit = limit or current_app.config.get('API_MAX_LIMIT', 1000)
+    changes = db.session.scalars(
+        select(ChangeLog)
+        .where(ChangeLog.change_id > since)
+        .order_by(ChangeLog.change_id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if not changes:
+        return [], since, False
+
+    latest = {}
+    for change in changes:
+        latest.pop((change.entity, change.entity_id), None)
+        latest[(change.entity, change.entity_id)] = change
+
+    ids = {}
+    for entity, entity_id in latest:
+        ids.setdefault(entity, []).append(entity_id)
+    today = date.today()
+    current = {entity: _current_rows(entity, keys, today) for entity, keys in ids.items()}
+
+    entries = []
+    for (entity, entity_id), change in latest.items():
+        data = current[entity].get(entity_id)
+        entries.append({
+            'change_id': change.change_id,
+            'entity': entity,
+            'id': entity_id,
+            # A row deleted by a later change than this page reaches is already gone
+            'operation': change.operation if data is not None else 'delete',
+            'changed_at': change.changed_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'data': data,
+        })
+    return entries, changes[-1].change_id, has_more
@@ -0,0 +1,122 @@
+"""
+Conditional GET: ``ETag`` validators built from row versions.
+
+Every entity row carries a ``version`` that the ORM bumps on each UPDATE
+(``version_id_col``) and an ``updated_at`` write time. A view decorated with
+``@conditional(validator)`` first runs ``validator(**view_args)``, which
+returns the SQL expressions describing the rows the page shows:
+
+- ``row(Model, key)``: the version and write time of one row;
+- ``rows(Model, *criteria)``: the count and latest write time of a set of
+  rows, so inserts, updates and deletes all change it;
+- ``table(Model)``: the same over the whole table.
+
+All of them are read in one SELECT. The ETag hashes their values with the
+request URL, today's date (several fields are computed from it) and a stamp
+of the deployed code. When the client's ``If-None-Match`` matches, the
+view is not run at all and a bodyless 304 is returned; otherwise the
+response carries the ETag, ``Last-Modified`` and ``Cache-Control:
+no-cache`` so the client revalidates on every use.
+
+Only ``If-None-Match`` is answered. ``If-Modified-Since`` is not, because a
+deleted row does not move the latest write time of what remains.
+"""
+import functools
+import hashlib
+import os
+from datetime import date, datetime
+
+from flask import make_response, request, session
+from sqlalchemy import func, select
+
+from models.database import db
+
+
+# Source directories whose files change what a response contains
+_SOURCES = ('models', 'routes', 'services', 'templates')
+
+
+def _code_stamp():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha1()
+    for source in _SOURCES:
+        for directory, dirnames, filenames in os.walk(os.path.join(root, source)):
+            dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+            for filename in sorted(filenames):
+                stat = os.stat(os.path.join(directory, filename))
+                digest.update(f'{directory}/{filename}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()
+
+
+# Taken once per process: a deploy that changes the code or templates
+# invalidates every ETag issued before it
+CODE_STAMP = _code_stamp()
+
+
+def _primary_key(model):
+    return getattr(model, model.__mapper__.primary_key[0].key)
+
+
+def row(model, key):
+    """The version and write time of the ``model`` row with primary key ``key``."""
+    where = _primary_key(model) == key
+    return (
+        select(model.version).where(where).scalar_subquery(),
+        select(model.updated_at).where(where).scalar_subquery(),
+    )
+
+
+def rows(model, *criteria):
+    """The number and latest write time of the ``model`` rows matching ``criteria``."""
+    return (
+        select(func.count()).select_from(model).where(*criteria).scalar_subquery(),
+        select(func.max(model.updated_at)).where(*criteria).scalar_subquery(),
+    )
+
+
+def table(model):
+    """The number and latest write time of all ``model`` rows."""
+    return rows(model)
+
+
+def _state(validator, view_args):
+    columns = [column for part in validator(**view_args) for column in part]
+    return db.session.execute(select(*columns)).one()
+
+
+def _last_modified(values):
+    written = [value for value in values if isinstance(value, datetime)]
+    return max(written) if written else None
+
+
+def etag_for(values):
+    """The ETag for a response built from the validator ``values``."""
+    parts = [CODE_STAMP, request.full_path, date.today().isoformat()]
+    parts.extend('' if value is None else str(value) for value in values)
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def conditional(validator):
+    """Answer GETs of the decorated view with 304 while ``validator``'s rows are unchanged."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(**view_args):
+            # A pending flash message is part of the next page, whatever the rows
+            if request.method != 'GET' or '_flashes' in session:
+                return view(**view_args)
+
+            values = _state(validator, view_args)
+            etag = etag_for(values)
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(view(**view_args))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.last_modified = _last_modified(values)
+                response.cache_control.no_cache = True
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,58 @@
+"""
+Dashboard snapshot: the home-page counters in one round trip, cached.
+
+The counts are read with a single SELECT of scalar subqueries and kept in
+the application cache (``services.cache``) for ``DASHBOARD_CACHE_TTL``
+seconds, tagged with every dashboard table: any commit that writes one of
+them drops the snapshot. With the per-worker ``memory`` backend other worker
+processes see the change once their TTL runs out.
+"""
+from flask import current_app
+from sqlalchemy import select, func
+
+from models.database import db
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from services import cache
+
+
+OPEN_CLAIM_STATUSES = Claim.OPEN_STATUSES
+
+_TAGS = [cache.table(model) for model in (Agency, Agent, Customer, Policy, Claim)]
+
+_KEY = 'dashboard:counts'
+
+
+def _count(column):
+    return select(func.count(column)).scalar_subquery()
+
+
+def _query_counts():
+    row = db.session.execute(
+        select(
+            _count(Agency.agency_id).label('agency_count'),
+            _count(Agent.agent_id).label('agent_count'),
+            _count(Customer.customer_id).label('customer_count'),
+            _count(Policy.policy_id).label('policy_count'),
+            _count(Claim.claim_id).label('claim_count'),
+            select(func.count(Claim.claim_id))
+            .where(Claim.is_open())
+            .scalar_subquery()
+            .label('open_claim_count'),
+        )
+    ).one()
+    return dict(row._mapping)
+
+
+def get_dashboard_counts():
+    """Return the dashboard counters, from cache while the snapshot is fresh."""
+    ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 0)
+    return dict(cache.remember(_KEY, _TAGS, _query_counts, ttl=ttl, name='dashboard'))
+
+
+def invalidate():
+    """Drop the cached snapshot so the next request recomputes it."""
+    cache.delete(_KEY)
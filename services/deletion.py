@@ -0,0 +1,176 @@
+"""
+Deleting an agency or customer together with everything underneath it.
+
+The foreign keys cascade in the database (``ON DELETE CASCADE``) and the
+relationships use ``passive_deletes``, so an ordinary delete is a single
+``DELETE`` of the parent row and never loads the children. For a subtree of
+``DELETE_BACKGROUND_THRESHOLD`` rows or more, the delete instead runs in a
+background thread: claims, then policies, then agents, then the parent,
+``DELETE_CHUNK_SIZE`` rows per transaction. No single transaction holds the
+write lock for long, and progress is recorded on a ``JobRun`` that the
+``/jobs/api/<id>`` endpoint reports.
+
+A background delete lives only as long as its process. When a Gunicorn
+worker stops it gives its deletes part of the graceful timeout to finish
+(``shutdown``), and when the server starts, deletes a previous server left
+``Running`` are marked failed (``fail_interrupted``). Deleting the parent
+again removes what is left, since the parent row goes last.
+"""
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+
+from models.database import db
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from models.job_run import JobRun
+from services import changes
+from services import dashboard
+from services.pagination import clear_count_cache
+
+
+_workers_lock = threading.Lock()
+_workers = []
+
+
+def _agency_steps(agency_id):
+    agents = select(Agent.agent_id).where(Agent.agency_id == agency_id)
+    policies = select(Policy.policy_id).where(Policy.agent_id.in_(agents))
+    return [
+        (Claim.claim_id, Claim.policy_id.in_(policies)),
+        (Policy.policy_id, Policy.agent_id.in_(agents)),
+        (Agent.agent_id, Agent.agency_id == agency_id),
+        (Agency.agency_id, Agency.agency_id == agency_id),
+    ]
+
+
+def _customer_steps(customer_id):
+    policies = select(Policy.policy_id).where(Policy.customer_id == customer_id)
+    return [
+        (Claim.claim_id, Claim.policy_id.in_(policies)),
+        (Policy.policy_id, Policy.customer_id == customer_id),
+        (Customer.customer_id, Customer.customer_id == customer_id),
+    ]
+
+
+# kind -> the (primary key, WHERE clause) of each table to empty, children first
+SUBTREES = {
+    'agency': _agency_steps,
+    'customer': _customer_steps,
+}
+
+
+def subtree_size(kind, key):
+    """Rows a delete of ``kind`` ``key`` removes, the parent included."""
+    counts = [select(func.count(pk)).where(where).scalar_subquery()
+              for pk, where in SUBTREES[kind](key)]
+    return sum(db.session.execute(select(*counts)).one())
+
+
+def background_size(kind, key):
+    """The subtree size when it is large enough to delete in the background, else None."""
+    threshold = current_app.config.get('DELETE_BACKGROUND_THRESHOLD', 0)
+    if threshold <= 0:
+        return None
+    size = subtree_size(kind, key)
+    return size if size >= threshold else None
+
+
+def delete_subtree(job_run, kind, key, chunk_size):
+    """Delete the subtree a chunk at a time, recording progress on ``job_run``."""
+    try:
+        for pk, where in SUBTREES[kind](key):
+            while True:
+                ids = db.session.scalars(select(pk).where(where).limit(chunk_size)).all()
+                if not ids:
+                    break
+                if pk.class_ is Policy:
+                    # Renewals of these policies outside the chunk keep their row
+                    changes.clear_renewal_links(ids)
+                db.session.execute(delete(pk.class_).where(pk.in_(ids))
+                                   .execution_options(synchronize_session=False))
+                changes.record(pk.class_, ids, 'delete')
+                job_run.deleted_count += len(ids)
+                db.session.commit()
+        job_run.status = 'Succeeded'
+    except Exception as e:
+        db.session.rollback()
+        job_run.status = 'Failed'
+        job_run.error = str(e)
+        raise
+    finally:
+        job_run.finished_at = datetime.utcnow()
+        db.session.commit()
+        dashboard.invalidate()
+        clear_count_cache()
+
+
+def _run(app, job_run_id, kind, key, chunk_size):
+    with app.app_context():
+        job_run = db.session.get(JobRun, job_run_id)
+        try:
+            delete_subtree(job_run, kind, key, chunk_size)
+        except Exception:
+            app.logger.exception('Background delete of %s %s failed', kind, key)
+        finally:
+            db.session.remove()
+
+
+def start(kind, key, total=None):
+    """Start deleting ``kind`` ``key`` in a background thread; return its ``JobRun``."""
+    job_run = JobRun(job=f'delete-{kind}', target=f'{kind}:{key}', started_at=datetime.utcnow(),
+                     total_count=subtree_size(kind, key) if total is None else total)
+    db.session.add(job_run)
+    db.session.commit()
+
+    chunk_size = current_app.config.get('DELETE_CHUNK_SIZE', 1000)
+    worker = threading.Thread(
+        target=_run,
+        args=(current_app._get_current_object(), job_run.job_run_id, kind, key, chunk_size),
+        name=f'delete-{kind}-{key}',
+        daemon=True
+    )
+    with _workers_lock:
+        _workers[:] = [(w, job_run_id) for w, job_run_id in _workers if w.is_alive()]
+        _workers.append((worker, job_run.job_run_id))
+    worker.start()
+    return job_run
+
+
+def wait(timeout=None):
+    """Block until the background deletes started so far have finished."""
+    with _workers_lock:
+        workers = list(_workers)
+    for worker, _ in workers:
+        worker.join(timeout)
+
+
+INTERRUPTED = 'Interrupted: the process running the delete stopped. Delete the parent again to finish.'
+
+
+def fail_interrupted(job_run_ids=None):
+    """Mark background deletes still 'Running' as failed, all or only ``job_run_ids``; return how many.
+
+    Only call it for all deletes when no process can be running one, as on
+    server start.
+    """
+    query = JobRun.query.filter(JobRun.status == 'Running', JobRun.job.like('delete-%'))
+    if job_run_ids is not None:
+        query = query.filter(JobRun.job_run_id.in_(job_run_ids))
+    failed = query.update({'status': 'Failed', 'finished_at': datetime.utcnow(), 'error': INTERRUPTED},
+                          synchronize_session=False)
+    db.session.commit()
+    return failed
+
+
+def shutdown(timeout=None):
+    """Give this process's background deletes ``timeout`` seconds, then mark the rest failed."""
+    wait(timeout)
+    with _workers_lock:
+        running = [job_run_id for worker, job_run_id in _workers if worker.is_alive()]
+    return fail_interrupted(running) if running else 0
@@ -0,0 +1,153 @@
+"""
+Nightly policy lifecycle job: keep ``policy_status`` in step with the dates.
+
+Each step changes policies a chunk at a time with set-based statements, not
+by loading and saving rows one by one:
+
+- expire: Active policies whose end date has passed become Expired, with one
+  ``UPDATE ... WHERE policy_id IN (...)`` per chunk of ids
+- activate: Pending renewals whose start date has arrived become Active,
+  the same way
+- renew (optional): Active policies ending within ``RENEWAL_LEAD_DAYS`` and
+  not yet renewed get a Pending renewal policy, one executemany ``INSERT``
+  per chunk
+
+Every step selects its rows through the ``(policy_status, end_date)`` or
+``(policy_status, start_date)`` index and commits per chunk, so a run holds
+write locks only briefly. Each run is recorded as a ``JobRun`` with the rows
+it changed and how long it took.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import aliased
+
+from models.database import db
+from models.policy import Policy
+from models.job_run import JobRun
+from services import changes
+from services import dashboard
+from services.pagination import clear_count_cache
+
+
+JOB_NAME = 'policy-lifecycle'
+
+
+def _set_status(where, status, chunk_size):
+    """Set ``policy_status`` on every policy matching ``where``; return the count."""
+    changed = 0
+    while True:
+        # Ids first: MySQL rejects LIMIT inside an IN subquery
+        ids = db.session.scalars(select(Policy.policy_id).where(*where).limit(chunk_size)).all()
+        if not ids:
+            return changed
+        db.session.execute(
+            update(Policy)
+            .where(Policy.policy_id.in_(ids))
+            # Bulk UPDATEs bypass the ORM's version counter; bump it by hand
+            .values(policy_status=status, version=Policy.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        changes.record(Policy, ids, 'update')
+        db.session.commit()
+        changed += len(ids)
+        if len(ids) < chunk_size:
+            return changed
+
+
+def expire_policies(today, chunk_size):
+    return _set_status([Policy.policy_status == 'Active', Policy.end_date < today],
+                       'Expired', chunk_size)
+
+
+def activate_renewals(today, chunk_size):
+    return _set_status([Policy.policy_status == 'Pending', Policy.start_date <= today,
+                        Policy.renewed_from_id.isnot(None)],
+                       'Active', chunk_size)
+
+
+def renewal_number(policy_number, start_date):
+    return f"{policy_number}-R{start_date:%Y%m%d}"
+
+
+def renewals_due(today, lead_days):
+    """Active policies ending within ``lead_days`` that have no renewal yet."""
+    renewal = aliased(Policy)
+    return select(
+        Policy.policy_id, Policy.agent_id, Policy.customer_id, Policy.policy_number,
+        Policy.policy_type, Policy.coverage_amount, Policy.premium,
+        Policy.start_date, Policy.end_date
+    ).where(
+        Policy.policy_status == 'Active',
+        Policy.end_date.between(today, today + timedelta(days=lead_days)),
+        ~select(renewal.policy_id).where(renewal.renewed_from_id == Policy.policy_id).exists()
+    ).order_by(Policy.end_date, Policy.policy_id)
+
+
+def renew_policies(today, chunk_size, lead_days):
+    """Create a Pending renewal for each Active policy ending within ``lead_days``."""
+    due = renewals_due(today, lead_days).limit(chunk_size)
+    created = 0
+    while True:
+        rows = db.session.execute(due).all()
+        if not rows:
+            return created
+        values = []
+        for row in rows:
+            start_date = row.end_date + timedelta(days=1)
+            values.append({
+                'agent_id': row.agent_id,
+                'customer_id': row.customer_id,
+                'policy_number': renewal_number(row.policy_number, start_date),
+                'policy_type': row.policy_type,
+                'coverage_amount': row.coverage_amount,
+                'premium': row.premium,
+                'start_date': start_date,
+                'end_date': start_date + (row.end_date - row.start_date),
+                'policy_status': 'Pending',
+                'renewed_from_id': row.policy_id,
+            })
+        ids = db.session.scalars(insert(Policy).returning(Policy.policy_id), values).all()
+        changes.record(Policy, ids, 'insert')
+        db.session.commit()
+        created += len(values)
+        if len(rows) < chunk_size:
+            return created
+
+
+def run(today=None, renew=False, chunk_size=None):
+    """Run the lifecycle steps once and return the recorded ``JobRun``.
+
+    A failing step is recorded on the run (status Failed) and re-raised;
+    the chunks committed before it stay applied.
+    """
+    today = today or datetime.today().date()
+    chunk_size = chunk_size or current_app.config.get('LIFECYCLE_CHUNK_SIZE', 1000)
+
+    job_run = JobRun(job=JOB_NAME, started_at=datetime.utcnow())
+    db.session.add(job_run)
+    db.session.commit()
+    try:
+        job_run.expired_count = expire_policies(today, chunk_size)
+        job_run.activated_count = activate_renewals(today, chunk_size)
+        if renew:
+            lead_days = current_app.config.get('RENEWAL_LEAD_DAYS', 30)
+            job_run.renewed_count = renew_policies(today, chunk_size, lead_days)
+        job_run.status = 'Succeeded'
+    except Exception as e:
+        db.session.rollback()
+        job_run.status = 'Failed'
+        job_run.error = str(e)
+        raise
+    finally:
+        job_run.finished_at = datetime.utcnow()
+        db.session.commit()
+        if job_run.rows_changed():
+            dashboard.invalidate()
+            clear_count_cache()
+    return job_run
+
+
+def recent_runs(limit=10):
+    return JobRun.query.filter_by(job=JOB_NAME).order_by(JobRun.started_at.desc()).limit(limit).all()
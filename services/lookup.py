@@ -0,0 +1,86 @@
+"""
+Typeahead lookups for the agent, customer and policy pickers on the forms.
+
+The create and edit forms used to render every agent, customer and active
+policy as an ``<option>`` tag. They now render a text box that asks one of
+the ``/api/lookup`` endpoints for the first few matches as the user types.
+Each lookup reuses the list-view search filters (FTS prefix match on SQLite)
+and walks the name/number index in order, so it reads ``limit`` rows no
+matter how large the table is.
+"""
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models import loaders
+from services import search
+
+
+LOOKUP_LIMIT = 10
+LOOKUP_MAX_LIMIT = 50
+
+
+def agent_option(agent):
+    return {'id': agent.agent_id, 'label': f'{agent.full_name()} ({agent.agency.name})'}
+
+
+def customer_option(customer):
+    return {'id': customer.customer_id, 'label': customer.full_name()}
+
+
+def policy_option(policy):
+    return {
+        'id': policy.policy_id,
+        'label': f'{policy.policy_number} - {policy.customer.full_name()} ({policy.policy_type})',
+    }
+
+
+def _limit(limit):
+    if limit is None:
+        return LOOKUP_LIMIT
+    return max(1, min(limit, LOOKUP_MAX_LIMIT))
+
+
+def lookup_agents(term='', limit=None):
+    query = Agent.query.options(*loaders.agent_options())
+    if term:
+        query = search.filter_agents(query, term)
+    query = query.order_by(Agent.last_name, Agent.first_name, Agent.agent_id)
+    return [agent_option(agent) for agent in query.limit(_limit(limit))]
+
+
+def lookup_customers(term='', limit=None):
+    query = Customer.query
+    if term:
+        query = search.filter_customers(query, term)
+    query = query.order_by(Customer.last_name, Customer.first_name, Customer.customer_id)
+    return [customer_option(customer) for customer in query.limit(_limit(limit))]
+
+
+def lookup_policies(term='', limit=None, status=None, active=False):
+    query = Policy.query.options(*loaders.policy_options())
+    if term:
+        query = search.filter_policies(query, term)
+    if status:
+        query = query.filter(Policy.policy_status == status)
+    if active:
+        # In force today: status Active and within the start/end dates
+        query = query.filter(Policy.is_active())
+    query = query.order_by(Policy.policy_number)
+    return [policy_option(policy) for policy in query.limit(_limit(limit))]
+
+
+def selected_option(model, key):
+    """The option for a submitted id, so a re-rendered form keeps the choice."""
+    if not key:
+        return None
+    options = {
+        Agent: (loaders.agent_options(), agent_option),
+        Customer: ((), customer_option),
+        Policy: (loaders.policy_options(), policy_option),
+    }
+    loader_options, to_option = options[model]
+    try:
+        instance = model.query.options(*loader_options).get(int(key))
+    except (TypeError, ValueError):
+        return None
+    return to_option(instance) if instance else None
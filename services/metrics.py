@@ -0,0 +1,259 @@
+"""
+Per-request performance metrics, exposed at ``/metrics`` in Prometheus text format.
+
+Each request is timed from ``before_request`` to ``after_request``. While it
+runs, the engine's ``before/after_cursor_execute`` events add up the SQL
+statements it sends and the time spent in them, and the ``before_render_template``
+and ``template_rendered`` signals add up the Jinja render time. When the
+request finishes these are folded into per-endpoint series and reported back
+to the browser in a ``Server-Timing`` header (``app``, ``db`` and ``render``).
+A streamed response (the ``/api`` lists and the CSV exports) runs most of its
+SQL while the body is sent, after the headers have gone out. Its header can
+only report the work done before the stream started, but its series are
+recorded when the stream closes, so the latency and SQL totals include the
+whole body.
+
+The cache's hit and miss counts per endpoint (``services.cache``) are
+reported alongside. The series live in process memory: every Gunicorn
+worker keeps and reports its own. Recording a request is a few ``perf_counter`` calls and one locked
+dict update; see "Metrics" in the README for the measured overhead.
+Set ``METRICS_ENABLED`` to false to switch all of it off.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import current_app, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+
+from models.database import db
+from services import cache
+
+
+PREFIX = 'insuremate'
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Endpoint label for requests that matched no route (keeps the label set bounded)
+UNMATCHED = '<unmatched>'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Series:
+    """Latency histogram and totals for one (endpoint, method)."""
+    __slots__ = ('buckets', 'count', 'seconds', 'statuses', 'queries', 'db_seconds',
+                 'render_seconds')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.statuses = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+_lock = threading.Lock()
+_series = {}
+
+# Timings of the request being handled; a ContextVar rather than ``g`` because
+# the cursor hooks run for every statement and must stay cheap
+_current = ContextVar('metrics_request', default=None)
+
+
+def reset():
+    """Forget every recorded series."""
+    with _lock:
+        _series.clear()
+
+
+def record(endpoint, method, status, seconds, queries=0, db_seconds=0.0, render_seconds=0.0):
+    """Add one finished request to the series for ``endpoint`` and ``method``."""
+    bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+    with _lock:
+        series = _series.get((endpoint, method))
+        if series is None:
+            series = _series[(endpoint, method)] = _Series()
+        series.buckets[bucket] += 1
+        series.count += 1
+        series.seconds += seconds
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+        series.queries += queries
+        series.db_seconds += db_seconds
+        series.render_seconds += render_seconds
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _copy(series):
+    copy = _Series()
+    copy.buckets = list(series.buckets)
+    copy.statuses = dict(series.statuses)
+    for name in ('count', 'seconds', 'queries', 'db_seconds', 'render_seconds'):
+        setattr(copy, name, getattr(series, name))
+    return copy
+
+
+def render():
+    """The recorded series in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = sorted((key, _copy(series)) for key, series in _series.items())
+
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+        lines.extend(f'{PREFIX}_{name}{suffix}{labels} {_number(value)}'
+                     for suffix, labels, value in samples)
+
+    def latency(endpoint, method, series):
+        cumulative = 0
+        for bound, hits in zip(LATENCY_BUCKETS + (None,), series.buckets):
+            cumulative += hits
+            le = '+Inf' if bound is None else repr(bound)
+            yield '_bucket', _labels(endpoint=endpoint, method=method, le=le), cumulative
+        yield '_sum', _labels(endpoint=endpoint, method=method), series.seconds
+        yield '_count', _labels(endpoint=endpoint, method=method), series.count
+
+    def statuses(endpoint, method, series):
+        for status, count in sorted(series.statuses.items()):
+            yield '', _labels(endpoint=endpoint, method=method, status=status), count
+
+    def total(attribute):
+        return lambda endpoint, method, series: [
+            ('', _labels(endpoint=endpoint, method=method), getattr(series, attribute))
+        ]
+
+    def samples(per_series):
+        for (endpoint, method), series in snapshot:
+            yield from per_series(endpoint, method, series)
+
+    family('http_request_duration_seconds', 'histogram',
+           'Time from the start of a request to its response being ready, or sent when streamed.',
+           samples(latency))
+    family('http_requests_total', 'counter', 'Requests answered, by status code.',
+           samples(statuses))
+    family('db_queries_total', 'counter', 'SQL statements sent while answering requests.',
+           samples(total('queries')))
+    family('db_seconds_total', 'counter', 'Time spent executing SQL statements in requests.',
+           samples(total('db_seconds')))
+    family('template_render_seconds_total', 'counter', 'Time spent rendering Jinja templates.',
+           samples(total('render_seconds')))
+
+    cached = cache.stats()
+    family('cache_hits_total', 'counter', 'Cache lookups answered from the cache.',
+           [('', _labels(endpoint=name), counts['hits']) for name, counts in cached.items()])
+    family('cache_misses_total', 'counter', 'Cache lookups that computed the value.',
+           [('', _labels(endpoint=name), counts['misses']) for name, counts in cached.items()])
+    return '\n'.join(lines) + '\n'
+
+
+def _enabled():
+    return current_app.config.get('METRICS_ENABLED', False)
+
+
+def _start_request():
+    if _enabled():
+        _current.set({'start': time.perf_counter(), 'queries': 0, 'db': 0.0, 'render': 0.0})
+
+
+class _StreamedBody:
+    """The body of a streamed response: its SQL is timed while it is sent,
+    and the request is recorded when the server closes it."""
+
+    def __init__(self, body, key, state):
+        self.body = body
+        self.key = key
+        self.state = state
+
+    def __iter__(self):
+        _current.set(self.state)
+        try:
+            yield from self.body
+        finally:
+            _current.set(None)
+
+    def close(self):
+        if hasattr(self.body, 'close'):
+            self.body.close()
+        state, self.state = self.state, None
+        if state is not None:
+            seconds = time.perf_counter() - state['start']
+            record(*self.key, seconds, state['queries'], state['db'], state['render'])
+
+
+def _finish_request(response):
+    state = _current.get()
+    if state is None:
+        return response
+    _current.set(None)
+    seconds = time.perf_counter() - state['start']
+    response.headers['Server-Timing'] = (
+        f'app;dur={seconds * 1000:.1f}, '
+        f'db;dur={state["db"] * 1000:.1f};desc="{state["queries"]} queries", '
+        f'render;dur={state["render"] * 1000:.1f}'
+    )
+    key = (request.endpoint or UNMATCHED, request.method, response.status_code)
+    if response.is_streamed:
+        response.response = _StreamedBody(response.response, key, state)
+    else:
+        record(*key, seconds, state['queries'], state['db'], state['render'])
+    return response
+
+
+def _clear_request(exc):
+    # after_request is skipped when an exception propagates (e.g. under TESTING)
+    _current.set(None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info['metrics_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    state = _current.get()
+    started = conn.info.pop('metrics_started', None)
+    if state is not None and started is not None:
+        state['db'] += time.perf_counter() - started
+        state['queries'] += 1
+
+
+def _before_render(sender, template, context, **extra):
+    state = _current.get()
+    if state is not None:
+        state.setdefault('render_started', []).append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    state = _current.get()
+    if state is not None and state.get('render_started'):
+        state['render'] += time.perf_counter() - state['render_started'].pop()
+
+
+def init_app(app):
+    """Hook the request, SQL and template timers into ``app`` and its engine."""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_clear_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
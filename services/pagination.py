@@ -0,0 +1,151 @@
+"""
+Keyset (cursor) pagination for the list views.
+
+Offset pagination reads and discards every row before the requested page and
+runs a ``COUNT(*)`` on each request. Keyset pagination instead remembers the
+sort key of the last row shown and asks for the rows that sort after it, so
+page 500 costs the same index seek as page 1. The total shown next to the
+pager comes from a per-filter count kept in the application cache
+(``services.cache``) for ``PAGINATION_COUNT_TTL`` seconds, or until a commit
+writes one of the tables it counts.
+"""
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import literal, tuple_
+from sqlalchemy.sql.util import find_tables
+from werkzeug.exceptions import BadRequest
+
+from services import cache
+
+
+# Tag of every cached total, for the writers that clear them all at once
+_COUNT_TAG = 'pagination:count'
+
+
+class KeysetPagination:
+    """One page of a keyset-paginated query, shaped for the list templates."""
+
+    is_keyset = True
+
+    def __init__(self, items, total, has_prev, has_next, prev_cursor, next_cursor):
+        self.items = items
+        self.total = total
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(columns, row, direction):
+    """Encode the sort key of ``row`` as an opaque URL-safe cursor."""
+    payload = {
+        'd': direction,
+        'k': [_encode_value(getattr(row, column.key)) for column in columns],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(columns, cursor):
+    """Return ``(direction, key values)`` for a cursor, or ``BadRequest``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        direction = payload['d']
+        values = payload['k']
+        if direction not in ('next', 'prev') or len(values) != len(columns):
+            raise ValueError(cursor)
+        return direction, [_decode_value(c, v) for c, v in zip(columns, values)]
+    except (ValueError, TypeError, KeyError) as e:
+        raise BadRequest('Invalid pagination cursor') from e
+
+
+def cached_count(query):
+    """Return ``query.count()``, reusing a recent result for the same filters.
+
+    The totals are entries of the application cache, so their number is
+    bounded by the backend and a commit to any table the query reads drops them.
+    """
+    statement = query.enable_eagerloads(False).statement
+    compiled = statement.compile()
+    params = sorted((k, repr(v)) for k, v in compiled.params.items())
+    key = 'count:' + hashlib.sha1(repr((str(compiled), params)).encode('utf-8')).hexdigest()
+    tables = {table.name for table in find_tables(statement, check_columns=True, include_joins=True)}
+    return cache.remember(key, sorted(tables) + [_COUNT_TAG], query.order_by(None).count,
+                          ttl=current_app.config.get('PAGINATION_COUNT_TTL', 0),
+                          name='pagination.count')
+
+
+def clear_count_cache():
+    """Drop every cached total."""
+    cache.invalidate(_COUNT_TAG)
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=10, descending=False):
+    """Return one page of ``query`` ordered by ``columns``.
+
+    ``columns`` must end with the primary key so the sort key is unique, and
+    every column is sorted in the same direction so the position can be
+    expressed as one row-value comparison that the matching index serves.
+    """
+    direction, key = ('next', None)
+    if cursor:
+        direction, key = decode_cursor(columns, cursor)
+
+    # Walking backwards flips both the comparison and the sort order.
+    reverse = direction == 'prev'
+    forward_desc = descending != reverse
+    position = tuple_(*columns)
+
+    page_query = query
+    if key is not None:
+        bound = tuple_(*[literal(value, column.type) for column, value in zip(columns, key)])
+        page_query = page_query.filter(position < bound if forward_desc else position > bound)
+    order = [c.desc() if forward_desc else c.asc() for c in columns]
+    rows = page_query.order_by(*order).limit(per_page + 1).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = key is not None, more
+
+    prev_cursor = encode_cursor(columns, rows[0], 'prev') if rows and has_prev else None
+    next_cursor = encode_cursor(columns, rows[-1], 'next') if rows and has_next else None
+
+    return KeysetPagination(
+        items=rows,
+        total=cached_count(query),
+        has_prev=has_prev,
+        has_next=has_next,
+        prev_cursor=prev_cursor,
+        next_cursor=next_cursor
+    )
+
+
+def keyset_requested(args):
+    """Whether a list request should use keyset instead of offset pagination."""
+    return 'cursor' in args or current_app.config.get('PAGINATION_MODE') == 'keyset'
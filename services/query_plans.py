@@ -0,0 +1,216 @@
+"""
+EXPLAIN QUERY PLAN checks for the queries behind the list views and dashboard.
+
+Each entry in ``QUERY_SHAPES`` rebuilds one statement the way the routes do
+(same filters, sort order, and loader options or read model). ``full_scans()`` runs SQLite's
+``EXPLAIN QUERY PLAN`` on every one of them and reports those whose plan
+reads a table from end to end instead of going through an index, except the
+few in ``EXPECTED_SCANS``, which scan on purpose.
+"""
+import re
+from datetime import date
+
+from sqlalchemy import select, text, tuple_, literal
+from sqlalchemy.orm import configure_mappers
+
+from models.database import db
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from models import loaders
+from models import read_models
+from services import search
+from services import renewals
+from services import lifecycle
+from services import serializers
+
+
+PER_PAGE = 10
+
+# "SCAN policy" is a full table scan; "SCAN policy USING INDEX ..." walks an index
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def _keyset(query, columns, values, descending=False):
+    bound = tuple_(*[literal(v, c.type) for c, v in zip(columns, values)])
+    position = tuple_(*columns)
+    query = query.filter(position < bound if descending else position > bound)
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return query.order_by(*order).limit(PER_PAGE + 1)
+
+
+def _policies(status=None, term=None, rows=True):
+    query = Policy.query
+    if term:
+        query = search.filter_policies(query, term)
+    if status:
+        query = query.filter(Policy.policy_status == status)
+    return read_models.PolicyRow.project(query) if rows else query.options(*loaders.policy_list())
+
+
+def _claims(status=None, term=None):
+    query = Claim.query
+    if term:
+        query = search.filter_claims(query, term)
+    if status:
+        query = query.filter(Claim.status == status)
+    return read_models.ClaimRow.project(query)
+
+
+def _people(model, term=None, options=()):
+    query = model.query.options(*options)
+    if term:
+        filters = {Agent: search.filter_agents, Customer: search.filter_customers}
+        query = filters[model](query, term)
+    return query
+
+
+def _people_rows(model, term=None):
+    rows = {Agent: read_models.AgentRow, Customer: read_models.CustomerRow}
+    return rows[model].project(_people(model, term))
+
+
+def _agencies(term=None):
+    query = search.filter_agencies(Agency.query, term) if term else Agency.query
+    return read_models.AgencyRow.project(query)
+
+
+def _api_page(model):
+    return serializers.schema_for(model).page(after=True, limit=True).params(after=1000, limit=PER_PAGE)
+
+
+def _page(query, *order):
+    return query.order_by(*order).limit(PER_PAGE).offset(PER_PAGE * 3)
+
+
+QUERY_SHAPES = {
+    # policy_routes.index
+    'policies: page': lambda: _page(_policies(), Policy.start_date.desc()),
+    'policies: page by status': lambda: _page(_policies(status='Active'), Policy.start_date.desc()),
+    'policies: search': lambda: _page(_policies(term='smith'), Policy.start_date.desc()),
+    'policies: keyset': lambda: _keyset(
+        _policies(), [Policy.start_date, Policy.policy_id], [date.today(), 1000], descending=True),
+    'policies: keyset by status': lambda: _keyset(
+        _policies(status='Active'), [Policy.start_date, Policy.policy_id], [date.today(), 1000],
+        descending=True),
+    # policy_routes.renewals
+    'renewals: page': lambda: _keyset(
+        renewals.worklist(_policies(rows=False)),
+        [Policy.end_date, Policy.policy_id], [date.today(), 1000]),
+    'renewals: page by bucket': lambda: _keyset(
+        renewals.worklist(_policies(rows=False), bucket='Critical'),
+        [Policy.end_date, Policy.policy_id], [date.today(), 1000]),
+    'renewals: page by agency': lambda: _keyset(
+        renewals.worklist(_policies(rows=False), agency_id=1),
+        [Policy.end_date, Policy.policy_id], [date.today(), 1000]),
+    'renewals: bucket counts': lambda: renewals.counts_query(),
+    'policies: by agent': lambda: Policy.query.filter_by(agent_id=1),
+    'policies: by customer': lambda: Policy.query.filter_by(customer_id=1),
+
+    # claim_routes.index
+    'claims: page': lambda: _page(_claims(), Claim.claim_date.desc()),
+    'claims: page by status': lambda: _page(_claims(status='Open'), Claim.claim_date.desc()),
+    'claims: search': lambda: _page(_claims(term='clm'), Claim.claim_date.desc()),
+    'claims: keyset': lambda: _keyset(
+        _claims(), [Claim.claim_date, Claim.claim_id], [date.today(), 1000], descending=True),
+    'claims: by policy': lambda: Claim.query.filter_by(policy_id=1),
+
+    # agent_routes.index and customer_routes.index
+    'agents: page': lambda: _page(
+        _people_rows(Agent), Agent.last_name.asc(), Agent.first_name.asc()),
+    'agents: search': lambda: _page(
+        _people_rows(Agent, term='doe'),
+        Agent.last_name.asc(), Agent.first_name.asc()),
+    'agents: keyset': lambda: _keyset(
+        _people_rows(Agent),
+        [Agent.last_name, Agent.first_name, Agent.agent_id], ['Doe', 'John', 1000]),
+    'agents: by agency': lambda: Agent.query.filter_by(agency_id=1),
+    'customers: page': lambda: _page(
+        _people_rows(Customer),
+        Customer.last_name.asc(), Customer.first_name.asc()),
+    'customers: search': lambda: _page(
+        _people_rows(Customer, term='smith'),
+        Customer.last_name.asc(), Customer.first_name.asc()),
+    'customers: keyset': lambda: _keyset(
+        _people_rows(Customer),
+        [Customer.last_name, Customer.first_name, Customer.customer_id], ['Smith', 'Jane', 1000]),
+
+    # agency_routes.index
+    'agencies: page': lambda: _page(_agencies(), Agency.agency_id.asc()),
+    'agencies: search': lambda: _page(_agencies(term='main'), Agency.agency_id.asc()),
+
+    # the /api list endpoints (services.api), one page after a cursor
+    'api: agencies': lambda: _api_page(Agency),
+    'api: agents': lambda: _api_page(Agent),
+    'api: customers': lambda: _api_page(Customer),
+    'api: policies': lambda: _api_page(Policy),
+    'api: claims': lambda: _api_page(Claim),
+
+    # typeahead lookups on the policy and claim forms
+    'agents: lookup': lambda: _people(Agent, term='doe', options=loaders.agent_options()).order_by(
+        Agent.last_name, Agent.first_name, Agent.agent_id).limit(PER_PAGE),
+    'customers: lookup': lambda: _people(Customer, term='smith').order_by(
+        Customer.last_name, Customer.first_name, Customer.customer_id).limit(PER_PAGE),
+    'policies: lookup': lambda: search.filter_policies(
+        Policy.query.options(*loaders.policy_options()), 'pol').filter(
+        Policy.is_active()).order_by(Policy.policy_number).limit(PER_PAGE),
+
+    # app.index
+    'dashboard: recent policies': lambda: Policy.query.order_by(Policy.start_date.desc()).limit(4),
+    'dashboard: upcoming renewals': lambda: renewals.upcoming(Policy.query, 4),
+    'dashboard: recent claims': lambda: Claim.query.order_by(Claim.claim_date.desc()).limit(4),
+    'dashboard: open claims': lambda: Claim.query.filter(
+        Claim.is_open()).order_by(Claim.claim_date.asc()).limit(4),
+
+    # flask policy-lifecycle
+    'lifecycle: expire': lambda: select(Policy.policy_id).where(
+        Policy.policy_status == 'Active', Policy.end_date < date.today()).limit(1000),
+    'lifecycle: activate renewals': lambda: select(Policy.policy_id).where(
+        Policy.policy_status == 'Pending', Policy.start_date <= date.today(),
+        Policy.renewed_from_id.isnot(None)).limit(1000),
+    'lifecycle: renewals due': lambda: lifecycle.renewals_due(date.today(), 30).limit(1000),
+
+    # agent_routes.view statistics panel
+    'agent stats': lambda: select(Policy.policy_id).where(Policy.agent_id == 1),
+}
+
+
+# Shapes that read their whole table, and why that is acceptable
+EXPECTED_SCANS = {
+    # One agency per ten agents: the page walks the primary key and stops
+    # after the page, and the table is read whole only to count it
+    'agencies: page': 'small table, read in primary key order',
+    # A substring match on five columns, which no B-tree index can serve
+    'agencies: search': 'small table, substring match',
+}
+
+
+def _statement(shape):
+    # the loader presets refer to backrefs, which exist once mappers are configured
+    configure_mappers()
+    statement = shape()
+    return getattr(statement, 'statement', statement)
+
+
+def explain(statement):
+    """Return the ``EXPLAIN QUERY PLAN`` detail lines for a statement."""
+    compiled = statement.compile(
+        dialect=db.engine.dialect,
+        compile_kwargs={'literal_binds': True}
+    )
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans():
+    """Return ``{shape name: plan lines}`` for every unexpected shape with a full table scan."""
+    offenders = {}
+    for name, shape in QUERY_SHAPES.items():
+        if name in EXPECTED_SCANS:
+            continue
+        plan = explain(_statement(shape))
+        if any(_FULL_SCAN.match(line) for line in plan):
+            offenders[name] = plan
+    return offenders
@@ -0,0 +1,95 @@
+"""
+Renewal worklist: Active policies whose end date falls in a window around today.
+
+The window is cut into the buckets of ``Policy.renewal_status()``:
+
+- Expired: ended within the last ``RENEWAL_LOOKBACK_DAYS`` but still Active
+- Critical: ends within ``Policy.RENEWAL_CRITICAL_DAYS``
+- Warning: ends within ``Policy.RENEWAL_WARNING_DAYS``
+- OK: ends within ``RENEWAL_HORIZON_DAYS``
+
+Every bucket is a date range, so each query is a range seek on the
+``(policy_status, end_date)`` index. Its cost follows the number of policies
+in the window, not the size of the table. Pages are keyset-paginated on
+``(end_date, policy_id)``.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, func
+
+from models.database import db
+from models.agent import Agent
+from models.policy import Policy
+
+
+BUCKETS = ('Expired', 'Critical', 'Warning', 'OK')
+
+
+def _today(today):
+    return today or datetime.today().date()
+
+
+def window(today=None):
+    """First and last end date (inclusive) on the worklist."""
+    today = _today(today)
+    lookback = current_app.config.get('RENEWAL_LOOKBACK_DAYS', 30)
+    horizon = current_app.config.get('RENEWAL_HORIZON_DAYS', 90)
+    return today - timedelta(days=lookback), today + timedelta(days=horizon)
+
+
+def bucket_range(bucket, today=None):
+    """First and last end date (inclusive) of one bucket, or ``ValueError``."""
+    today = _today(today)
+    first, last = window(today)
+    critical = today + timedelta(days=Policy.RENEWAL_CRITICAL_DAYS)
+    warning = today + timedelta(days=Policy.RENEWAL_WARNING_DAYS)
+    ranges = {
+        'Expired': (first, today - timedelta(days=1)),
+        'Critical': (today, critical),
+        'Warning': (critical + timedelta(days=1), warning),
+        'OK': (warning + timedelta(days=1), last),
+    }
+    if bucket not in ranges:
+        raise ValueError(f"Unknown renewal bucket '{bucket}'")
+    return ranges[bucket]
+
+
+def _filter(query, first, last, agent_id=None, agency_id=None):
+    query = query.filter(Policy.policy_status == 'Active',
+                         Policy.end_date.between(first, last))
+    if agent_id:
+        query = query.filter(Policy.agent_id == agent_id)
+    if agency_id:
+        query = query.filter(Policy.agent_id.in_(
+            select(Agent.agent_id).where(Agent.agency_id == agency_id)))
+    return query
+
+
+def worklist(query, bucket=None, agent_id=None, agency_id=None, today=None):
+    """Narrow a policy query to the worklist, or to one bucket of it."""
+    first, last = bucket_range(bucket, today) if bucket else window(today)
+    return _filter(query, first, last, agent_id, agency_id)
+
+
+def counts_query(agent_id=None, agency_id=None, today=None):
+    """``(bucket, policies)`` rows for the worklist in one grouped range scan."""
+    today = _today(today)
+    first, last = window(today)
+    bucket = Policy.renewal_status(today)
+    return _filter(db.session.query(bucket, func.count(Policy.policy_id)),
+                   first, last, agent_id, agency_id).group_by(bucket)
+
+
+def bucket_counts(agent_id=None, agency_id=None, today=None):
+    """Policies per bucket, every bucket present."""
+    counts = dict.fromkeys(BUCKETS, 0)
+    counts.update(counts_query(agent_id, agency_id, today).all())
+    return counts
+
+
+def upcoming(query, limit, today=None):
+    """The next ``limit`` Active policies to end, from today on."""
+    today = _today(today)
+    return query.filter(Policy.policy_status == 'Active', Policy.end_date >= today) \
+                .order_by(Policy.end_date.asc(), Policy.policy_id.asc()).limit(limit)
@@ -0,0 +1,377 @@
+"""
+Full-text search over customers, agents, policies and claims.
+
+On SQLite each searchable table has an FTS5 shadow table keyed by the same
+primary key (``customer_search.rowid == customer.customer_id``). Triggers on
+the source tables keep the shadow tables in sync for every write path: ORM
+commits, bulk inserts and set-based updates alike. Search terms are split
+into words and each word is matched as a prefix, so ``jan smi`` finds
+"Jane Smith" from the index instead of scanning the table with
+``ILIKE '%...%'``.
+
+On other databases, or when SQLite was built without FTS5, the filters fall
+back to the original ``ILIKE`` predicates.
+"""
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event, literal, or_, text, Integer
+from sqlalchemy.exc import OperationalError
+
+from models.database import db
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+
+
+# Indexed columns per entity, as SQL expressions over the source row.
+# ``{p}`` is replaced with ``new.`` inside triggers and with nothing when
+# backfilling from the table itself.
+SEARCH_INDEXES = {
+    'customer': {
+        'table': 'customer_search',
+        'source': 'customer',
+        'key': 'customer_id',
+        'columns': {
+            'name': "coalesce({p}first_name, '') || ' ' || coalesce({p}last_name, '')",
+            'email': "coalesce({p}email, '')",
+            'phone': "coalesce({p}phone, '')",
+        },
+        'watch': ['first_name', 'last_name', 'email', 'phone'],
+    },
+    'agent': {
+        'table': 'agent_search',
+        'source': 'agent',
+        'key': 'agent_id',
+        'columns': {
+            'name': "coalesce({p}first_name, '') || ' ' || coalesce({p}last_name, '')",
+            'email': "coalesce({p}email, '')",
+            'phone': "coalesce({p}phone, '')",
+        },
+        'watch': ['first_name', 'last_name', 'email', 'phone'],
+    },
+    'policy': {
+        'table': 'policy_search',
+        'source': 'policy',
+        'key': 'policy_id',
+        'columns': {
+            'policy_number': "{p}policy_number",
+            'policy_type': "{p}policy_type",
+        },
+        'watch': ['policy_number', 'policy_type'],
+    },
+    'claim': {
+        'table': 'claim_search',
+        'source': 'claim',
+        'key': 'claim_id',
+        'columns': {
+            'claim_number': "{p}claim_number",
+        },
+        'watch': ['claim_number'],
+    },
+}
+
+# The column shown as the label of a ranked search hit
+LABEL_COLUMNS = {
+    'customer': 'name',
+    'agent': 'name',
+    'policy': 'policy_number',
+    'claim': 'claim_number',
+}
+
+_available = {}
+
+
+def _expressions(spec, prefix):
+    return ', '.join(expr.format(p=prefix) for expr in spec['columns'].values())
+
+
+def search_index_ddl(spec):
+    """Return the statements that create one FTS table and its triggers."""
+    table, source, key = spec['table'], spec['source'], spec['key']
+    names = ', '.join(spec['columns'])
+    new_values = _expressions(spec, 'new.')
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+        f"{names}, tokenize='unicode61', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {source}_search_insert AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {table}(rowid, {names}) VALUES (new.{key}, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {source}_search_update "
+        f"AFTER UPDATE OF {', '.join(spec['watch'])} ON {source} BEGIN "
+        f"DELETE FROM {table} WHERE rowid = old.{key}; "
+        f"INSERT INTO {table}(rowid, {names}) VALUES (new.{key}, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {source}_search_delete AFTER DELETE ON {source} BEGIN "
+        f"DELETE FROM {table} WHERE rowid = old.{key}; END",
+    ]
+
+
+def search_index_backfill(spec, first_key=None):
+    """Return the statement that copies every source row (from ``first_key`` on) into the FTS table."""
+    names = ', '.join(spec['columns'])
+    statement = (
+        f"INSERT INTO {spec['table']}(rowid, {names}) "
+        f"SELECT {spec['key']}, {_expressions(spec, '')} FROM {spec['source']}"
+    )
+    if first_key is not None:
+        statement += f" WHERE {spec['key']} >= {int(first_key)}"
+    return statement
+
+
+def search_index_drop(spec):
+    return [
+        f"DROP TRIGGER IF EXISTS {spec['source']}_search_insert",
+        f"DROP TRIGGER IF EXISTS {spec['source']}_search_update",
+        f"DROP TRIGGER IF EXISTS {spec['source']}_search_delete",
+        f"DROP TABLE IF EXISTS {spec['table']}",
+    ]
+
+
+def is_search_table(name):
+    """Whether ``name`` is an FTS table or one of its shadow tables."""
+    return any(
+        name == spec['table'] or name.startswith(spec['table'] + '_')
+        for spec in SEARCH_INDEXES.values()
+    )
+
+
+def _table_exists(connection, name):
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': name}
+    ).first() is not None
+
+
+def install_search_index(connection):
+    """Create any missing FTS tables and triggers, backfilling new tables."""
+    if connection.dialect.name != 'sqlite':
+        return False
+    try:
+        for spec in SEARCH_INDEXES.values():
+            existed = _table_exists(connection, spec['table'])
+            for statement in search_index_ddl(spec):
+                connection.exec_driver_sql(statement)
+            if not existed:
+                connection.exec_driver_sql(search_index_backfill(spec))
+    except OperationalError:
+        # SQLite built without FTS5: keep using the ILIKE fallback
+        return False
+    return True
+
+
+def rebuild_search_index(connection):
+    """Repopulate every FTS table from its source table."""
+    for spec in SEARCH_INDEXES.values():
+        connection.exec_driver_sql(f"DELETE FROM {spec['table']}")
+        connection.exec_driver_sql(search_index_backfill(spec))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    _available[connection.engine.url] = install_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    for spec in SEARCH_INDEXES.values():
+        for statement in search_index_drop(spec):
+            connection.exec_driver_sql(statement)
+    _available[connection.engine.url] = False
+
+
+@contextmanager
+def bulk_load():
+    """Index the rows inserted inside the block in one pass instead of row by row.
+
+    The insert triggers are dropped for the duration of the block; afterwards
+    every row past the previous largest key is copied into its FTS table and
+    the triggers are put back. Meant for loaders that own the database while
+    they run (``flask seed``): rows inserted by others meanwhile with keys
+    below the starting point would not be indexed.
+    """
+    if not fts_available():
+        yield
+        return
+    with db.engine.begin() as connection:
+        first_keys = {}
+        for name, spec in SEARCH_INDEXES.items():
+            last_key = connection.exec_driver_sql(
+                f"SELECT max({spec['key']}) FROM {spec['source']}").scalar()
+            first_keys[name] = (last_key or 0) + 1
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {spec['source']}_search_insert")
+    try:
+        yield
+    finally:
+        with db.engine.begin() as connection:
+            for name, spec in SEARCH_INDEXES.items():
+                connection.exec_driver_sql(search_index_backfill(spec, first_keys[name]))
+            install_search_index(connection)
+
+
+def fts_available():
+    """Whether the FTS tables exist on the current database."""
+    engine = db.engine
+    if engine.url not in _available:
+        if engine.dialect.name != 'sqlite':
+            _available[engine.url] = False
+        else:
+            with engine.connect() as connection:
+                _available[engine.url] = all(
+                    _table_exists(connection, spec['table']) for spec in SEARCH_INDEXES.values()
+                )
+    return _available[engine.url]
+
+
+def match_expression(term, columns=None):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    words = re.findall(r'\w+', term.lower())
+    if not words:
+        return None
+    expression = ' '.join(f'"{word}"*' for word in words)
+    if columns:
+        expression = '{' + ' '.join(columns) + '} : (' + expression + ')'
+    return expression
+
+
+def matching_ids(entity, expression):
+    """A ``SELECT rowid`` over one FTS table, for use in ``IN (...)``."""
+    table = SEARCH_INDEXES[entity]['table']
+    return text(
+        f"SELECT rowid FROM {table} WHERE {table} MATCH :{table}_match"
+    ).bindparams(**{f'{table}_match': expression}).columns(rowid=Integer)
+
+
+# Filters used by the list views
+
+def filter_agencies(query, term):
+    """Substring match on the name, address, city, state or phone; agencies have no FTS table."""
+    return query.filter(
+        or_(
+            Agency.name.ilike(f'%{term}%'),
+            Agency.address.ilike(f'%{term}%'),
+            Agency.city.ilike(f'%{term}%'),
+            Agency.state.ilike(f'%{term}%'),
+            Agency.phone.ilike(f'%{term}%')
+        )
+    )
+
+
+def filter_customers(query, term):
+    expression = match_expression(term)
+    if expression and fts_available():
+        return query.filter(Customer.customer_id.in_(matching_ids('customer', expression)))
+    return query.filter(
+        or_(
+            Customer.first_name.ilike(f'%{term}%'),
+            Customer.last_name.ilike(f'%{term}%'),
+            Customer.email.ilike(f'%{term}%'),
+            Customer.phone.ilike(f'%{term}%')
+        )
+    )
+
+
+def filter_agents(query, term):
+    expression = match_expression(term)
+    if expression and fts_available():
+        return query.filter(Agent.agent_id.in_(matching_ids('agent', expression)))
+    return query.filter(
+        or_(
+            Agent.first_name.ilike(f'%{term}%'),
+            Agent.last_name.ilike(f'%{term}%'),
+            Agent.email.ilike(f'%{term}%'),
+            Agent.phone.ilike(f'%{term}%')
+        )
+    )
+
+
+def filter_policies(query, term):
+    """Match policy number/type, or the customer's or agent's name."""
+    expression = match_expression(term)
+    if expression and fts_available():
+        names = match_expression(term, columns=['name'])
+        return query.filter(
+            or_(
+                Policy.policy_id.in_(matching_ids('policy', expression)),
+                Policy.customer_id.in_(matching_ids('customer', names)),
+                Policy.agent_id.in_(matching_ids('agent', names))
+            )
+        )
+    return query.join(Customer).join(Agent).filter(
+        or_(
+            Policy.policy_number.ilike(f'%{term}%'),
+            Policy.policy_type.ilike(f'%{term}%'),
+            Customer.first_name.ilike(f'%{term}%'),
+            Customer.last_name.ilike(f'%{term}%'),
+            Agent.first_name.ilike(f'%{term}%'),
+            Agent.last_name.ilike(f'%{term}%')
+        )
+    )
+
+
+def filter_claims(query, term):
+    """Match the claim number or the policy number it was filed against."""
+    expression = match_expression(term)
+    if expression and fts_available():
+        numbers = match_expression(term, columns=['policy_number'])
+        return query.filter(
+            or_(
+                Claim.claim_id.in_(matching_ids('claim', expression)),
+                Claim.policy_id.in_(matching_ids('policy', numbers))
+            )
+        )
+    return query.join(Policy).filter(
+        or_(
+            Claim.claim_number.ilike(f'%{term}%'),
+            Policy.policy_number.ilike(f'%{term}%')
+        )
+    )
+
+
+# Ranked prefix search
+
+_FALLBACK_LABELS = {
+    'customer': (Customer.customer_id, Customer.first_name + ' ' + Customer.last_name,
+                 [Customer.first_name, Customer.last_name]),
+    'agent': (Agent.agent_id, Agent.first_name + ' ' + Agent.last_name,
+              [Agent.first_name, Agent.last_name]),
+    'policy': (Policy.policy_id, Policy.policy_number, [Policy.policy_number]),
+    'claim': (Claim.claim_id, Claim.claim_number, [Claim.claim_number]),
+}
+
+
+def prefix_search(term, entities=None, limit=10):
+    """Return the best ``limit`` hits for ``term`` as dicts, best first.
+
+    Each hit has ``entity``, ``id``, ``label`` and ``rank`` (lower is better).
+    """
+    entities = entities or list(SEARCH_INDEXES)
+    expression = match_expression(term)
+    if not expression:
+        return []
+
+    hits = []
+    for entity in entities:
+        if fts_available():
+            table = SEARCH_INDEXES[entity]['table']
+            rows = db.session.execute(
+                text(
+                    f"SELECT rowid, {LABEL_COLUMNS[entity]} AS label, bm25({table}) AS rank "
+                    f"FROM {table} WHERE {table} MATCH :expression ORDER BY rank LIMIT :limit"
+                ),
+                {'expression': expression, 'limit': limit}
+            )
+        else:
+            key, label, columns = _FALLBACK_LABELS[entity]
+            rows = db.session.query(key, label.label('label'), literal(0.0).label('rank')).filter(
+                or_(*[column.ilike(f'{term}%') for column in columns])
+            ).order_by(label).limit(limit)
+        hits.extend(
+            {'entity': entity, 'id': row[0], 'label': row.label, 'rank': row.rank}
+            for row in rows
+        )
+
+    hits.sort(key=lambda hit: hit['rank'])
+    return hits[:limit]
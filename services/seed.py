@@ -0,0 +1,292 @@
+"""
+Synthetic data at production scale for benchmarks and manual testing.
+
+``seed(scale)`` adds ``ROWS_PER_SCALE`` rows per unit of scale: scale 1 is a
+small agency book of about 1,500 rows, scale 1000 about 1.5 million. The data
+follows the shape of a real book rather than a uniform spread:
+
+- a few agents and customers hold many policies (ids drawn with a skew)
+- policy types, coverage and premiums vary by line of business
+- statuses agree with the dates: past end dates are Expired (or Cancelled),
+  future start dates are Pending, the rest mostly Active
+- claims fall inside their policy's term; claims older than
+  ``CLAIM_OPEN_DAYS`` are mostly closed, with a resolution and settlement
+
+Rows get explicit primary keys following the current maximum, so children
+can reference their parents without reading the ids back, and each chunk
+is one executemany ``INSERT`` and one commit. The full-text index is filled
+once at the end (``search.bulk_load``) rather than by the per-row triggers.
+The same ``seed`` number always produces the same rows.
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert, select
+
+from models.database import db
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from services import changes
+from services import dashboard
+from services import search
+from services.pagination import clear_count_cache
+
+
+ROWS_PER_SCALE = {
+    'agencies': 1,
+    'agents': 10,
+    'customers': 500,
+    'policies': 800,
+    'claims': 150,
+}
+
+# Line of business -> (share of policies, median coverage, premium per 1,000 of
+# coverage, term in days)
+POLICY_TYPES = {
+    'Auto': (40, 25000, 45.0, 365),
+    'Home': (25, 300000, 3.5, 365),
+    'Life': (15, 250000, 1.2, 3650),
+    'Health': (12, 50000, 90.0, 365),
+    'Business': (8, 1000000, 2.5, 365),
+}
+
+# Policies start between this many days ago and this many days ahead
+START_WINDOW = (3 * 365, 60)
+
+# Claims filed more than this many days ago have usually been resolved
+CLAIM_OPEN_DAYS = 90
+
+CLOSED_CLAIM_WEIGHTS = {'Settled': 60, 'Denied': 20, 'Withdrawn': 10, 'Closed': 10}
+OPEN_CLAIM_WEIGHTS = {'Open': 50, 'In Progress': 30, 'Under Review': 20}
+
+FIRST_NAMES = (
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+    'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+    'Carlos', 'Maria', 'Wei', 'Aisha', 'Hiroshi', 'Priya', 'Ahmed', 'Olga', 'Kwame', 'Sofia',
+)
+LAST_NAMES = (
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+    'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor',
+    'Moore', 'Jackson', 'Martin', 'Lee', 'Chen', 'Patel', 'Nguyen', 'Kim', 'Okafor', 'Novak',
+)
+CITIES = (
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'),
+    ('Phoenix', 'AZ'), ('Philadelphia', 'PA'), ('San Antonio', 'TX'), ('San Diego', 'CA'),
+    ('Dallas', 'TX'), ('Austin', 'TX'), ('Columbus', 'OH'), ('Charlotte', 'NC'),
+    ('Seattle', 'WA'), ('Denver', 'CO'), ('Boston', 'MA'), ('Nashville', 'TN'),
+    ('Portland', 'OR'), ('Atlanta', 'GA'), ('Miami', 'FL'), ('Minneapolis', 'MN'),
+)
+STREETS = ('Main', 'Oak', 'Pine', 'Maple', 'Cedar', 'Elm', 'Washington', 'Lake', 'Hill', 'Park')
+STREET_SUFFIXES = ('St', 'Ave', 'Blvd', 'Rd', 'Ln', 'Dr')
+AGENCY_WORDS = ('Summit', 'Harbor', 'Liberty', 'Keystone', 'Pioneer', 'Evergreen', 'Granite',
+                'Beacon', 'Heritage', 'Frontier', 'Meridian', 'Sterling')
+INCIDENTS = {
+    'Auto': ('Rear-end collision', 'Windshield damage', 'Vehicle theft', 'Parking lot scrape'),
+    'Home': ('Water damage from burst pipe', 'Roof damage after storm', 'Kitchen fire', 'Burglary'),
+    'Life': ('Death benefit claim',),
+    'Health': ('Emergency room visit', 'Outpatient surgery', 'Hospital admission'),
+    'Business': ('Equipment breakdown', 'Customer injury on premises', 'Business interruption'),
+}
+
+
+class SeedResult:
+    """Rows added per table and timing of one seed run."""
+
+    def __init__(self):
+        self.counts = {table: 0 for table in ROWS_PER_SCALE}
+        self.elapsed = 0.0
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    @property
+    def rows_per_second(self):
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+
+def _next_id(column):
+    return (db.session.scalar(select(func.max(column))) or 0) + 1
+
+
+def _skewed(rng, first, count, skew):
+    """An id in ``first .. first + count - 1``, low ids more likely as ``skew`` grows."""
+    return first + int(count * rng.random() ** skew)
+
+
+def _phone(rng):
+    return f'({rng.randint(201, 989)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}'
+
+
+def _address(rng):
+    return f'{rng.randint(1, 9999)} {rng.choice(STREETS)} {rng.choice(STREET_SUFFIXES)}'
+
+
+def _money(value):
+    return round(value, 2)
+
+
+class _Generator:
+    """Builds the rows of each table from one random stream."""
+
+    def __init__(self, rng, today):
+        self.rng = rng
+        self.today = today
+        self.types = list(POLICY_TYPES)
+        self.type_weights = [POLICY_TYPES[t][0] for t in self.types]
+
+    def agency(self, agency_id):
+        rng = self.rng
+        city, state = rng.choice(CITIES)
+        name = f'{rng.choice(AGENCY_WORDS)} {rng.choice(LAST_NAMES)} Insurance'
+        return {
+            'agency_id': agency_id, 'name': name, 'address': _address(rng), 'city': city,
+            'state': state, 'zip_code': f'{rng.randint(10000, 99999)}', 'phone': _phone(rng),
+            'website': f'https://agency{agency_id}.example.com',
+        }
+
+    def agent(self, agent_id, agency_id):
+        rng = self.rng
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        return {
+            'agent_id': agent_id, 'agency_id': agency_id, 'first_name': first, 'last_name': last,
+            'email': f'{first}.{last}.{agent_id}@agency{agency_id}.example.com'.lower(),
+            'phone': _phone(rng),
+        }
+
+    def customer(self, customer_id):
+        rng = self.rng
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        city, state = rng.choice(CITIES)
+        age_days = int(rng.triangular(18, 85, 42) * 365.25)
+        return {
+            'customer_id': customer_id, 'first_name': first, 'last_name': last,
+            'date_of_birth': self.today - timedelta(days=age_days),
+            'email': f'{first}.{last}.{customer_id}@example.com'.lower(), 'phone': _phone(rng),
+            'address': _address(rng), 'city': city, 'state': state,
+            'zip_code': f'{rng.randint(10000, 99999)}',
+        }
+
+    def policy(self, policy_id, agent_id, customer_id):
+        rng = self.rng
+        policy_type = rng.choices(self.types, self.type_weights)[0]
+        _, median, rate, term = POLICY_TYPES[policy_type]
+        coverage = _money(median * rng.lognormvariate(0, 0.5))
+        start_date = self.today + timedelta(days=rng.randint(-START_WINDOW[0], START_WINDOW[1]))
+        end_date = start_date + timedelta(days=term)
+        if start_date > self.today:
+            status = 'Pending'
+        elif end_date < self.today:
+            status = 'Cancelled' if rng.random() < 0.05 else 'Expired'
+        else:
+            status = 'Cancelled' if rng.random() < 0.04 else 'Active'
+        return {
+            'policy_id': policy_id, 'agent_id': agent_id, 'customer_id': customer_id,
+            'policy_number': f'POL-S{policy_id:08d}', 'policy_type': policy_type,
+            'coverage_amount': coverage,
+            'premium': _money(coverage / 1000 * rate * rng.uniform(0.8, 1.3)),
+            'start_date': start_date, 'end_date': end_date, 'policy_status': status,
+        }
+
+    def claim(self, claim_id, policy):
+        rng = self.rng
+        last_day = min(policy['end_date'], self.today)
+        term_days = max((last_day - policy['start_date']).days, 0)
+        incident_date = policy['start_date'] + timedelta(days=rng.randint(0, term_days))
+        claim_date = min(incident_date + timedelta(days=int(rng.expovariate(1 / 5))), self.today)
+        amount = _money(min(float(policy['coverage_amount']),
+                            policy['coverage_amount'] * 0.05 * rng.lognormvariate(0, 1)))
+        values = {
+            'claim_id': claim_id, 'policy_id': policy['policy_id'],
+            'claim_number': f'CLM-S{claim_id:08d}', 'claim_date': claim_date,
+            'incident_date': incident_date,
+            'description': rng.choice(INCIDENTS[policy['policy_type']]),
+            'claim_amount': amount, 'resolution_date': None, 'settlement_amount': None,
+        }
+        age = (self.today - claim_date).days
+        if age > CLAIM_OPEN_DAYS and rng.random() < 0.95:
+            status = rng.choices(list(CLOSED_CLAIM_WEIGHTS), list(CLOSED_CLAIM_WEIGHTS.values()))[0]
+            values['resolution_date'] = min(
+                claim_date + timedelta(days=rng.randint(7, CLAIM_OPEN_DAYS)), self.today)
+            if status == 'Settled':
+                values['settlement_amount'] = _money(amount * rng.uniform(0.6, 1.0))
+        else:
+            status = rng.choices(list(OPEN_CLAIM_WEIGHTS), list(OPEN_CLAIM_WEIGHTS.values()))[0]
+        values['status'] = status
+        return values
+
+
+def _insert(model, rows, result, table):
+    if rows:
+        db.session.execute(insert(model.__table__), rows)
+        key = model.__mapper__.primary_key[0].key
+        changes.record(model, [row[key] for row in rows], 'insert')
+        db.session.commit()
+        result.counts[table] += len(rows)
+
+
+def _add_rows(generate, wanted, chunk_size, result):
+    rng = generate.rng
+
+    first_agency = _next_id(Agency.agency_id)
+    _insert(Agency, [generate.agency(first_agency + i) for i in range(wanted['agencies'])],
+            result, 'agencies')
+
+    first_agent = _next_id(Agent.agent_id)
+    for offset in range(0, wanted['agents'], chunk_size):
+        _insert(Agent, [
+            generate.agent(first_agent + i,
+                           _skewed(rng, first_agency, wanted['agencies'], 1.5))
+            for i in range(offset, min(offset + chunk_size, wanted['agents']))
+        ], result, 'agents')
+
+    first_customer = _next_id(Customer.customer_id)
+    for offset in range(0, wanted['customers'], chunk_size):
+        _insert(Customer, [
+            generate.customer(first_customer + i)
+            for i in range(offset, min(offset + chunk_size, wanted['customers']))
+        ], result, 'customers')
+
+    # Claims are spread over the policy chunks as they are generated, so only
+    # one chunk of policies is ever held in memory
+    first_policy = _next_id(Policy.policy_id)
+    next_claim = _next_id(Claim.claim_id)
+    for offset in range(0, wanted['policies'], chunk_size):
+        end = min(offset + chunk_size, wanted['policies'])
+        policies = [
+            generate.policy(first_policy + i,
+                            _skewed(rng, first_agent, wanted['agents'], 1.5),
+                            _skewed(rng, first_customer, wanted['customers'], 1.3))
+            for i in range(offset, end)
+        ]
+        _insert(Policy, policies, result, 'policies')
+
+        claimable = [p for p in policies if p['policy_status'] != 'Pending'] or policies
+        claim_count = wanted['claims'] * end // wanted['policies'] - result.counts['claims']
+        claims = []
+        for _ in range(claim_count):
+            claims.append(generate.claim(next_claim, rng.choice(claimable)))
+            next_claim += 1
+        _insert(Claim, claims, result, 'claims')
+
+
+def seed(scale=1, seed=0, today=None, chunk_size=None):
+    """Add ``scale`` units of ``ROWS_PER_SCALE`` rows and return a ``SeedResult``."""
+    started = time.perf_counter()
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 1000)
+    generate = _Generator(random.Random(seed), today or date.today())
+    wanted = {table: max(1, round(rows * scale)) for table, rows in ROWS_PER_SCALE.items()}
+    result = SeedResult()
+    try:
+        with search.bulk_load():
+            _add_rows(generate, wanted, chunk_size, result)
+    finally:
+        dashboard.invalidate()
+        clear_count_cache()
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,396 @@
+"""
+Batch JSON serialization for the API endpoints.
+
+``to_dict()`` builds one ORM instance per row, formats every date with
+``strftime``, converts every ``Decimal`` and re-reads ``datetime.today()``
+for each computed field. A ``Schema`` instead selects plain column tuples,
+with the related names (agent, customer, policy number) outer-joined into
+the same SELECT and dates read as the ISO text SQLite stores (other drivers
+still return ``date`` objects, which are formatted instead), and turns a
+whole batch into dicts with "today" fixed once for the batch. The output is
+the same as ``to_dict()``.
+
+Batches are encoded with ``orjson`` when it is installed and with the
+standard library ``json`` module otherwise.
+"""
+from datetime import date, datetime
+
+from flask import Response
+from sqlalchemy import Float, String, bindparam, select, type_coerce
+
+from models.database import db
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder gives the same JSON, slower
+    orjson = None
+    import json
+
+
+if orjson is not None:
+    def dumps(value):
+        """``value`` as UTF-8 encoded JSON."""
+        return orjson.dumps(value)
+else:
+    def dumps(value):
+        """``value`` as UTF-8 encoded JSON."""
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(items):
+    """A JSON array response of already serialized ``items``."""
+    return Response(dumps(items), mimetype='application/json')
+
+
+# Field getters: each takes the batch's columns (one tuple of values per
+# selected column) and the batch's "today" and returns the field's values
+
+def _copy(index):
+    return lambda columns, today: columns[index]
+
+
+def _amount(index):
+    return lambda columns, today: [float(value) if value else 0.0 for value in columns[index]]
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _iso(values):
+    # Dates as ISO text whether the driver returned text or date objects
+    return [value.isoformat() if isinstance(value, date) else value for value in values]
+
+
+def _date(index):
+    return lambda columns, today: _iso(columns[index])
+
+
+def _timestamp(index):
+    def get(columns, today):
+        # Stored with or without microseconds; the API gives whole seconds
+        return [value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime)
+                else value[:19] if value else None
+                for value in columns[index]]
+    return get
+
+
+def _name(first, last):
+    def get(columns, today):
+        return [None if a is None and b is None else f'{a} {b}'
+                for a, b in zip(columns[first], columns[last])]
+    return get
+
+
+class Schema:
+    """The columns one API row is read from and how each output field is built.
+
+    ``columns`` maps labels to SQL expressions; ``fields`` lists the output
+    keys in order, each with a column label (copied as is) or a ``(make,
+    *labels)`` tuple: ``make`` is called once with the labels' positions in
+    the row and returns the function of ``(columns, today)`` giving the
+    field's values for a whole batch.
+    """
+
+    def __init__(self, model, columns, fields, joins=()):
+        self.model = model
+        self.pk = getattr(model, model.__mapper__.primary_key[0].key)
+        self.labels = list(columns)
+        self.columns = [expression.label(label) for label, expression in columns.items()]
+        self.joins = joins
+        self.fields = [name for name, spec in fields]
+        index = {label: i for i, label in enumerate(self.labels)}
+        self._getters = [_copy(index[spec]) if isinstance(spec, str)
+                         else spec[0](*(index[label] for label in spec[1:]))
+                         for name, spec in fields]
+        self._pages = {}
+
+    def select(self, *columns):
+        """SELECT of this schema's columns (or ``columns``) with its joins."""
+        statement = select(*(columns or self.columns)).select_from(self.model)
+        for target, onclause in self.joins:
+            statement = statement.outerjoin(target, onclause)
+        return statement
+
+    def query(self):
+        """``select()`` as a session ``Query``, for the helpers that take one (``keyset_paginate``)."""
+        query = db.session.query(*self.columns).select_from(self.model)
+        for target, onclause in self.joins:
+            query = query.outerjoin(target, onclause)
+        return query
+
+    def page(self, after=False, limit=False):
+        """``select()`` in primary key order, with ``pk > :after`` and ``LIMIT :limit`` as asked.
+
+        Each of the four shapes is built once and reused with new parameter
+        values, so a request for a few rows does not pay for building the
+        statement and its cache key again.
+        """
+        statement = self._pages.get((after, limit))
+        if statement is None:
+            statement = self.select()
+            if after:
+                statement = statement.where(self.pk > bindparam('after', type_=self.pk.type))
+            statement = statement.order_by(self.pk.asc())
+            if limit:
+                statement = statement.limit(bindparam('limit', type_=self.pk.type))
+            self._pages[(after, limit)] = statement
+        return statement
+
+    def serialize(self, rows, today=None):
+        """The output dicts for a batch (a list) of rows selected by ``select()``."""
+        if not rows:
+            return []
+        today = today or date.today()
+        columns = list(zip(*rows))
+        values = [get(columns, today) for get in self._getters]
+        fields = self.fields
+        return [dict(zip(fields, item)) for item in zip(*values)]
+
+
+def _money(column):
+    # Read as a float, skipping the Decimal round trip
+    return type_coerce(column, Float)
+
+
+def _text(column):
+    # SQLite keeps dates and timestamps as ISO 8601 text, which is already
+    # what the API sends: read it as is rather than parse it and format it
+    # back. Other drivers return date objects whatever the type; the getters
+    # take both
+    return type_coerce(column, String)
+
+
+def _full_address(address, city, state, zip_code):
+    def get(columns, today):
+        return [', '.join(filter(None, parts))
+                for parts in zip(columns[address], columns[city], columns[state], columns[zip_code])]
+    return get
+
+
+def _age(born):
+    def get(columns, today):
+        # Compare "-MM-DD" text rather than parse every date of birth
+        month_day = today.strftime('-%m-%d')
+        return [today.year - int(value[:4]) - (value[4:10] > month_day) if value else None
+                for value in _iso(columns[born])]
+    return get
+
+
+def _is_active(status, start, end):
+    def get(columns, today):
+        return [state == 'Active' and begins is not None and _as_date(begins) <= today
+                and (ends is None or _as_date(ends) >= today)
+                for state, begins, ends in zip(columns[status], columns[start], columns[end])]
+    return get
+
+
+def _days_until_renewal(end):
+    def get(columns, today):
+        return [(_as_date(value) - today).days if value else None for value in columns[end]]
+    return get
+
+
+def _renewal_status(end):
+    def status(value, today):
+        if not value:
+            return None
+        days = (_as_date(value) - today).days
+        if days < 0:
+            return 'Expired'
+        if days <= Policy.RENEWAL_CRITICAL_DAYS:
+            return 'Critical'
+        if days <= Policy.RENEWAL_WARNING_DAYS:
+            return 'Warning'
+        return 'OK'
+
+    def get(columns, today):
+        return [status(value, today) for value in columns[end]]
+    return get
+
+
+def _days_since(day):
+    def get(columns, today):
+        return [(today - _as_date(value)).days if value else None for value in columns[day]]
+    return get
+
+
+def _is_open(status):
+    return lambda columns, today: [value in Claim.OPEN_STATUSES for value in columns[status]]
+
+
+def _agency_schema():
+    return Schema(Agency, {
+        'agency_id': Agency.agency_id,
+        'name': Agency.name,
+        'address': Agency.address,
+        'city': Agency.city,
+        'state': Agency.state,
+        'zip_code': Agency.zip_code,
+        'phone': Agency.phone,
+        'agent_count': Agency.agent_count,
+    }, [
+        ('agency_id', 'agency_id'),
+        ('name', 'name'),
+        ('address', 'address'),
+        ('city', 'city'),
+        ('state', 'state'),
+        ('zip_code', 'zip_code'),
+        ('phone', 'phone'),
+        ('agent_count', 'agent_count'),
+    ])
+
+
+def _agent_schema():
+    return Schema(Agent, {
+        'agent_id': Agent.agent_id,
+        'agency_id': Agent.agency_id,
+        'first_name': Agent.first_name,
+        'last_name': Agent.last_name,
+        'email': Agent.email,
+        'phone': Agent.phone,
+        'agency_name': Agency.name,
+        'policy_count': Agent.policy_count,
+    }, [
+        ('agent_id', 'agent_id'),
+        ('agency_id', 'agency_id'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('email', 'email'),
+        ('phone', 'phone'),
+        ('full_name', (_name, 'first_name', 'last_name')),
+        ('agency_name', 'agency_name'),
+        ('policy_count', 'policy_count'),
+    ], joins=[(Agency, Agency.agency_id == Agent.agency_id)])
+
+
+def _customer_schema():
+    return Schema(Customer, {
+        'customer_id': Customer.customer_id,
+        'first_name': Customer.first_name,
+        'last_name': Customer.last_name,
+        'date_of_birth': _text(Customer.date_of_birth),
+        'email': Customer.email,
+        'phone': Customer.phone,
+        'address': Customer.address,
+        'city': Customer.city,
+        'state': Customer.state,
+        'zip_code': Customer.zip_code,
+        'policy_count': Customer.policy_count,
+    }, [
+        ('customer_id', 'customer_id'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('date_of_birth', (_date, 'date_of_birth')),
+        ('email', 'email'),
+        ('phone', 'phone'),
+        ('address', 'address'),
+        ('city', 'city'),
+        ('state', 'state'),
+        ('zip_code', 'zip_code'),
+        ('full_name', (_name, 'first_name', 'last_name')),
+        ('full_address', (_full_address, 'address', 'city', 'state', 'zip_code')),
+        ('age', (_age, 'date_of_birth')),
+        ('policy_count', 'policy_count'),
+    ])
+
+
+def _policy_schema():
+    return Schema(Policy, {
+        'policy_id': Policy.policy_id,
+        'agent_id': Policy.agent_id,
+        'customer_id': Policy.customer_id,
+        'policy_number': Policy.policy_number,
+        'policy_type': Policy.policy_type,
+        'coverage_amount': _money(Policy.coverage_amount),
+        'premium': _money(Policy.premium),
+        'start_date': _text(Policy.start_date),
+        'end_date': _text(Policy.end_date),
+        'policy_status': Policy.policy_status,
+        'renewed_from_id': Policy.renewed_from_id,
+        'agent_first_name': Agent.first_name,
+        'agent_last_name': Agent.last_name,
+        'customer_first_name': Customer.first_name,
+        'customer_last_name': Customer.last_name,
+        'claim_count': Policy.claim_count,
+    }, [
+        ('policy_id', 'policy_id'),
+        ('agent_id', 'agent_id'),
+        ('customer_id', 'customer_id'),
+        ('policy_number', 'policy_number'),
+        ('policy_type', 'policy_type'),
+        ('coverage_amount', (_amount, 'coverage_amount')),
+        ('premium', (_amount, 'premium')),
+        ('start_date', (_date, 'start_date')),
+        ('end_date', (_date, 'end_date')),
+        ('policy_status', 'policy_status'),
+        ('renewed_from_id', 'renewed_from_id'),
+        ('is_active', (_is_active, 'policy_status', 'start_date', 'end_date')),
+        ('days_until_renewal', (_days_until_renewal, 'end_date')),
+        ('renewal_status', (_renewal_status, 'end_date')),
+        ('agent_name', (_name, 'agent_first_name', 'agent_last_name')),
+        ('customer_name', (_name, 'customer_first_name', 'customer_last_name')),
+        ('claim_count', 'claim_count'),
+    ], joins=[(Agent, Agent.agent_id == Policy.agent_id),
+              (Customer, Customer.customer_id == Policy.customer_id)])
+
+
+def _claim_schema():
+    return Schema(Claim, {
+        'claim_id': Claim.claim_id,
+        'policy_id': Claim.policy_id,
+        'claim_number': Claim.claim_number,
+        'claim_date': _text(Claim.claim_date),
+        'incident_date': _text(Claim.incident_date),
+        'description': Claim.description,
+        'claim_amount': _money(Claim.claim_amount),
+        'status': Claim.status,
+        'resolution_date': _text(Claim.resolution_date),
+        'settlement_amount': _money(Claim.settlement_amount),
+        'created_at': _text(Claim.created_at),
+        'updated_at': _text(Claim.updated_at),
+        'policy_number': Policy.policy_number,
+        'customer_first_name': Customer.first_name,
+        'customer_last_name': Customer.last_name,
+    }, [
+        ('claim_id', 'claim_id'),
+        ('policy_id', 'policy_id'),
+        ('claim_number', 'claim_number'),
+        ('claim_date', (_date, 'claim_date')),
+        ('incident_date', (_date, 'incident_date')),
+        ('description', 'description'),
+        ('claim_amount', (_amount, 'claim_amount')),
+        ('status', 'status'),
+        ('resolution_date', (_date, 'resolution_date')),
+        ('settlement_amount', (_amount, 'settlement_amount')),
+        ('created_at', (_timestamp, 'created_at')),
+        ('updated_at', (_timestamp, 'updated_at')),
+        ('days_since_filed', (_days_since, 'claim_date')),
+        ('is_open', (_is_open, 'status')),
+        ('policy_number', 'policy_number'),
+        ('customer_name', (_name, 'customer_first_name', 'customer_last_name')),
+    ], joins=[(Policy, Policy.policy_id == Claim.policy_id),
+              (Customer, Customer.customer_id == Policy.customer_id)])
+
+
+_BUILDERS = {
+    Agency: _agency_schema,
+    Agent: _agent_schema,
+    Customer: _customer_schema,
+    Policy: _policy_schema,
+    Claim: _claim_schema,
+}
+_schemas = {}
+
+
+def schema_for(model):
+    """The ``Schema`` of ``model`` (built on first use, once the mappers are configured)."""
+    schema = _schemas.get(model)
+    if schema is None:
+        schema = _schemas[model] = _BUILDERS[model]()
+    return schema
@@ -0,0 +1,183 @@
+"""
+Slow-query log: SQL statements slower than ``SLOW_QUERY_MS``, one JSON object per line.
+
+The engine's ``before/after_cursor_execute`` events time every statement.
+Those over the threshold are kept with probability ``SLOW_QUERY_SAMPLE_RATE``;
+a kept statement is written to ``SLOW_QUERY_LOG`` with its bound parameters
+(only their types and lengths unless ``SLOW_QUERY_LOG_PARAMETERS`` is on:
+they carry names, emails and phone numbers), the endpoint that sent it, the row count the driver reports and, for reads,
+the database's ``EXPLAIN`` output. Statements under the threshold cost one
+``perf_counter`` call and a comparison, and only the sampled slow ones pay
+for the ``EXPLAIN``.
+
+``flask slow-queries`` groups the log by ``fingerprint()`` (the statement
+with its literals and ``IN`` lists collapsed) to show which statement shapes
+are slow, how often and from where.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from datetime import datetime
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from models.database import db
+
+
+logger = logging.getLogger('insuremate.slow_queries')
+
+# Bound parameter sets logged for an executemany statement
+MAX_PARAMETER_SETS = 10
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+_READS = ('SELECT', 'WITH')
+
+
+def normalize(statement):
+    """``statement`` with literals as ``?``, ``IN`` lists as ``(?)`` and single spaces."""
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = re.sub(r'%\(\w+\)s|%s|(?<!:):\w+', '?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(?)', statement)
+    return _SPACE.sub(' ', statement).strip()
+
+
+def fingerprint(statement):
+    """Short hash identifying the shape of ``statement`` whatever its values."""
+    return hashlib.sha1(normalize(statement).encode('utf-8')).hexdigest()[:12]
+
+
+def _explain(cursor, dialect, statement, parameters):
+    if not statement.lstrip().upper().startswith(_READS):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        rows = explain_cursor.fetchall()
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+    finally:
+        explain_cursor.close()
+    if dialect == 'sqlite':
+        return [row[-1] for row in rows]
+    return [' '.join(str(value) for value in row) for row in rows]
+
+
+def _redact(value):
+    """The type of ``value``, and its length for text, instead of the value."""
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__} len={len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+def _redact_set(parameters):
+    if isinstance(parameters, dict):
+        return {key: _redact(value) for key, value in parameters.items()}
+    return [_redact(value) for value in parameters]
+
+
+def _parameters(parameters, executemany, values=False):
+    sets = list(parameters[:MAX_PARAMETER_SETS]) if executemany else [parameters]
+    if not values:
+        sets = [_redact_set(parameter_set) for parameter_set in sets]
+    return sets if executemany else sets[0]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['slow_query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('slow_query_started', None)
+    if started is None or not has_app_context():
+        return
+    milliseconds = (time.perf_counter() - started) * 1000
+    config = current_app.config
+    threshold = config.get('SLOW_QUERY_MS', 0)
+    if threshold <= 0 or milliseconds < threshold:
+        return
+    if random.random() >= config.get('SLOW_QUERY_SAMPLE_RATE', 1.0):
+        return
+
+    entry = {
+        'time': datetime.utcnow().isoformat(timespec='milliseconds'),
+        'duration_ms': round(milliseconds, 3),
+        'fingerprint': fingerprint(statement),
+        'statement': statement,
+        'parameters': _parameters(parameters, executemany, config.get('SLOW_QUERY_LOG_PARAMETERS')),
+        'endpoint': request.endpoint if has_request_context() else None,
+        'path': request.path if has_request_context() else None,
+        'row_count': cursor.rowcount if cursor.rowcount >= 0 else None,
+        'plan': None if executemany else _explain(cursor, conn.dialect.name, statement, parameters),
+    }
+    logger.warning(json.dumps(entry, default=str))
+
+
+def read_log(path):
+    """The entries in the slow-query log at ``path``, skipping lines that are not JSON."""
+    entries = []
+    with open(path, encoding='utf-8') as stream:
+        for line in stream:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def summarize(entries):
+    """Group log entries by fingerprint, slowest total time first."""
+    groups = {}
+    for entry in entries:
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'statement': normalize(entry['statement']),
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'endpoints': set(),
+                'plan': None,
+            }
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        if entry.get('endpoint'):
+            group['endpoints'].add(entry['endpoint'])
+        group['plan'] = entry.get('plan') or group['plan']
+    summary = sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)
+    for group in summary:
+        group['mean_ms'] = group['total_ms'] / group['count']
+        group['endpoints'] = sorted(group['endpoints'])
+    return summary
+
+
+def log_path(app):
+    """Where the slow-query log is written (``SLOW_QUERY_LOG`` or the instance folder)."""
+    return app.config.get('SLOW_QUERY_LOG') or os.path.join(app.instance_path, 'slow_queries.log')
+
+
+def init_app(app):
+    """Time every statement on the app's engine and log the slow ones to ``log_path``."""
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(log_path(app))), exist_ok=True)
+        handler = logging.FileHandler(log_path(app), encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
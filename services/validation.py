@@ -0,0 +1,153 @@
+"""
+Field rules shared by the create and edit forms and the bulk CSV import.
+
+Each ``*_values`` function takes a mapping of submitted strings (a
+``request.form`` or a CSV row) and returns the column values to write, or
+raises ``ValidationError`` with the message the form flashes. Keeping the
+rules here means an imported row or an edit is accepted exactly when the
+same data typed into the create form would be.
+"""
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from models.policy import Policy
+from models.claim import Claim
+
+
+class ValidationError(ValueError):
+    """A submitted value breaks one of the rules below."""
+
+
+def _text(data, name):
+    return (data.get(name) or '').strip()
+
+
+def _required(data, name, label):
+    value = _text(data, name)
+    if not value:
+        raise ValidationError(f'{label} is required')
+    return value
+
+
+def _date(value, label):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValidationError(f'{label} must be a date (YYYY-MM-DD)') from None
+
+
+def _amount(value, label, default=Decimal('0.00')):
+    if not value:
+        return default
+    try:
+        amount = Decimal(value.replace(',', ''))
+    except InvalidOperation:
+        raise ValidationError(f'{label} must be a number') from None
+    if not amount.is_finite() or amount < 0:
+        raise ValidationError(f'{label} must be a positive number')
+    return amount
+
+
+def _key(value, label):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError(f'{label} must be an id') from None
+
+
+def _choice(value, choices, label, default):
+    if not value:
+        return default
+    if value not in choices:
+        raise ValidationError(f"{label} must be one of: {', '.join(choices)}")
+    return value
+
+
+def customer_values(data):
+    first_name = _required(data, 'first_name', 'First name')
+    last_name = _required(data, 'last_name', 'Last name')
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'date_of_birth': _date(_text(data, 'date_of_birth'), 'Date of birth'),
+        'email': _text(data, 'email'),
+        'phone': _text(data, 'phone'),
+        'address': _text(data, 'address'),
+        'city': _text(data, 'city'),
+        'state': _text(data, 'state'),
+        'zip_code': _text(data, 'zip_code'),
+    }
+
+
+def policy_values(data):
+    agent_id = _key(_required(data, 'agent_id', 'Agent'), 'Agent')
+    customer_id = _key(_required(data, 'customer_id', 'Customer'), 'Customer')
+    policy_number = _required(data, 'policy_number', 'Policy number')
+    policy_type = _required(data, 'policy_type', 'Policy type')
+    start_date = _date(_required(data, 'start_date', 'Start date'), 'Start date')
+    end_date = _date(_text(data, 'end_date'), 'End date')
+    if end_date and end_date < start_date:
+        raise ValidationError('End date must not be before the start date')
+    return {
+        'agent_id': agent_id,
+        'customer_id': customer_id,
+        'policy_number': policy_number,
+        'policy_type': policy_type,
+        'coverage_amount': _amount(_text(data, 'coverage_amount'), 'Coverage amount'),
+        'premium': _amount(_text(data, 'premium'), 'Premium'),
+        'start_date': start_date,
+        'end_date': end_date,
+        'policy_status': _choice(_text(data, 'policy_status'), Policy.STATUSES, 'Status', 'Active'),
+    }
+
+
+def claim_values(data):
+    """Values for a newly filed claim: generated number, today's date, status Open."""
+    policy_id = _key(_required(data, 'policy_id', 'Policy'), 'Policy')
+    incident_date = _date(_required(data, 'incident_date', 'Incident date'), 'Incident date')
+    return {
+        'policy_id': policy_id,
+        'claim_number': f"CLM-{uuid.uuid4().hex[:8].upper()}",
+        'claim_date': datetime.today().date(),
+        'incident_date': incident_date,
+        'description': _text(data, 'description'),
+        'claim_amount': _amount(_text(data, 'claim_amount'), 'Claim amount'),
+        'status': 'Open',
+    }
+
+
+def claim_update_values(data):
+    """Values for an edit of a filed claim: its description, amounts and status.
+
+    The settlement amount is only taken when the claim is Settled.
+    """
+    status = _choice(_required(data, 'status', 'Status'), Claim.STATUSES, 'Status', None)
+    values = {
+        'description': _text(data, 'description'),
+        'claim_amount': _amount(_text(data, 'claim_amount'), 'Claim amount'),
+        'status': status,
+    }
+    if status == 'Settled':
+        values['settlement_amount'] = _amount(_text(data, 'settlement_amount'), 'Settlement amount')
+    return values
+
+
+def imported_claim_values(data):
+    """Values for a claim carried over from another system.
+
+    Same rules as ``claim_values``, but the claim number, filing date, status
+    and resolution may be given instead of defaulted.
+    """
+    values = claim_values(data)
+    settlement_amount = _text(data, 'settlement_amount')
+    values.update({
+        'claim_number': _text(data, 'claim_number') or values['claim_number'],
+        'claim_date': _date(_text(data, 'claim_date'), 'Claim date') or values['claim_date'],
+        'status': _choice(_text(data, 'status'), Claim.STATUSES, 'Status', values['status']),
+        'resolution_date': _date(_text(data, 'resolution_date'), 'Resolution date'),
+        'settlement_amount': _amount(settlement_amount, 'Settlement amount') if settlement_amount else None,
+    })
+    return values
@@ -66,6 +66,9 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Typeahead pickers for agents, customers and policies
+    document.querySelectorAll('.typeahead').forEach(initTypeahead);
+
     // Format currency inputs
     const currencyInputs = document.querySelectorAll('.currency-input');
     currencyInputs.forEach(input => {
@@ -106,4 +109,112 @@ document.addEventListener('click', function(e) {
         e.preventDefault();
         document.getElementById('policy_number').value = generatePolicyNumber();
     }
-});
\ No newline at end of file
+});
+
+// Typeahead picker: a text box that looks up matches on the server as the
+// user types and stores the chosen id in the hidden input next to it
+function initTypeahead(container) {
+    const hidden = container.querySelector('input[type="hidden"]');
+    const input = container.querySelector('.typeahead-input');
+    const menu = container.querySelector('.typeahead-menu');
+    const initialId = hidden.value;
+    let timer = null;
+    let active = -1;
+    let latest = 0;
+
+    function close() {
+        menu.classList.add('d-none');
+        menu.innerHTML = '';
+        input.setAttribute('aria-expanded', 'false');
+        active = -1;
+    }
+
+    function choose(item) {
+        hidden.value = item.id;
+        input.value = item.label;
+        input.setCustomValidity('');
+        close();
+    }
+
+    function highlight(index) {
+        const items = menu.querySelectorAll('.list-group-item-action');
+        if (!items.length) return;
+        active = (index + items.length) % items.length;
+        items.forEach((item, i) => item.classList.toggle('active', i === active));
+    }
+
+    function render(items) {
+        menu.innerHTML = '';
+        if (!items.length) {
+            menu.innerHTML = '<div class="list-group-item text-muted small">No matches</div>';
+        }
+        items.forEach(item => {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'list-group-item list-group-item-action';
+            button.textContent = item.label;
+            // mousedown fires before the input loses focus
+            button.addEventListener('mousedown', e => {
+                e.preventDefault();
+                choose(item);
+            });
+            menu.appendChild(button);
+        });
+        menu.classList.remove('d-none');
+        input.setAttribute('aria-expanded', 'true');
+        active = -1;
+    }
+
+    function lookup() {
+        const url = new URL(container.dataset.source, window.location.origin);
+        url.searchParams.set('q', input.value.trim());
+        const request = ++latest;
+        fetch(url)
+            .then(response => response.json())
+            .then(items => {
+                // Ignore responses that arrive after a newer lookup was sent
+                if (request === latest && document.activeElement === input) {
+                    render(items);
+                }
+            })
+            .catch(error => console.error('Error loading matches:', error));
+    }
+
+    input.addEventListener('input', function() {
+        // Typing invalidates the previous choice until a match is picked
+        hidden.value = '';
+        input.setCustomValidity(input.value.trim() ? 'Please pick a match from the list.' : '');
+        clearTimeout(timer);
+        timer = setTimeout(lookup, 200);
+    });
+
+    input.addEventListener('focus', function() {
+        if (!hidden.value) lookup();
+    });
+
+    input.addEventListener('keydown', function(e) {
+        const items = menu.querySelectorAll('.list-group-item-action');
+        if (e.key === 'ArrowDown') {
+            e.preventDefault();
+            highlight(active + 1);
+        } else if (e.key === 'ArrowUp') {
+            e.preventDefault();
+            highlight(active - 1);
+        } else if (e.key === 'Enter' && active >= 0 && items[active]) {
+            e.preventDefault();
+            items[active].dispatchEvent(new MouseEvent('mousedown'));
+        } else if (e.key === 'Escape') {
+            close();
+        }
+    });
+
+    input.addEventListener('blur', close);
+
+    if (input.form) {
+        input.form.addEventListener('reset', function() {
+            hidden.value = initialId;
+            input.setCustomValidity('');
+            close();
+        });
+    }
+}
@@ -4,12 +4,16 @@ Test configuration and fixtures for InsureMate test suite.
 import pytest
 from app import app as flask_app
 from models.database import db as _db
+from services import cache
+from services import dashboard
+from services.pagination import clear_count_cache
 from models.agency import Agency
 from models.agent import Agent
 from models.customer import Customer
 from models.policy import Policy
 from models.claim import Claim
 from datetime import datetime, timedelta
+from sqlalchemy import event
 
 
 @pytest.fixture(scope='session')
@@ -19,6 +23,9 @@ def app():
     flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     flask_app.config['WTF_CSRF_ENABLED'] = False
     flask_app.config['SECRET_KEY'] = 'test-secret-key'
+    # One process: the per-process store, kept out of instance/cache
+    flask_app.config['CACHE_BACKEND'] = 'memory'
+    cache.init_app(flask_app)
     
     ctx = flask_app.app_context()
     ctx.push()
@@ -46,6 +53,9 @@ def session(db, app):
         db.session.remove()
         db.drop_all()
         db.create_all()
+        cache.clear()
+        cache.reset_stats()
+        clear_count_cache()
     
     yield db.session
     
@@ -145,3 +155,33 @@ def sample_claim(session, sample_policy):
     session.add(claim)
     session.commit()
     return claim
+
+
+class QueryCounter:
+    """Counts the SQL statements sent to the engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return False
+
+
+@pytest.fixture
+def query_counter(db):
+    """Return a context manager that counts the SQL statements issued inside it."""
+    return QueryCounter(db.engine)
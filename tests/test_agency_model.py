@@ -70,3 +70,12 @@ class TestAgencyModel:
         from models.agent import Agent
         deleted_agent = session.get(Agent, agent_id)
         assert deleted_agent is None
+    
+    def test_agency_agent_count(self, session, sample_agency, sample_agent):
+        """Test that agent_count is computed in SQL without loading agents."""
+        session.expire_all()
+        agency = session.get(Agency, sample_agency.agency_id)
+        
+        assert agency.agent_count == 1
+        assert 'agents' not in agency.__dict__
+        assert agency.to_dict()['agent_count'] == 1
@@ -76,3 +76,13 @@ class TestAgentModel:
         from models.policy import Policy
         deleted_policy = session.get(Policy, policy_id)
         assert deleted_policy is None
+    
+    def test_agent_policy_count(self, session, sample_agent, sample_policy):
+        """Test that policy_count is computed in SQL without loading policies."""
+        from models.agent import Agent
+        session.expire_all()
+        agent = session.get(Agent, sample_agent.agent_id)
+        
+        assert agent.policy_count == 1
+        assert 'policies' not in agent.__dict__
+        assert agent.to_dict()['policy_count'] == 1
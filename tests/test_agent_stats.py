@@ -0,0 +1,97 @@
+"""
+Unit tests for the agent statistics service.
+"""
+import pytest
+import json
+from datetime import datetime, timedelta
+from models.policy import Policy
+from services.agent_stats import get_agent_stats
+
+
+class TestAgentStats:
+    """Test cases for the agent statistics service."""
+    
+    def test_stats_for_agent_without_policies(self, sample_agent):
+        """Test statistics for an agent with no policies."""
+        stats = get_agent_stats(sample_agent.agent_id)
+        
+        assert stats['policy_count'] == 0
+        assert stats['active_policy_count'] == 0
+        assert stats['customer_count'] == 0
+        assert stats['total_premium'] == 0.0
+    
+    def test_stats_aggregate_policies(self, session, sample_agent, sample_customer, sample_policy):
+        """Test that counts, distinct customers and premiums are aggregated."""
+        session.add(Policy(
+            agent_id=sample_agent.agent_id,
+            customer_id=sample_customer.customer_id,
+            policy_number="POL-TEST999",
+            policy_type="Home Insurance",
+            premium=800.00,
+            start_date=datetime.today().date(),
+            end_date=(datetime.today() + timedelta(days=365)).date(),
+            policy_status="Cancelled"
+        ))
+        session.commit()
+        
+        stats = get_agent_stats(sample_agent.agent_id)
+        
+        assert stats['policy_count'] == 2
+        assert stats['active_policy_count'] == 1
+        assert stats['customer_count'] == 1
+        assert stats['total_premium'] == 2000.0
+        assert stats['active_premium'] == 1200.0
+    
+    def test_stats_use_single_query(self, sample_policy, query_counter):
+        """Test that the statistics are computed in one statement."""
+        agent_id = sample_policy.agent_id
+        
+        with query_counter:
+            get_agent_stats(agent_id)
+        
+        assert query_counter.count == 1
+    
+    def test_agent_view_shows_stats(self, client, sample_policy):
+        """Test that the agent page renders the statistics panel."""
+        response = client.get(f'/agents/{sample_policy.agent_id}')
+        assert response.status_code == 200
+        assert b'Performance Metrics' in response.data
+        assert b'$1,200' in response.data
+    
+    def test_stats_api(self, client, sample_policy):
+        """Test the API endpoint for agent statistics."""
+        response = client.get(f'/agents/api/{sample_policy.agent_id}/stats')
+        assert response.status_code == 200
+        
+        data = json.loads(response.data)
+        assert data['policy_count'] == 1
+        assert data['active_policy_count'] == 1
+    
+    def test_stats_api_not_found(self, client):
+        """Test the statistics API for a non-existent agent."""
+        response = client.get('/agents/api/99999/stats')
+        assert response.status_code == 404
+    
+    def test_agent_view_lists_a_page_of_policies(self, app, client, session, sample_agent,
+                                                 sample_customer, monkeypatch):
+        """Test that the agent page lists the latest policies only, not the whole collection."""
+        monkeypatch.setitem(app.config, 'ITEMS_PER_PAGE', 2)
+        for number in range(3):
+            session.add(Policy(
+                agent_id=sample_agent.agent_id,
+                customer_id=sample_customer.customer_id,
+                policy_number=f"POL-PAGE{number}",
+                policy_type="Auto Insurance",
+                premium=100.00,
+                start_date=(datetime.today() + timedelta(days=number)).date(),
+                end_date=(datetime.today() + timedelta(days=365)).date(),
+                policy_status="Active"
+            ))
+        session.commit()
+        
+        response = client.get(f'/agents/{sample_agent.agent_id}')
+        assert response.status_code == 200
+        assert b'POL-PAGE2' in response.data and b'POL-PAGE1' in response.data
+        assert b'POL-PAGE0' not in response.data
+        assert b'latest 2 of 3' in response.data
+        assert sample_customer.full_name().encode() in response.data
@@ -0,0 +1,109 @@
+"""
+Integration tests for the paginated, projected and streaming list APIs.
+"""
+import pytest
+import json
+from datetime import datetime, timedelta
+from models.customer import Customer
+
+
+@pytest.fixture
+def many_customers(session):
+    """Create 7 customers."""
+    customers = [
+        Customer(first_name=f"First{i}", last_name=f"Last{i}", email=f"c{i}@example.com",
+                 date_of_birth=datetime(1980 + i, 1, 1).date())
+        for i in range(7)
+    ]
+    session.add_all(customers)
+    session.commit()
+    return customers
+
+
+class TestListApi:
+    """Test cases for the shared list API behaviour."""
+    
+    @pytest.mark.parametrize('url', [
+        '/agencies/api/agencies',
+        '/agents/api/agents',
+        '/customers/api/customers',
+        '/policies/api/policies',
+        '/claims/api/claims',
+    ])
+    def test_full_list_is_json_array(self, client, sample_claim, url):
+        """Test that the default response is still a JSON array of all rows."""
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        
+        data = json.loads(response.data)
+        assert isinstance(data, list)
+        assert len(data) == 1
+    
+    def test_limit_and_cursor(self, client, many_customers):
+        """Test walking the customer list two rows at a time."""
+        seen = []
+        url = '/customers/api/customers?limit=2'
+        pages = 0
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            page = json.loads(response.data)
+            assert len(page) <= 2
+            seen.extend(c['customer_id'] for c in page)
+            pages += 1
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/customers/api/customers?limit=2&cursor={cursor}' if cursor else None
+        
+        assert pages == 4
+        assert seen == sorted(c.customer_id for c in many_customers)
+    
+    def test_link_header(self, client, many_customers):
+        """Test that the next page is advertised in a Link header."""
+        response = client.get('/customers/api/customers?limit=3&fields=last_name')
+        assert 'rel="next"' in response.headers['Link']
+        assert 'fields=last_name' in response.headers['Link']
+    
+    def test_last_page_has_no_cursor(self, client, many_customers):
+        """Test that the final page carries no next cursor."""
+        response = client.get('/customers/api/customers?limit=100')
+        assert len(json.loads(response.data)) == 7
+        assert 'X-Next-Cursor' not in response.headers
+    
+    def test_fields_projection(self, client, many_customers, query_counter):
+        """Test that only the requested columns are selected and returned."""
+        with query_counter:
+            response = client.get('/customers/api/customers?fields=first_name,date_of_birth')
+            data = json.loads(response.data)
+        
+        assert data[0] == {'first_name': 'First0', 'date_of_birth': '1980-01-01'}
+        # The conditional-GET validator, then the projection itself
+        assert query_counter.count == 2
+        assert 'email' not in query_counter.statements[-1]
+    
+    def test_unknown_field(self, client, session):
+        """Test that an unknown field is rejected."""
+        response = client.get('/customers/api/customers?fields=full_name')
+        assert response.status_code == 400
+        assert 'full_name' in json.loads(response.data)['error']
+    
+    def test_ndjson_stream(self, client, many_customers):
+        """Test the newline-delimited JSON format."""
+        response = client.get('/customers/api/customers?format=ndjson&fields=customer_id')
+        assert response.mimetype == 'application/x-ndjson'
+        
+        lines = response.data.decode().strip().split('\n')
+        assert len(lines) == 7
+        assert all('customer_id' in json.loads(line) for line in lines)
+    
+    def test_limit_is_capped(self, app, client, many_customers):
+        """Test that limit cannot exceed API_MAX_LIMIT."""
+        previous = app.config['API_MAX_LIMIT']
+        app.config['API_MAX_LIMIT'] = 5
+        try:
+            response = client.get('/customers/api/customers?limit=500')
+        finally:
+            app.config['API_MAX_LIMIT'] = previous
+        
+        assert len(json.loads(response.data)) == 5
+        assert 'X-Next-Cursor' in response.headers
@@ -0,0 +1,102 @@
+"""
+Tests for the route and serialization benchmarks: route discovery, regression checks and speedups.
+"""
+import copy
+from benchmarks import routes as benchmarks
+from benchmarks import serialization
+
+
+def _results(**route):
+    case = {'url': '/policies/', 'status': 200, 'samples': 20, 'p50_ms': 8.0, 'p95_ms': 10.0,
+            'queries': 2, 'peak_kib': 140.0}
+    case.update(route)
+    return {'scales': {'10': {'routes': {'policy.index': case}}}}
+
+
+class TestBenchmarks:
+    """Test cases for the benchmark helpers."""
+
+    def test_percentile(self):
+        """Test that percentiles interpolate between the nearest samples."""
+        values = [5, 1, 4, 2, 3]
+        assert benchmarks.percentile(values, 0.5) == 3
+        assert benchmarks.percentile(values, 0.95) == 4.8
+        assert benchmarks.percentile([7], 0.95) == 7
+
+    def test_cases_cover_every_get_route(self, app):
+        """Test that every GET page with fillable arguments is benchmarked, POST-only ones are not."""
+        arguments = {name: 1 for name in benchmarks.ARGUMENTS}
+        cases = dict(benchmarks.cases(app, arguments))
+
+        assert cases['index'] == '/'
+        assert cases['policy.view'] == '/policies/1'
+        assert cases['claim.api_policy_claims'] == '/claims/api/policy/1/claims'
+        assert 'policy.create' not in cases
+        assert 'static' not in cases
+        assert set(dict(benchmarks.EXTRA_CASES)) <= set(cases)
+
+    def test_unchanged_results_pass(self):
+        """Test that results equal to the baseline are not regressions."""
+        assert benchmarks.compare(_results(), _results()) == []
+
+    def test_regressions_are_flagged(self):
+        """Test that slower, chattier or hungrier cases are reported."""
+        regressions = benchmarks.compare(
+            _results(p95_ms=20.0, queries=3, peak_kib=400.0, status=500), _results())
+        assert len(regressions) == 4
+        assert 'scale 10 policy.index: p95 10.0 -> 20.0 ms' in regressions
+        assert 'scale 10 policy.index: queries 2 -> 3' in regressions
+
+    def test_noise_is_tolerated(self):
+        """Test that small absolute changes and new cases do not count as regressions."""
+        current = _results(p95_ms=11.9, peak_kib=180.0)
+        current['scales']['10']['routes']['new.case'] = copy.deepcopy(
+            current['scales']['10']['routes']['policy.index'])
+        assert benchmarks.compare(current, _results()) == []
+
+
+class TestSerializationBenchmark:
+    """Test cases for the serialization benchmark."""
+
+    def test_measure_compares_both_bodies(self, app, session, sample_claim):
+        """Test that an endpoint is timed both ways and its body matches to_dict."""
+        from models import loaders
+        from models.claim import Claim
+        result = serialization.measure(app, '/claims/api/claims', Claim, loaders.claim_list, repeat=1)
+        assert result['rows'] == 1
+        assert result['same_output'] is True
+        assert result['per_row_ms'] > 0 and result['batch_ms'] > 0
+
+    def test_overall_speedup_is_by_total_time(self):
+        """Test that small tables do not outweigh large ones in the overall speedup."""
+        results = [{'per_row_ms': 1.0, 'batch_ms': 2.0}, {'per_row_ms': 99.0, 'batch_ms': 8.0}]
+        assert serialization.overall_speedup(results) == 10.0
+
+    def test_each_large_endpoint_is_gated(self):
+        """Test that a slow large endpoint fails even when the total passes, and small ones only need to keep up."""
+        def result(url, rows, per_row_ms, batch_ms):
+            return {'url': url, 'rows': rows, 'per_row_ms': per_row_ms, 'batch_ms': batch_ms,
+                    'speedup': round(per_row_ms / batch_ms, 1), 'same_output': True}
+
+        small = result('/agencies/api/agencies', 10, 3.0, 2.0)
+        large = result('/policies/api/policies', 8000, 900.0, 100.0)
+        assert serialization.failures([small, large], min_speedup=5, min_rows=1000) == []
+
+        slower = result('/agencies/api/agencies', 10, 1.0, 2.0)
+        assert serialization.failures([slower, large], min_speedup=5, min_rows=1000) == [
+            '/agencies/api/agencies: 0.5x, below 1x for 10 rows']
+
+        lagging = result('/claims/api/claims', 5000, 200.0, 50.0)
+        assert serialization.failures([lagging, large], min_speedup=5, min_rows=1000) == [
+            '/claims/api/claims: 4.0x, below 5x for 5000 rows']
+
+    def test_customers_have_a_lower_gate(self):
+        """Test that the customer list is held to its own, lower speedup."""
+        customers = {'url': '/customers/api/customers', 'rows': 5000, 'per_row_ms': 225.0,
+                     'batch_ms': 50.0, 'speedup': 4.5, 'same_output': True}
+        large = {'url': '/policies/api/policies', 'rows': 8000, 'per_row_ms': 900.0,
+                 'batch_ms': 100.0, 'speedup': 9.0, 'same_output': True}
+        assert serialization.failures([customers, large], min_speedup=5, min_rows=1000) == []
+        customers.update(per_row_ms=175.0, speedup=3.5)
+        assert serialization.failures([customers, large], min_speedup=5, min_rows=1000) == [
+            '/customers/api/customers: 3.5x, below 4x for 5000 rows']
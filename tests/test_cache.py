@@ -0,0 +1,203 @@
+"""
+Tests for the application cache: backends, tag invalidation, cached views and hit/miss stats.
+"""
+import os
+import pytest
+from flask import Flask
+from datetime import date
+from config import Config
+from models.agency import Agency
+from models.customer import Customer
+from models.policy import Policy
+from services import cache
+from services import lifecycle
+from services import metrics
+
+
+@pytest.fixture(params=['memory', 'filesystem', 'network'])
+def backend(request, app, tmp_path, monkeypatch):
+    """Each backend in turn as the app's cache store."""
+    store = {
+        'memory': lambda: cache.MemoryBackend(),
+        'filesystem': lambda: cache.FileBackend(str(tmp_path / 'cache')),
+        'network': lambda: cache.NetworkBackend(cache.LocalClient()),
+    }[request.param]()
+    monkeypatch.setitem(app.extensions, 'cache', store)
+    return store
+
+
+class _Counter:
+    """A compute function that counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+
+class TestBackends:
+    """Test cases for the cache stores."""
+
+    def test_round_trip(self, backend):
+        """Test that stored values are read back, missing keys as None."""
+        backend.set_many({'a': ('tokens', b'body'), 'b': {'n': 1}}, ttl=60)
+        assert backend.get_many(['a', 'b', 'missing']) == [('tokens', b'body'), {'n': 1}, None]
+        backend.delete('a')
+        assert backend.get_many(['a']) == [None]
+        backend.clear()
+        assert backend.get_many(['b']) == [None]
+
+    def test_memory_evicts_least_recently_used(self):
+        """Test that the in-process LRU keeps the entries read most recently."""
+        store = cache.MemoryBackend(max_entries=2)
+        store.set_many({'a': 1, 'b': 2})
+        store.get_many(['a'])
+        store.set_many({'c': 3})
+        assert store.get_many(['a', 'b', 'c']) == [1, None, 3]
+
+    def test_create_backend(self, app, monkeypatch, tmp_path):
+        """Test that CACHE_BACKEND picks the store and rejects unknown names."""
+        monkeypatch.setitem(app.config, 'CACHE_DIR', str(tmp_path))
+        expected = {'memory': cache.MemoryBackend, 'filesystem': cache.FileBackend,
+                    'network': cache.NetworkBackend}
+        for name, backend_class in expected.items():
+            monkeypatch.setitem(app.config, 'CACHE_BACKEND', name)
+            assert isinstance(cache.create_backend(app), backend_class)
+        monkeypatch.setitem(app.config, 'CACHE_BACKEND', 'none')
+        assert cache.create_backend(app) is None
+        monkeypatch.setitem(app.config, 'CACHE_BACKEND', 'memcache')
+        with pytest.raises(ValueError):
+            cache.create_backend(app)
+
+    def test_default_backend_is_shared(self, app, monkeypatch, tmp_path):
+        """Test that the default store is one every Gunicorn worker sees."""
+        monkeypatch.setitem(app.config, 'CACHE_DIR', str(tmp_path))
+        monkeypatch.delitem(app.config, 'CACHE_BACKEND')
+        assert isinstance(cache.create_backend(app), cache.FileBackend)
+        if 'CACHE_BACKEND' not in os.environ:
+            assert Config.CACHE_BACKEND == 'filesystem'
+
+
+class TestTags:
+    """Test cases for tag invalidation."""
+
+    def test_remember_until_a_tag_is_invalidated(self, session, backend):
+        """Test that a value is computed once, and again only after one of its tags changes."""
+        compute = _Counter()
+        tags = [cache.row(Customer, 1), cache.table(Policy)]
+        assert cache.remember('key', tags, compute, ttl=60) == {'calls': 1}
+        assert cache.remember('key', tags, compute, ttl=60) == {'calls': 1}
+
+        cache.invalidate(cache.row(Customer, 2))
+        assert cache.remember('key', tags, compute, ttl=60) == {'calls': 1}
+        cache.invalidate(cache.table(Policy))
+        assert cache.remember('key', tags, compute, ttl=60) == {'calls': 2}
+
+    def test_commit_invalidates_written_rows(self, session, sample_customer):
+        """Test that committing an ORM change drops the entries tagged with its row."""
+        compute = _Counter()
+        tags = [cache.row(Customer, sample_customer.customer_id)]
+        cache.remember('customer', tags, compute, ttl=60)
+
+        sample_customer.city = 'Shelbyville'
+        session.flush()
+        session.rollback()
+        assert cache.remember('customer', tags, compute, ttl=60) == {'calls': 1}
+
+        session.get(Customer, sample_customer.customer_id).city = 'Shelbyville'
+        session.commit()
+        assert cache.remember('customer', tags, compute, ttl=60) == {'calls': 2}
+
+    def test_set_based_writers_invalidate(self, session, sample_policy):
+        """Test that rows changed by the lifecycle job's bulk UPDATEs are invalidated."""
+        compute = _Counter()
+        tags = [cache.row(Policy, sample_policy.policy_id)]
+        cache.remember('policy', tags, compute, ttl=60)
+
+        lifecycle.run(today=date(2100, 1, 1))
+        assert cache.remember('policy', tags, compute, ttl=60) == {'calls': 2}
+
+    def test_disabled(self, app, session, monkeypatch):
+        """Test that CACHE_BACKEND none computes every time."""
+        monkeypatch.setitem(app.extensions, 'cache', None)
+        compute = _Counter()
+        cache.remember('key', [], compute, ttl=60)
+        assert cache.remember('key', [], compute, ttl=60) == {'calls': 2}
+
+
+class TestCachedViews:
+    """Test cases for the cached pages and APIs."""
+
+    def test_hit_skips_the_database(self, client, session, sample_agency, backend, query_counter):
+        """Test that a repeated page is served without SQL until its rows change."""
+        first = client.get('/agencies/')
+        with query_counter:
+            second = client.get('/agencies/')
+        assert query_counter.count == 0
+        assert second.get_data() == first.get_data()
+
+        sample_agency.name = 'Renamed Agency'
+        session.commit()
+        assert 'Renamed Agency' in client.get('/agencies/').get_data(as_text=True)
+
+    def test_databases_do_not_share_entries(self, tmp_path):
+        """Test that two apps on other databases but one CACHE_DIR get their own pages and values."""
+        def make_app(name):
+            other = Flask(name)
+            other.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / name}.db',
+                                CACHE_BACKEND='filesystem', CACHE_DIR=str(tmp_path / 'cache'),
+                                CACHE_DEFAULT_TTL=60)
+            cache.init_app(other)
+
+            @other.route('/page')
+            @cache.cached(lambda: ['policy'])
+            def page():
+                return name
+
+            return other
+
+        first, second = make_app('first'), make_app('second')
+        assert first.test_client().get('/page').get_data(as_text=True) == 'first'
+        assert second.test_client().get('/page').get_data(as_text=True) == 'second'
+        with first.app_context():
+            assert cache.remember('total', ['policy'], lambda: 1) == 1
+        with second.app_context():
+            assert cache.remember('total', ['policy'], lambda: 2) == 2
+
+    def test_by_agency_api(self, client, session, sample_agent, query_counter):
+        """Test that the agency dropdown's agent list is cached per agency."""
+        url = f'/agents/api/by-agency/{sample_agent.agency_id}'
+        client.get(url)
+        with query_counter:
+            response = client.get(url)
+        assert response.status_code == 200
+        assert response.json[0]['agent_id'] == sample_agent.agent_id
+        # Only the conditional GET's validator runs
+        assert query_counter.count == 1
+
+    def test_detail_page_follows_its_row(self, client, session, sample_agency, sample_customer):
+        """Test that a detail page is dropped when its row changes, not when another one does."""
+        url = f'/customers/{sample_customer.customer_id}'
+        client.get(url)
+        session.add(Agency(name='Unrelated Agency'))
+        session.add(Customer(first_name='Other', last_name='Person'))
+        session.commit()
+        client.get(url)
+
+        sample_customer.last_name = 'Changed'
+        session.commit()
+        assert 'Changed' in client.get(url).get_data(as_text=True)
+        assert cache.stats()['customer.view'] == {'hits': 1, 'misses': 2}
+
+    def test_stats_are_exported(self, app, client, session, monkeypatch):
+        """Test that hits and misses per endpoint are served at /metrics."""
+        monkeypatch.setitem(app.config, 'METRICS_ENABLED', True)
+        metrics.reset()
+        client.get('/claims/')
+        client.get('/claims/')
+        text = client.get('/metrics').get_data(as_text=True)
+
+        assert 'insuremate_cache_hits_total{endpoint="claim.index"} 1' in text
+        assert 'insuremate_cache_misses_total{endpoint="claim.index"} 1' in text
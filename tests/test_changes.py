@@ -0,0 +1,157 @@
+"""
+Tests for the change log and the /api/changes incremental feed.
+"""
+import io
+import json
+import pytest
+from datetime import date
+from models.agency import Agency
+from models.customer import Customer
+from models.policy import Policy
+from models.change_log import ChangeLog
+from services import changes
+from services import importer
+from services import lifecycle
+
+
+def _log(session, since=0):
+    """The (entity, id, operation) of every change after ``since``, in order."""
+    return [(c.entity, c.entity_id, c.operation)
+            for c in session.query(ChangeLog).filter(ChangeLog.change_id > since)
+            .order_by(ChangeLog.change_id)]
+
+
+def _feed(client, since):
+    response = client.get(f'/api/changes?since={since}')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+
+class TestChangeLog:
+    """Test cases for writing the change log from session events."""
+
+    def test_orm_writes_are_logged(self, session, sample_agency):
+        """Test that inserts, updates and deletes are each logged once."""
+        since = changes.head()
+        sample_agency.phone = '555-0000'
+        session.commit()
+        session.delete(sample_agency)
+        session.commit()
+        assert _log(session, since) == [('agency', sample_agency.agency_id, 'update'),
+                                        ('agency', sample_agency.agency_id, 'delete')]
+
+    def test_changes_are_batched_per_commit(self, session, query_counter):
+        """Test that one commit writes all its changes with a single INSERT."""
+        with query_counter:
+            session.add_all([Customer(first_name=f'C{i}', last_name='Batch') for i in range(3)])
+            session.flush()
+            session.add(Customer(first_name='Late', last_name='Batch'))
+            session.commit()
+        inserts = [s for s in query_counter.statements if s.startswith('INSERT INTO change_log')]
+        assert len(inserts) == 1
+        assert [op for entity, _, op in _log(session)] == ['insert'] * 4
+
+    def test_insert_then_update_is_an_insert(self, session):
+        """Test that a row created and changed in one transaction is logged as an insert."""
+        customer = Customer(first_name='New', last_name='Row')
+        session.add(customer)
+        session.flush()
+        customer.city = 'Springfield'
+        session.commit()
+        assert _log(session) == [('customer', customer.customer_id, 'insert')]
+
+    def test_rollback_discards_changes(self, session):
+        """Test that nothing is logged for a transaction that rolls back."""
+        session.add(Customer(first_name='Gone', last_name='Soon'))
+        session.flush()
+        session.rollback()
+        session.commit()
+        assert _log(session) == []
+
+    def test_database_cascade_is_logged(self, session, sample_claim):
+        """Test that rows removed by ON DELETE CASCADE get tombstones too."""
+        policy = sample_claim.policy
+        expected = sorted([
+            ('agency', policy.agent.agency_id, 'delete'),
+            ('agent', policy.agent_id, 'delete'),
+            ('policy', policy.policy_id, 'delete'),
+            ('claim', sample_claim.claim_id, 'delete'),
+        ])
+        since = changes.head()
+        session.delete(session.get(Agency, policy.agent.agency_id))
+        session.commit()
+        assert sorted(_log(session, since)) == expected
+
+    def test_set_based_writers_are_logged(self, session, sample_agent, sample_customer):
+        """Test that the lifecycle job and the CSV import record the rows they write."""
+        result = importer.import_csv('policies', io.StringIO(
+            'agent_id,customer_id,policy_number,policy_type,start_date,end_date,policy_status\n'
+            f'{sample_agent.agent_id},{sample_customer.customer_id},POL-FEED,Auto,'
+            '2019-01-01,2020-01-01,Active\n'
+        ))
+        assert result.imported == 1
+        policy_id = session.query(Policy.policy_id).filter_by(policy_number='POL-FEED').scalar()
+        since = changes.head()
+        lifecycle.run(today=date(2020, 6, 1))
+
+        assert ('policy', policy_id, 'insert') in _log(session)
+        assert _log(session, since) == [('policy', policy_id, 'update')]
+
+
+class TestChangeFeed:
+    """Test cases for the /api/changes endpoint."""
+
+    def test_without_cursor_returns_head(self, client, session, sample_policy):
+        """Test that the first call hands out the current head and no changes."""
+        data = json.loads(client.get('/api/changes').data)
+        assert data == {'changes': [], 'next_cursor': changes.head(), 'has_more': False}
+        assert data['next_cursor'] > 0
+
+    def test_changes_since_cursor(self, client, session, sample_policy):
+        """Test that only rows changed after the cursor are returned, as they are now."""
+        since = changes.head()
+        sample_policy.premium = 999
+        session.commit()
+        sample_policy.premium = 1000
+        session.commit()
+
+        data = _feed(client, since)
+        assert len(data['changes']) == 1
+        entry = data['changes'][0]
+        assert (entry['entity'], entry['id'], entry['operation']) == \
+            ('policy', sample_policy.policy_id, 'update')
+        assert entry['data']['premium'] == 1000.0
+        assert data['next_cursor'] == changes.head()
+        assert _feed(client, data['next_cursor'])['changes'] == []
+
+    def test_deleted_rows_are_tombstones(self, client, session, sample_claim):
+        """Test that a deleted row is sent with no data."""
+        since = changes.head()
+        claim_id = sample_claim.claim_id
+        session.delete(sample_claim)
+        session.commit()
+
+        entry = _feed(client, since)['changes'][0]
+        assert entry == {**entry, 'entity': 'claim', 'id': claim_id, 'operation': 'delete',
+                         'data': None}
+
+    def test_pages_follow_the_cursor(self, client, session):
+        """Test that a limited page reports more changes and its cursor resumes after it."""
+        since = changes.head()
+        session.add_all([Customer(first_name=f'P{i}', last_name='Page') for i in range(5)])
+        session.commit()
+
+        first = json.loads(client.get(f'/api/changes?since={since}&limit=3').data)
+        second = json.loads(client.get(f"/api/changes?since={first['next_cursor']}&limit=3").data)
+        assert (len(first['changes']), first['has_more']) == (3, True)
+        assert (len(second['changes']), second['has_more']) == (2, False)
+        ids = [e['id'] for e in first['changes'] + second['changes']]
+        assert len(set(ids)) == 5
+
+    def test_refused_without_a_single_writer(self, client, session, monkeypatch):
+        """Test that the feed is refused on databases that may commit out of change_id order."""
+        monkeypatch.setattr(session.get_bind().dialect, 'name', 'postgresql')
+        for url in ('/api/changes', '/api/changes?since=0'):
+            response = client.get(url)
+            assert response.status_code == 501
+            assert 'SQLite' in json.loads(response.data)['error']
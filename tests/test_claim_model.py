@@ -191,3 +191,11 @@ class TestClaimModel:
         
         assert float(claim.settlement_amount) == 9500.00
         assert claim.resolution_date == datetime.today().date()
+    
+    def test_claim_status_registry(self):
+        """Test that every registered status is either open or closed."""
+        assert set(Claim.OPEN_STATUSES).isdisjoint(Claim.CLOSED_STATUSES)
+        assert set(Claim.STATUSES) == set(Claim.OPEN_STATUSES) | set(Claim.CLOSED_STATUSES)
+        for status in Claim.STATUSES:
+            claim = Claim(status=status)
+            assert claim.is_open() != claim.is_closed()
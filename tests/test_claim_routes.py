@@ -4,6 +4,7 @@ Integration tests for claim routes.
 import pytest
 import json
 from datetime import datetime, timedelta
+from decimal import Decimal
 
 
 class TestClaimRoutes:
@@ -21,6 +22,14 @@ class TestClaimRoutes:
         assert response.status_code == 200
         assert b'CLM-TEST456' in response.data
     
+    def test_claim_index_status_filter_from_registry(self, client, sample_claim, query_counter):
+        """Test that the status dropdown lists the registry without a DISTINCT scan."""
+        with query_counter:
+            response = client.get('/claims/')
+        assert b'<option value="Under Review"' in response.data
+        assert b'<option value="Withdrawn"' in response.data
+        assert not any('DISTINCT' in sql for sql in query_counter.statements)
+    
     def test_claim_create_form(self, client, sample_policy):
         """Test the claim create form page."""
         response = client.get('/claims/create')
@@ -94,6 +103,34 @@ class TestClaimRoutes:
         
         assert response.status_code == 200
     
+    def test_claim_edit_settles(self, client, session, sample_claim):
+        """Test that settling a claim records its settlement amount and resolution date."""
+        response = client.post(f'/claims/{sample_claim.claim_id}/edit', data={
+            'description': 'Settled',
+            'claim_amount': '6000.00',
+            'status': 'Settled',
+            'settlement_amount': '5,500.00'
+        })
+        assert response.status_code == 302
+        session.refresh(sample_claim)
+        assert sample_claim.settlement_amount == Decimal('5500.00')
+        assert sample_claim.resolution_date is not None
+    
+    @pytest.mark.parametrize('field, value, message', [
+        ('status', 'Paid', b'Status must be one of'),
+        ('claim_amount', '-10', b'Claim amount must be a positive number'),
+        ('settlement_amount', 'all of it', b'Settlement amount must be a number'),
+    ])
+    def test_claim_edit_rejects(self, client, session, sample_claim, field, value, message):
+        """Test that an invalid edit is flashed back and leaves the claim unchanged."""
+        response = client.post(f'/claims/{sample_claim.claim_id}/edit', data={
+            'description': 'Updated', 'claim_amount': '6000.00', 'status': 'Settled',
+            'settlement_amount': '10', field: value})
+        assert response.status_code == 200
+        assert message in response.data
+        session.refresh(sample_claim)
+        assert sample_claim.status == 'Open'
+    
     def test_claim_delete(self, client, session, sample_claim):
         """Test deleting a claim."""
         claim_id = sample_claim.claim_id
@@ -0,0 +1,134 @@
+"""
+Tests for row versions and conditional GET (ETag / 304) on detail pages and APIs.
+"""
+import pytest
+from datetime import date
+from models.claim import Claim
+from models.policy import Policy
+from services import lifecycle
+
+
+def _revalidate(client, url):
+    """Fetch ``url`` and then ask for it again with the ETag it returned."""
+    first = client.get(url)
+    assert first.status_code == 200
+    return first, client.get(url, headers={'If-None-Match': first.headers['ETag']})
+
+
+class TestRowVersions:
+    """Test cases for the version counter on entity rows."""
+
+    def test_update_bumps_version(self, session, sample_policy):
+        """Test that every ORM UPDATE increments the row version and write time."""
+        assert sample_policy.version == 1
+        written = sample_policy.updated_at
+        sample_policy.premium = 1300
+        session.commit()
+        assert sample_policy.version == 2
+        assert sample_policy.updated_at >= written
+
+    def test_lifecycle_bulk_update_bumps_version(self, session, sample_policy):
+        """Test that the nightly job's set-based UPDATE bumps versions too."""
+        sample_policy.end_date = date(2020, 1, 1)
+        session.commit()
+        lifecycle.run(today=date(2020, 6, 1))
+
+        session.expire_all()
+        assert session.get(Policy, sample_policy.policy_id).version == 3
+
+
+class TestConditionalGet:
+    """Test cases for ETag validation on detail pages and JSON APIs."""
+
+    @pytest.mark.parametrize('url', [
+        '/agencies/{agency_id}',
+        '/agents/{agent_id}',
+        '/customers/{customer_id}',
+        '/policies/{policy_id}',
+        '/claims/{claim_id}',
+        '/policies/api/policies',
+        '/claims/api/policy/{policy_id}/claims',
+        '/agents/api/{agent_id}/stats',
+    ])
+    def test_unchanged_page_is_not_modified(self, client, sample_claim, url):
+        """Test that a matching If-None-Match gets an empty 304 with the same ETag."""
+        policy = sample_claim.policy
+        url = url.format(agency_id=policy.agent.agency_id, agent_id=policy.agent_id,
+                         customer_id=policy.customer_id, policy_id=policy.policy_id,
+                         claim_id=sample_claim.claim_id)
+        first, second = _revalidate(client, url)
+
+        assert first.headers['Cache-Control'] == 'no-cache'
+        assert 'Last-Modified' in first.headers
+        assert second.status_code == 304
+        assert second.data == b''
+        assert second.headers['ETag'] == first.headers['ETag']
+
+    def test_not_modified_skips_the_view(self, client, sample_claim, query_counter):
+        """Test that a 304 costs the validator SELECT and nothing else."""
+        url = f'/policies/{sample_claim.policy_id}'
+        etag = client.get(url).headers['ETag']
+        with query_counter:
+            response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert query_counter.count == 1
+
+    def test_change_to_related_row_changes_etag(self, client, session, sample_claim):
+        """Test that editing a claim changes the ETag of its policy's page."""
+        url = f'/policies/{sample_claim.policy_id}'
+        etag = client.get(url).headers['ETag']
+        sample_claim.status = 'Closed'
+        session.commit()
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_deleted_child_changes_etag(self, client, session, sample_claim):
+        """Test that deleting a row changes the ETag of the list it was in."""
+        url = '/claims/api/claims'
+        etag = client.get(url).headers['ETag']
+        session.delete(session.get(Claim, sample_claim.claim_id))
+        session.commit()
+
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+    def test_deleted_renewed_policy_changes_renewal_etag(self, client, session, sample_policy):
+        """Test that deleting a renewed policy changes the ETag of its renewal's page."""
+        renewal = Policy(agent_id=sample_policy.agent_id, customer_id=sample_policy.customer_id,
+                         policy_number='POL-TEST123-R', policy_type='Auto Insurance',
+                         start_date=sample_policy.end_date, renewed_from_id=sample_policy.policy_id)
+        session.add(renewal)
+        session.commit()
+        url = f'/policies/{renewal.policy_id}'
+        etag = client.get(url).headers['ETag']
+
+        # Follow the redirect so the flash is shown before the revalidation
+        response = client.post(f'/policies/{sample_policy.policy_id}/delete', follow_redirects=True)
+        assert response.status_code == 200
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_query_string_is_part_of_etag(self, client, sample_policy):
+        """Test that different query strings of one API get different ETags."""
+        full = client.get('/policies/api/policies').headers['ETag']
+        projected = client.get('/policies/api/policies?fields=policy_number').headers['ETag']
+        assert full != projected
+
+    def test_pending_flash_is_not_validated(self, client, sample_policy):
+        """Test that a page carrying a flash message is always rendered in full."""
+        url = f'/policies/{sample_policy.policy_id}'
+        etag = client.get(url).headers['ETag']
+        with client.session_transaction() as flask_session:
+            flask_session['_flashes'] = [('success', 'Policy updated successfully!')]
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert b'Policy updated successfully!' in response.data
+
+    def test_missing_row_is_not_found(self, client, session):
+        """Test that a validator for a missing row still lets the view answer 404."""
+        response = client.get('/policies/999999')
+        assert response.status_code == 404
+        assert 'ETag' not in response.headers
@@ -0,0 +1,55 @@
+"""
+Tests for the production engine and server configuration.
+"""
+import runpy
+from pathlib import Path
+from sqlalchemy import text
+from config import Config, _engine_options
+
+
+class TestSqlitePragmas:
+    """Test cases for the PRAGMAs applied to each SQLite connection."""
+    
+    def test_pragmas_applied(self, session):
+        """Test that new connections use WAL with the configured settings."""
+        assert session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        # 1 == NORMAL
+        assert session.execute(text('PRAGMA synchronous')).scalar() == 1
+        assert session.execute(text('PRAGMA busy_timeout')).scalar() == Config.SQLITE_PRAGMAS['busy_timeout']
+        assert session.execute(text('PRAGMA cache_size')).scalar() == Config.SQLITE_PRAGMAS['cache_size']
+        assert session.execute(text('PRAGMA foreign_keys')).scalar() == 1
+
+
+class TestEngineOptions:
+    """Test cases for the connection pool options."""
+    
+    def test_sqlite_uses_defaults(self):
+        """Test that SQLite URLs get no pool options."""
+        assert _engine_options('sqlite:///insurance.db') == {}
+    
+    def test_server_database_pool(self, monkeypatch):
+        """Test pool sizing for server databases, overridable from the environment."""
+        monkeypatch.setenv('DB_POOL_SIZE', '3')
+        options = _engine_options('postgresql://user@localhost/insuremate')
+        assert options['pool_size'] == 3
+        assert options['max_overflow'] == 20
+        assert options['pool_pre_ping'] is True
+
+
+class TestGunicornConfig:
+    """Test cases for gunicorn.conf.py."""
+    
+    def test_settings_come_from_config(self):
+        """Test that the server settings mirror Config."""
+        settings = runpy.run_path(str(Path(__file__).parent.parent / 'gunicorn.conf.py'))
+        assert settings['bind'] == Config.WEB_BIND
+        assert settings['workers'] == Config.WEB_WORKERS
+        assert settings['threads'] == Config.WEB_THREADS
+        assert settings['worker_class'] == 'gthread'
+        assert settings['preload_app'] is True
+    
+    def test_wsgi_entry_point(self, app):
+        """Test that wsgi.py exposes the application."""
+        import wsgi
+        assert wsgi.app is app
+        assert wsgi.application is app
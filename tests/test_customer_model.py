@@ -126,3 +126,13 @@ class TestCustomerModel:
         from models.policy import Policy
         deleted_policy = session.get(Policy, policy_id)
         assert deleted_policy is None
+    
+    def test_customer_policy_count(self, session, sample_customer, sample_policy):
+        """Test that policy_count is computed in SQL without loading policies."""
+        from models.customer import Customer
+        session.expire_all()
+        customer = session.get(Customer, sample_customer.customer_id)
+        
+        assert customer.policy_count == 1
+        assert 'policies' not in customer.__dict__
+        assert customer.to_dict()['policy_count'] == 1
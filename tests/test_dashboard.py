@@ -0,0 +1,83 @@
+"""
+Unit tests for the dashboard snapshot service.
+"""
+import pytest
+from models.agency import Agency
+from models.claim import Claim
+from services import dashboard
+
+
+@pytest.fixture
+def dashboard_ttl(app):
+    """Enable the dashboard cache for the duration of a test."""
+    previous = app.config.get('DASHBOARD_CACHE_TTL')
+    app.config['DASHBOARD_CACHE_TTL'] = 60
+    dashboard.invalidate()
+    yield 60
+    app.config['DASHBOARD_CACHE_TTL'] = previous
+    dashboard.invalidate()
+
+
+class TestDashboard:
+    """Test cases for the dashboard snapshot service."""
+    
+    def test_counts(self, sample_claim):
+        """Test that every dashboard counter is returned."""
+        counts = dashboard.get_dashboard_counts()
+        
+        assert counts == {
+            'agency_count': 1,
+            'agent_count': 1,
+            'customer_count': 1,
+            'policy_count': 1,
+            'claim_count': 1,
+            'open_claim_count': 1,
+        }
+    
+    def test_counts_use_single_query(self, session, query_counter):
+        """Test that the counters are read in one round trip."""
+        with query_counter:
+            dashboard.get_dashboard_counts()
+        
+        assert query_counter.count == 1
+    
+    def test_cached_snapshot_skips_database(self, session, dashboard_ttl, query_counter):
+        """Test that a fresh snapshot is served without querying."""
+        dashboard.get_dashboard_counts()
+        
+        with query_counter:
+            dashboard.get_dashboard_counts()
+        
+        assert query_counter.count == 0
+    
+    def test_commit_invalidates_snapshot(self, session, dashboard_ttl):
+        """Test that inserting a row drops the cached snapshot."""
+        assert dashboard.get_dashboard_counts()['agency_count'] == 0
+        
+        session.add(Agency(name="Fresh Agency"))
+        session.commit()
+        
+        assert dashboard.get_dashboard_counts()['agency_count'] == 1
+    
+    def test_claim_status_change_invalidates_snapshot(self, session, sample_claim, dashboard_ttl):
+        """Test that closing a claim refreshes the open claim count."""
+        assert dashboard.get_dashboard_counts()['open_claim_count'] == 1
+        
+        sample_claim.status = 'Closed'
+        session.commit()
+        
+        assert dashboard.get_dashboard_counts()['open_claim_count'] == 0
+    
+    def test_rollback_keeps_snapshot(self, session, dashboard_ttl, query_counter):
+        """Test that a rolled-back flush does not invalidate the snapshot."""
+        dashboard.get_dashboard_counts()
+        
+        session.add(Agency(name="Never Committed"))
+        session.flush()
+        session.rollback()
+        
+        with query_counter:
+            counts = dashboard.get_dashboard_counts()
+        
+        assert query_counter.count == 0
+        assert counts['agency_count'] == 0
@@ -0,0 +1,243 @@
+"""
+Tests for database-level cascading deletes and the background chunked delete.
+"""
+import pytest
+import json
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from models.job_run import JobRun
+from models.change_log import ChangeLog
+from services import deletion
+
+
+AGENTS = 3
+POLICIES_PER_AGENT = 4
+
+
+@pytest.fixture
+def agency_tree(session, sample_agency, sample_customer):
+    """An agency with several agents, each with policies that each have a claim."""
+    today = datetime.today().date()
+    agents = [Agent(agency_id=sample_agency.agency_id, first_name=f'Agent{i}', last_name='Tree')
+              for i in range(AGENTS)]
+    session.add_all(agents)
+    session.flush()
+    policies = [
+        Policy(agent_id=agent.agent_id, customer_id=sample_customer.customer_id,
+               policy_number=f'POL-T{agent.agent_id}-{i}', policy_type='Auto Insurance',
+               start_date=today, end_date=today + timedelta(days=365))
+        for agent in agents for i in range(POLICIES_PER_AGENT)
+    ]
+    session.add_all(policies)
+    session.flush()
+    session.add_all([
+        Claim(policy_id=policy.policy_id, claim_number=f'CLM-T{policy.policy_id}',
+              claim_date=today, incident_date=today)
+        for policy in policies
+    ])
+    session.commit()
+    return sample_agency
+
+
+# The agency, its agents, their policies and one claim per policy
+TREE_SIZE = 1 + AGENTS + 2 * AGENTS * POLICIES_PER_AGENT
+
+
+def _counts(session):
+    return {model.__name__: session.query(model).count() for model in (Agency, Agent, Policy, Claim)}
+
+
+@pytest.fixture
+def background(app, monkeypatch):
+    """Send every agency/customer delete to the background, one row per chunk."""
+    monkeypatch.setitem(app.config, 'DELETE_BACKGROUND_THRESHOLD', 1)
+    monkeypatch.setitem(app.config, 'DELETE_CHUNK_SIZE', 2)
+    yield
+    deletion.wait(timeout=10)
+
+
+class TestDatabaseCascade:
+    """Test cases for the ON DELETE CASCADE foreign keys."""
+
+    def test_core_delete_cascades(self, session, agency_tree):
+        """Test that deleting the agency row alone removes the whole subtree."""
+        session.execute(delete(Agency).where(Agency.agency_id == agency_tree.agency_id))
+        session.commit()
+        assert _counts(session) == {'Agency': 0, 'Agent': 0, 'Policy': 0, 'Claim': 0}
+
+    def test_orm_delete_does_not_load_children(self, session, agency_tree, query_counter):
+        """Test that the ORM leaves the subtree to the database instead of loading it."""
+        agency = session.get(Agency, agency_tree.agency_id)
+        with query_counter:
+            session.delete(agency)
+            session.commit()
+        # The DELETE, plus one SELECT of the cascaded keys, one UPDATE clearing
+        # renewal links and one INSERT for the change log
+        assert query_counter.count == 4, query_counter.statements
+        assert any(statement.startswith('DELETE FROM agency') for statement in query_counter.statements)
+        assert _counts(session)['Claim'] == 0
+
+    def test_renewal_link_is_cleared(self, session, sample_policy):
+        """Test that deleting a renewed policy keeps its renewal and clears the link."""
+        renewal = Policy(agent_id=sample_policy.agent_id, customer_id=sample_policy.customer_id,
+                         policy_number='POL-TEST123-R', policy_type='Auto Insurance',
+                         start_date=sample_policy.end_date, renewed_from_id=sample_policy.policy_id)
+        session.add(renewal)
+        session.commit()
+        renewal_id = renewal.policy_id
+
+        session.execute(delete(Policy).where(Policy.policy_id == sample_policy.policy_id))
+        session.commit()
+        assert session.get(Policy, renewal_id).renewed_from_id is None
+
+    def test_orm_delete_bumps_renewal_version(self, session, sample_policy):
+        """Test that clearing the renewal link through a delete bumps the renewal's version."""
+        renewal = Policy(agent_id=sample_policy.agent_id, customer_id=sample_policy.customer_id,
+                         policy_number='POL-TEST123-R', policy_type='Auto Insurance',
+                         start_date=sample_policy.end_date, renewed_from_id=sample_policy.policy_id,
+                         updated_at=datetime(2020, 1, 1))
+        session.add(renewal)
+        session.commit()
+
+        session.delete(sample_policy)
+        session.commit()
+        assert renewal.renewed_from_id is None
+        assert renewal.version == 2
+        assert renewal.updated_at > datetime(2020, 1, 1)
+        operations = {change.operation for change in session.query(ChangeLog).filter_by(
+            entity='policy', entity_id=renewal.policy_id)}
+        assert operations == {'insert', 'update'}
+
+        # The renewal's row version is current, so a later edit is not refused as stale
+        renewal.premium = 10
+        session.commit()
+        assert renewal.version == 3
+
+
+class TestDeleteRoutes:
+    """Test cases for the agency and customer delete routes."""
+
+    def test_subtree_size(self, session, agency_tree, sample_customer):
+        """Test the row counts the background threshold is checked against."""
+        assert deletion.subtree_size('agency', agency_tree.agency_id) == TREE_SIZE
+        assert deletion.subtree_size('customer', sample_customer.customer_id) == \
+            1 + 2 * AGENTS * POLICIES_PER_AGENT
+
+    def test_small_agency_deleted_in_request(self, client, session, agency_tree, query_counter):
+        """Test that a delete below the threshold runs in a fixed number of statements."""
+        with query_counter:
+            response = client.post(f'/agencies/{agency_tree.agency_id}/delete')
+        assert response.status_code == 302
+        assert query_counter.count <= 6, query_counter.statements
+        assert _counts(session)['Agent'] == 0
+        assert session.query(JobRun).count() == 0
+
+    def test_large_agency_deleted_in_background(self, client, session, agency_tree, background):
+        """Test that a large agency is deleted by a background job that reports progress."""
+        agency_id = agency_tree.agency_id
+        response = client.post(f'/agencies/{agency_id}/delete', follow_redirects=True)
+        assert b'in the background' in response.data
+        deletion.wait(timeout=10)
+
+        session.expire_all()
+        assert _counts(session) == {'Agency': 0, 'Agent': 0, 'Policy': 0, 'Claim': 0}
+        job_run = session.query(JobRun).one()
+        assert job_run.target == f'agency:{agency_id}'
+
+        data = json.loads(client.get(f'/jobs/api/{job_run.job_run_id}').data)
+        assert data['status'] == 'Succeeded'
+        assert data['deleted_count'] == data['total_count'] == TREE_SIZE
+        assert data['progress'] == 100.0
+
+    def test_large_customer_deleted_in_background(self, client, session, agency_tree,
+                                                  sample_customer, background):
+        """Test that a customer's policies and claims are deleted in chunks, agents kept."""
+        client.post(f'/customers/{sample_customer.customer_id}/delete')
+        deletion.wait(timeout=10)
+
+        session.expire_all()
+        assert session.query(Customer).count() == 0
+        assert _counts(session) == {'Agency': 1, 'Agent': AGENTS, 'Policy': 0, 'Claim': 0}
+        assert session.query(JobRun).one().status == 'Succeeded'
+
+    def test_failed_background_delete_is_recorded(self, session, agency_tree, monkeypatch):
+        """Test that an error stops the job and is recorded on it."""
+        job_run = JobRun(job='delete-agency', target='agency:1')
+        session.add(job_run)
+        session.commit()
+        monkeypatch.setitem(deletion.SUBTREES, 'agency', lambda key: 1 / 0)
+
+        with pytest.raises(ZeroDivisionError):
+            deletion.delete_subtree(job_run, 'agency', agency_tree.agency_id, 10)
+        assert job_run.status == 'Failed'
+        assert 'division' in job_run.error
+
+    def test_job_api_not_found(self, client, session):
+        """Test that an unknown job id is a 404."""
+        assert client.get('/jobs/api/999').status_code == 404
+
+    def test_background_delete_records_cleared_renewal_links(self, session, agency_tree,
+                                                             sample_customer, background):
+        """Test that a renewal outside the subtree is logged as updated when its link is cleared."""
+        other = Customer(first_name='Other', last_name='Customer')
+        session.add(other)
+        session.flush()
+        renewed = session.query(Policy).first()
+        agent = session.query(Agent).first()
+        renewal = Policy(agent_id=agent.agent_id, customer_id=other.customer_id,
+                         policy_number='POL-T-RENEWAL', policy_type='Auto Insurance',
+                         start_date=renewed.end_date, renewed_from_id=renewed.policy_id)
+        session.add(renewal)
+        session.commit()
+        renewal_id = renewal.policy_id
+
+        job_run = deletion.start('customer', sample_customer.customer_id)
+        deletion.wait(timeout=10)
+
+        session.expire_all()
+        assert session.get(JobRun, job_run.job_run_id).status == 'Succeeded'
+        renewal = session.get(Policy, renewal_id)
+        assert renewal.renewed_from_id is None
+        assert renewal.version == 2
+        operations = {change.operation for change in session.query(ChangeLog).filter_by(
+            entity='policy', entity_id=renewal_id)}
+        assert 'update' in operations
+
+
+class TestInterruptedDeletes:
+    """Test cases for background deletes cut off by their process stopping."""
+
+    def test_fail_interrupted(self, session):
+        """Test that deletes left running are failed, and other jobs are left alone."""
+        stale = JobRun(job='delete-agency', target='agency:1')
+        lifecycle_run = JobRun(job='policy-lifecycle')
+        done = JobRun(job='delete-customer', target='customer:1', status='Succeeded')
+        session.add_all([stale, lifecycle_run, done])
+        session.commit()
+
+        assert deletion.fail_interrupted() == 1
+        session.expire_all()
+        assert (stale.status, lifecycle_run.status, done.status) == ('Failed', 'Running', 'Succeeded')
+        assert stale.error == deletion.INTERRUPTED
+        assert stale.finished_at is not None
+
+    def test_shutdown_fails_unfinished_deletes(self, session, sample_agency, monkeypatch):
+        """Test that a stopping process records the deletes it could not finish."""
+        release = threading.Event()
+        monkeypatch.setattr(deletion, 'delete_subtree', lambda *args: release.wait(10))
+        job_run = deletion.start('agency', sample_agency.agency_id, total=1)
+        try:
+            assert deletion.shutdown(timeout=0.05) == 1
+        finally:
+            release.set()
+            deletion.wait(timeout=10)
+
+        session.expire_all()
+        assert session.get(JobRun, job_run.job_run_id).status == 'Failed'
+        assert deletion.shutdown(timeout=1) == 0
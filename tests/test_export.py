@@ -0,0 +1,97 @@
+"""
+Tests for the streaming CSV exports of the list views.
+"""
+import pytest
+import csv
+import io
+from models.agent import Agent
+from models.customer import Customer
+from services import export
+from services import search
+
+
+@pytest.fixture
+def ilike_only(monkeypatch):
+    """Force the portable ILIKE fallback."""
+    monkeypatch.setattr(search, 'fts_available', lambda: False)
+
+
+def _rows(response):
+    text = response.get_data(as_text=True)
+    assert text.startswith('\ufeff')
+    return list(csv.reader(io.StringIO(text[1:])))
+
+
+class TestCsvEncoding:
+    """Test cases for the CSV cell encoding."""
+    
+    def test_formulas_are_escaped(self):
+        """Test that text Excel would evaluate is quoted."""
+        assert export._cell('=HYPERLINK("x")') == '\'=HYPERLINK("x")'
+        assert export._cell('Jane') == 'Jane'
+        assert export._cell(None) == ''
+    
+    def test_encoding_is_incremental(self):
+        """Test that rows are encoded in batches rather than one body."""
+        chunks = list(export._encode(([i] for i in range(10)), ['n'], batch_size=3))
+        assert len(chunks) == 4
+        assert ''.join(chunks) == '\ufeffn\r\n' + ''.join(f'{i}\r\n' for i in range(10))
+
+
+class TestExportRoutes:
+    """Test cases for the export endpoints."""
+    
+    def test_policy_export(self, client, sample_policy):
+        """Test the policy export columns and download headers."""
+        response = client.get('/policies/export')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert response.headers['Content-Disposition'].startswith('attachment; filename="policies-')
+        rows = _rows(response)
+        assert rows[0][:4] == ['Policy Number', 'Policy Type', 'Customer', 'Agent']
+        assert rows[1][:4] == ['POL-TEST123', 'Auto Insurance', 'Jane Smith', 'John Doe']
+        assert rows[1][5] == '1200.00'
+    
+    @pytest.mark.parametrize('query, count', [
+        ('?status=Active', 1),
+        ('?status=Expired', 0),
+        ('?search=smith', 1),
+        ('?search=nobody', 0),
+    ])
+    def test_policy_export_filters(self, client, sample_policy, query, count):
+        """Test that the export applies the list view's filters."""
+        assert len(_rows(client.get(f'/policies/export{query}'))) == count + 1
+    
+    def test_policy_export_fallback_search(self, client, sample_policy, ilike_only):
+        """Test the export with the ILIKE search, which joins customer and agent itself."""
+        rows = _rows(client.get('/policies/export?search=john'))
+        assert [row[0] for row in rows[1:]] == ['POL-TEST123']
+    
+    def test_claim_export(self, client, sample_claim):
+        """Test the claim export."""
+        rows = _rows(client.get('/claims/export?status=Open'))
+        assert rows[1][:3] == ['CLM-TEST456', 'POL-TEST123', 'Jane Smith']
+    
+    def test_customer_agent_agency_exports(self, client, sample_policy):
+        """Test the customer, agent and agency exports."""
+        assert _rows(client.get('/customers/export?search=jane'))[1][:2] == ['Jane', 'Smith']
+        agent_rows = _rows(client.get('/agents/export'))
+        assert agent_rows[1] == ['John', 'Doe', 'john.doe@testinsurance.com', '555-5678',
+                                 'Test Insurance Agency', '1']
+        assert _rows(client.get('/agencies/export?search=Test'))[1][0] == 'Test Insurance Agency'
+    
+    def test_export_streams_with_one_query(self, client, session, sample_agency, query_counter):
+        """Test that a large export selects columns in one statement."""
+        session.add_all([
+            Agent(agency_id=sample_agency.agency_id, first_name=f'A{i}', last_name=f'L{i:03d}')
+            for i in range(120)
+        ])
+        session.commit()
+        session.expunge_all()
+        
+        with query_counter:
+            response = client.get('/agents/export')
+            rows = _rows(response)
+        
+        assert len(rows) == 121
+        assert query_counter.count == 1, query_counter.statements
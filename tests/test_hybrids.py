@@ -0,0 +1,126 @@
+"""
+Property tests: the SQL form of each hybrid check agrees with its Python form.
+
+Rows are generated at random (with a fixed seed, so a failure reproduces)
+and biased towards the boundaries the checks care about: start and end dates
+on or next to ``today`` and to the renewal thresholds.
+"""
+import random
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import select
+from models.policy import Policy
+from models.claim import Claim
+
+
+SEED = 20240601
+ROUNDS = 5
+ROWS = 60
+
+# Day offsets from "today" that sit on or next to a boundary
+_EDGES = (-366, -31, -30, -8, -7, -1, 0, 1, 6, 7, 8, 29, 30, 31, 365)
+
+
+def _offset(rng):
+    if rng.random() < 0.7:
+        return rng.choice(_EDGES)
+    return rng.randint(-800, 800)
+
+
+def _policies(rng, today, agent_id, customer_id, round_no):
+    policies = []
+    for i in range(ROWS):
+        start_date = today + timedelta(days=_offset(rng))
+        end_date = None if rng.random() < 0.15 else today + timedelta(days=_offset(rng))
+        policies.append(Policy(
+            agent_id=agent_id,
+            customer_id=customer_id,
+            policy_number=f'POL-H{round_no}-{i:03d}',
+            policy_type='Auto Insurance',
+            start_date=start_date,
+            end_date=end_date,
+            policy_status=rng.choice(Policy.STATUSES + (None,))
+        ))
+    return policies
+
+
+class TestPolicyHybrids:
+    """Policy.is_active, days_until_renewal and renewal_status in SQL and Python."""
+
+    @pytest.fixture
+    def rng(self):
+        return random.Random(SEED)
+
+    def test_sql_matches_python(self, session, sample_agent, sample_customer, rng):
+        """Test that every row gets the same answer from the database and from Python."""
+        for round_no in range(ROUNDS):
+            today = date(2024, 1, 1) + timedelta(days=rng.randint(0, 3650))
+            session.query(Policy).delete()
+            session.add_all(_policies(rng, today, sample_agent.agent_id,
+                                      sample_customer.customer_id, round_no))
+            session.commit()
+
+            rows = session.execute(select(
+                Policy.policy_id,
+                Policy.is_active(today),
+                Policy.days_until_renewal(today),
+                Policy.renewal_status(today),
+            )).all()
+            policies = {policy.policy_id: policy for policy in session.query(Policy)}
+            assert len(rows) == ROWS
+            for policy_id, is_active, days, renewal_status in rows:
+                policy = policies[policy_id]
+                assert bool(is_active) == policy.is_active(today), policy.__dict__
+                assert days == policy.days_until_renewal(today), policy.__dict__
+                assert renewal_status == policy.renewal_status(today), policy.__dict__
+
+    def test_filters_match_python(self, session, sample_agent, sample_customer, rng):
+        """Test that filtering in SQL selects the rows Python would keep."""
+        today = date(2025, 3, 15)
+        session.add_all(_policies(rng, today, sample_agent.agent_id, sample_customer.customer_id, 0))
+        session.commit()
+        policies = session.query(Policy).all()
+
+        active = {p.policy_id for p in session.query(Policy).filter(Policy.is_active(today))}
+        assert active == {p.policy_id for p in policies if p.is_active(today)}
+
+        for status in ('Expired', 'Critical', 'Warning', 'OK'):
+            matched = {p.policy_id for p in
+                       session.query(Policy).filter(Policy.renewal_status(today) == status)}
+            assert matched == {p.policy_id for p in policies if p.renewal_status(today) == status}
+
+        soon = {p.policy_id for p in
+                session.query(Policy).filter(Policy.days_until_renewal(today).between(0, 30))}
+        assert soon == {p.policy_id for p in policies
+                        if p.days_until_renewal(today) is not None and 0 <= p.days_until_renewal(today) <= 30}
+
+    def test_default_today(self, session, sample_policy):
+        """Test that both forms default to the current date."""
+        assert session.query(Policy).filter(Policy.is_active()).count() == 1
+        assert session.scalar(select(Policy.days_until_renewal())) == sample_policy.days_until_renewal()
+        assert session.scalar(select(Policy.renewal_status())) == 'OK'
+
+
+class TestClaimHybrids:
+    """Claim.is_open and is_closed in SQL and Python."""
+
+    def test_sql_matches_python(self, session, sample_policy):
+        """Test that every status, known or not, is classified the same way."""
+        rng = random.Random(SEED)
+        statuses = Claim.STATUSES + ('Reopened', 'open', None)
+        for i in range(ROWS):
+            session.add(Claim(
+                policy_id=sample_policy.policy_id,
+                claim_number=f'CLM-H{i:03d}',
+                claim_date=date(2024, 1, 1),
+                incident_date=date(2024, 1, 1),
+                status=rng.choice(statuses)
+            ))
+        session.commit()
+
+        claims = session.query(Claim).all()
+        open_ids = {c.claim_id for c in session.query(Claim).filter(Claim.is_open())}
+        closed_ids = {c.claim_id for c in session.query(Claim).filter(Claim.is_closed())}
+        assert open_ids == {c.claim_id for c in claims if c.is_open()}
+        assert closed_ids == {c.claim_id for c in claims if c.is_closed()}
+        assert not open_ids & closed_ids
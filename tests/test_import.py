@@ -0,0 +1,252 @@
+"""
+Tests for the shared validation rules and the bulk CSV import.
+"""
+import pytest
+import io
+import json
+from decimal import Decimal
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from services import importer
+from services import search
+from services import validation
+
+
+def _csv(*lines):
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+class TestValidation:
+    """Test cases for the rules shared by the forms and the import."""
+    
+    def test_customer_required_names(self):
+        """Test that customers need a first and last name."""
+        with pytest.raises(validation.ValidationError, match='First name is required'):
+            validation.customer_values({'first_name': ' ', 'last_name': 'Smith'})
+    
+    def test_customer_values_are_stripped(self):
+        """Test that text fields are stripped and the birth date parsed."""
+        values = validation.customer_values({
+            'first_name': ' Jane ', 'last_name': 'Smith', 'date_of_birth': '1990-01-01'
+        })
+        assert values['first_name'] == 'Jane'
+        assert values['date_of_birth'].year == 1990
+        assert values['email'] == ''
+    
+    def test_policy_rules(self):
+        """Test the policy amount, date and status rules."""
+        row = {'agent_id': '1', 'customer_id': '2', 'policy_number': 'P-1',
+               'policy_type': 'Auto', 'start_date': '2024-01-01', 'premium': '1,200.50'}
+        values = validation.policy_values(row)
+        assert values['premium'] == Decimal('1200.50')
+        assert values['policy_status'] == 'Active'
+        with pytest.raises(validation.ValidationError, match='Premium must be a number'):
+            validation.policy_values({**row, 'premium': 'lots'})
+        with pytest.raises(validation.ValidationError, match='End date'):
+            validation.policy_values({**row, 'end_date': '2023-01-01'})
+        with pytest.raises(validation.ValidationError, match='Status must be one of'):
+            validation.policy_values({**row, 'policy_status': 'Lapsed'})
+    
+    def test_new_claim_defaults(self):
+        """Test that a filed claim gets a generated number and the Open status."""
+        values = validation.claim_values({'policy_id': '1', 'incident_date': '2024-02-01',
+                                          'status': 'Settled'})
+        assert values['claim_number'].startswith('CLM-')
+        assert values['status'] == 'Open'
+    
+    def test_claim_update_rules(self):
+        """Test that an edited claim needs a known status and positive amounts."""
+        row = {'description': ' Hail ', 'claim_amount': '100', 'status': 'Settled',
+               'settlement_amount': '80'}
+        values = validation.claim_update_values(row)
+        assert values['description'] == 'Hail'
+        assert values['settlement_amount'] == Decimal('80')
+        assert 'settlement_amount' not in validation.claim_update_values({**row, 'status': 'Open'})
+        with pytest.raises(validation.ValidationError, match='Status must be one of'):
+            validation.claim_update_values({**row, 'status': 'Paid'})
+        with pytest.raises(validation.ValidationError, match='Settlement amount must be a positive'):
+            validation.claim_update_values({**row, 'settlement_amount': '-5'})
+    
+    def test_imported_claim_keeps_history(self):
+        """Test that imported claims may carry their number, status and resolution."""
+        values = validation.imported_claim_values({
+            'policy_id': '1', 'incident_date': '2024-02-01', 'claim_number': 'OLD-1',
+            'status': 'Settled', 'resolution_date': '2024-03-01', 'settlement_amount': '50'
+        })
+        assert values['claim_number'] == 'OLD-1'
+        assert values['status'] == 'Settled'
+        assert values['settlement_amount'] == Decimal('50')
+
+
+class TestImport:
+    """Test cases for importing CSV streams."""
+    
+    def test_import_customers(self, session):
+        """Test that valid rows are inserted and invalid rows reported by line."""
+        errors = []
+        result = importer.import_csv('customers', _csv(
+            'first_name,last_name,email',
+            'Ann,Lee,ann@example.com',
+            ',Nofirst,x@example.com',
+            'Bob,Ray,bob@example.com',
+        ), chunk_size=1, on_error=lambda line, row, message: errors.append((line, message)))
+        
+        assert (result.imported, result.rejected) == (2, 1)
+        assert errors == [(3, 'First name is required')]
+        assert Customer.query.count() == 2
+        assert result.rows_per_second > 0
+    
+    def test_policies_resolve_natural_keys(self, session, sample_agent, sample_customer):
+        """Test that agents and customers can be named by email."""
+        errors = []
+        result = importer.import_csv('policies', _csv(
+            'policy_number,policy_type,agent_email,customer_email,start_date',
+            'POL-1,Auto,JOHN.DOE@testinsurance.com,jane.smith@example.com,2024-01-01',
+            'POL-2,Home,nobody@example.com,jane.smith@example.com,2024-01-01',
+            'POL-1,Home,john.doe@testinsurance.com,jane.smith@example.com,2024-01-01',
+        ), on_error=lambda line, row, message: errors.append(message))
+        
+        assert result.imported == 1
+        assert errors == ["Unknown agent email 'nobody@example.com'",
+                          'Policy number POL-1 already exists']
+        policy = Policy.query.filter_by(policy_number='POL-1').one()
+        assert policy.agent_id == sample_agent.agent_id
+        assert policy.customer_id == sample_customer.customer_id
+    
+    def test_policies_reject_missing_ids(self, session, sample_agent):
+        """Test that ids must exist."""
+        errors = []
+        importer.import_csv('policies', _csv(
+            'policy_number,policy_type,agent_id,customer_id,start_date',
+            f'POL-9,Auto,{sample_agent.agent_id},424242,2024-01-01',
+        ), on_error=lambda line, row, message: errors.append(message))
+        assert errors == ['Customer 424242 does not exist']
+    
+    def test_claims_by_policy_number(self, session, sample_policy):
+        """Test that claims can name their policy by number."""
+        result = importer.import_csv('claims', _csv(
+            'policy_number,incident_date,claim_amount,status',
+            'POL-TEST123,2024-02-01,500,Under Review',
+        ))
+        assert result.imported == 1
+        claim = Claim.query.one()
+        assert claim.policy_id == sample_policy.policy_id
+        assert claim.status == 'Under Review'
+    
+    def test_missing_column(self, session):
+        """Test that a header without a required column is refused."""
+        with pytest.raises(validation.ValidationError, match='policy_id or policy_number'):
+            importer.import_csv('claims', _csv('incident_date', '2024-01-01'))
+    
+    def test_imported_rows_are_searchable(self, session):
+        """Test that the full-text index picks up bulk inserted rows."""
+        importer.import_csv('customers', _csv('first_name,last_name', 'Quentin,Zyx'))
+        assert [hit['label'] for hit in search.prefix_search('zyx')] == ['Quentin Zyx']
+
+
+class TestEditForms:
+    """Test cases for the policy and customer edit views, which share the rules above."""
+    
+    @pytest.fixture
+    def policy_form(self, sample_policy):
+        return {
+            'agent_id': str(sample_policy.agent_id),
+            'customer_id': str(sample_policy.customer_id),
+            'policy_number': 'POL-TEST123',
+            'policy_type': 'Auto Insurance',
+            'coverage_amount': '100000.00',
+            'premium': '1,300.00',
+            'start_date': '2024-01-01',
+            'end_date': '2025-01-01',
+            'policy_status': 'Active',
+        }
+    
+    def test_policy_edit(self, client, session, sample_policy, policy_form):
+        """Test that a valid edit is parsed the way the create form parses it."""
+        response = client.post(f'/policies/{sample_policy.policy_id}/edit', data=policy_form)
+        assert response.status_code == 302
+        session.refresh(sample_policy)
+        assert sample_policy.premium == Decimal('1300.00')
+        assert sample_policy.end_date.year == 2025
+    
+    @pytest.mark.parametrize('field, value, message', [
+        ('policy_status', 'Lapsed', b'Status must be one of'),
+        ('end_date', '2023-01-01', b'End date must not be before the start date'),
+        ('premium', '-1', b'Premium must be a positive number'),
+        ('start_date', '01/02/2024', b'Start date must be a date (YYYY-MM-DD)'),
+        ('policy_number', ' ', b'Policy number is required'),
+    ])
+    def test_policy_edit_rejects(self, client, session, sample_policy, policy_form, field, value, message):
+        """Test that an invalid edit is flashed back and leaves the policy unchanged."""
+        response = client.post(f'/policies/{sample_policy.policy_id}/edit',
+                               data={**policy_form, field: value})
+        assert response.status_code == 200
+        assert message in response.data
+        session.refresh(sample_policy)
+        assert sample_policy.version == 1
+    
+    def test_customer_edit(self, client, session, sample_customer):
+        """Test that a valid edit strips the names and parses the birth date."""
+        response = client.post(f'/customers/{sample_customer.customer_id}/edit', data={
+            'first_name': ' Janet ', 'last_name': 'Smith', 'date_of_birth': '1991-02-03'})
+        assert response.status_code == 302
+        session.refresh(sample_customer)
+        assert sample_customer.first_name == 'Janet'
+        assert sample_customer.date_of_birth.year == 1991
+    
+    @pytest.mark.parametrize('form, message', [
+        ({'first_name': ' ', 'last_name': 'Smith'}, b'First name is required'),
+        ({'first_name': 'Jane', 'last_name': 'Smith', 'date_of_birth': 'yesterday'},
+         b'Date of birth must be a date (YYYY-MM-DD)'),
+    ])
+    def test_customer_edit_rejects(self, client, session, sample_customer, form, message):
+        """Test that an invalid edit is flashed back instead of failing."""
+        response = client.post(f'/customers/{sample_customer.customer_id}/edit', data=form)
+        assert response.status_code == 200
+        assert message in response.data
+        session.refresh(sample_customer)
+        assert sample_customer.first_name == 'Jane'
+
+
+class TestImportCommandAndUpload:
+    """Test cases for the flask import command and the upload endpoint."""
+    
+    def test_cli_writes_error_file(self, app, session, tmp_path):
+        """Test the CLI summary and the rejected-rows file."""
+        source = tmp_path / 'customers.csv'
+        source.write_text('first_name,last_name\nAnn,Lee\n,Nofirst\n', encoding='utf-8')
+        
+        result = app.test_cli_runner().invoke(args=['import', 'customers', str(source)])
+        
+        assert result.exit_code == 0, result.output
+        assert 'Imported 1 customers' in result.output
+        assert 'rows/sec' in result.output
+        error_file = tmp_path / 'customers.csv.errors.csv'
+        assert error_file.read_text(encoding='utf-8').splitlines() == [
+            'line,error,first_name,last_name',
+            '3,First name is required,,Nofirst',
+        ]
+    
+    def test_cli_bad_header(self, app, session, tmp_path):
+        """Test that the CLI fails on a bad header."""
+        source = tmp_path / 'claims.csv'
+        source.write_text('description\nx\n', encoding='utf-8')
+        result = app.test_cli_runner().invoke(args=['import', 'claims', str(source)])
+        assert result.exit_code != 0
+        assert 'Missing column' in result.output
+    
+    def test_upload(self, client, session):
+        """Test importing an uploaded file."""
+        data = {'file': (io.BytesIO(b'\xef\xbb\xbffirst_name,last_name\nAnn,Lee\n,X\n'), 'c.csv')}
+        response = client.post('/import/api/customers', data=data,
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        body = json.loads(response.data)
+        assert body['imported'] == 1
+        assert body['errors'] == [{'line': 3, 'error': 'First name is required'}]
+    
+    def test_upload_errors(self, client, session):
+        """Test the upload endpoint's error responses."""
+        assert client.post('/import/api/agencies').status_code == 404
+        assert client.post('/import/api/customers').status_code == 400
@@ -0,0 +1,167 @@
+"""
+Tests for the nightly policy lifecycle job and its CLI command.
+"""
+import pytest
+from datetime import date, timedelta
+from models.policy import Policy
+from models.job_run import JobRun
+from services import lifecycle
+
+
+TODAY = date(2025, 6, 15)
+
+
+@pytest.fixture
+def make_policy(session, sample_agent, sample_customer):
+    """Return a function that adds a policy with the given status and dates."""
+    def make(number, status='Active', start_days=-365, end_days=0):
+        policy = Policy(
+            agent_id=sample_agent.agent_id,
+            customer_id=sample_customer.customer_id,
+            policy_number=number,
+            policy_type='Home Insurance',
+            premium=100,
+            start_date=TODAY + timedelta(days=start_days),
+            end_date=TODAY + timedelta(days=end_days),
+            policy_status=status
+        )
+        session.add(policy)
+        session.commit()
+        return policy
+    return make
+
+
+def _status(session, number):
+    return session.query(Policy.policy_status).filter_by(policy_number=number).scalar()
+
+
+class TestLifecycleJob:
+    """Test cases for the expire, activate and renew steps."""
+
+    def test_expires_lapsed_active_policies(self, session, make_policy):
+        """Test that only Active policies past their end date are expired."""
+        make_policy('POL-LAPSED', end_days=-1)
+        make_policy('POL-ENDS-TODAY', end_days=0)
+        make_policy('POL-CANCELLED', status='Cancelled', end_days=-10)
+
+        run = lifecycle.run(today=TODAY)
+
+        assert run.expired_count == 1
+        assert _status(session, 'POL-LAPSED') == 'Expired'
+        assert _status(session, 'POL-ENDS-TODAY') == 'Active'
+        assert _status(session, 'POL-CANCELLED') == 'Cancelled'
+
+    def test_chunks_cover_every_row(self, session, make_policy):
+        """Test that the chunks together reach every lapsed policy."""
+        for i in range(5):
+            make_policy(f'POL-L{i}', end_days=-1 - i)
+
+        run = lifecycle.run(today=TODAY, chunk_size=2)
+
+        assert run.expired_count == 5
+        assert session.query(Policy).filter_by(policy_status='Active').count() == 0
+
+    def test_status_matches_is_active_after_run(self, session, make_policy):
+        """Test that after a run, the Active status agrees with is_active() on past end dates."""
+        for i, end_days in enumerate((-30, -1, 0, 5, 400)):
+            make_policy(f'POL-S{i}', end_days=end_days)
+
+        lifecycle.run(today=TODAY)
+
+        for policy in session.query(Policy):
+            assert (policy.policy_status == 'Active') == policy.is_active(TODAY)
+
+    def test_records_run(self, session, make_policy):
+        """Test that each run is recorded with its counts and duration."""
+        make_policy('POL-LAPSED', end_days=-1)
+
+        lifecycle.run(today=TODAY)
+        lifecycle.run(today=TODAY)
+
+        runs = lifecycle.recent_runs()
+        assert [r.expired_count for r in runs] == [0, 1]
+        assert all(r.status == 'Succeeded' for r in runs)
+        assert all(r.duration_seconds() is not None for r in runs)
+        assert runs[0].to_dict()['job'] == lifecycle.JOB_NAME
+
+    def test_failed_run_is_recorded(self, session, monkeypatch):
+        """Test that a failing step marks the run Failed and re-raises."""
+        def fail(today, chunk_size):
+            raise RuntimeError('disk full')
+        monkeypatch.setattr(lifecycle, 'expire_policies', fail)
+
+        with pytest.raises(RuntimeError):
+            lifecycle.run(today=TODAY)
+
+        run = session.query(JobRun).one()
+        assert run.status == 'Failed'
+        assert run.error == 'disk full'
+        assert run.finished_at is not None
+
+
+class TestRenewals:
+    """Test cases for bulk renewal and activation."""
+
+    def test_renew_creates_pending_policy(self, session, make_policy):
+        """Test that a policy ending soon gets one Pending renewal for the next term."""
+        original = make_policy('POL-RENEW', start_days=-355, end_days=10)
+        make_policy('POL-LATER', end_days=100)
+
+        run = lifecycle.run(today=TODAY, renew=True)
+
+        assert run.renewed_count == 1
+        renewal = session.query(Policy).filter_by(renewed_from_id=original.policy_id).one()
+        assert renewal.policy_status == 'Pending'
+        assert renewal.start_date == original.end_date + timedelta(days=1)
+        assert renewal.end_date - renewal.start_date == original.end_date - original.start_date
+        assert renewal.policy_number == lifecycle.renewal_number('POL-RENEW', renewal.start_date)
+        assert renewal.agent_id == original.agent_id
+
+    def test_renew_is_idempotent(self, session, make_policy):
+        """Test that a second run does not renew the same policy again."""
+        make_policy('POL-RENEW', end_days=10)
+
+        lifecycle.run(today=TODAY, renew=True, chunk_size=1)
+        run = lifecycle.run(today=TODAY, renew=True, chunk_size=1)
+
+        assert run.renewed_count == 0
+        assert session.query(Policy).filter(Policy.renewed_from_id.isnot(None)).count() == 1
+
+    def test_renewal_takes_over_when_original_ends(self, session, make_policy):
+        """Test that the original expires and its renewal activates on the new start date."""
+        make_policy('POL-RENEW', end_days=10)
+        make_policy('POL-PENDING', status='Pending', start_days=-5, end_days=360)
+        lifecycle.run(today=TODAY, renew=True)
+
+        run = lifecycle.run(today=TODAY + timedelta(days=11))
+
+        assert run.expired_count == 1
+        assert run.activated_count == 1
+        assert _status(session, 'POL-RENEW') == 'Expired'
+        assert session.query(Policy).filter(
+            Policy.renewed_from_id.isnot(None)).one().policy_status == 'Active'
+        # Pending policies entered by hand are left for the user
+        assert _status(session, 'POL-PENDING') == 'Pending'
+
+    def test_renew_is_optional(self, session, make_policy):
+        """Test that renewals are only created when asked for."""
+        make_policy('POL-RENEW', end_days=10)
+        assert lifecycle.run(today=TODAY).renewed_count == 0
+        assert session.query(Policy).count() == 1
+
+
+class TestLifecycleCommand:
+    """Test cases for the policy-lifecycle CLI command."""
+
+    def test_command(self, app, session, make_policy):
+        """Test that the command runs the job and lists its history."""
+        make_policy('POL-LAPSED', end_days=-1)
+        runner = app.test_cli_runner()
+
+        result = runner.invoke(args=['policy-lifecycle', '--date', TODAY.isoformat(), '--renew'])
+        assert result.exit_code == 0, result.output
+        assert 'Expired 1' in result.output
+
+        result = runner.invoke(args=['policy-lifecycle', '--history'])
+        assert result.exit_code == 0
+        assert 'Succeeded' in result.output
@@ -0,0 +1,133 @@
+"""
+Tests for the typeahead lookups used by the policy and claim forms.
+"""
+import pytest
+import json
+from datetime import datetime, timedelta
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from services import lookup
+from services import search
+
+
+@pytest.fixture
+def ilike_only(monkeypatch):
+    """Force the portable ILIKE fallback."""
+    monkeypatch.setattr(search, 'fts_available', lambda: False)
+
+
+@pytest.fixture
+def many_customers(session):
+    """Create more customers than one lookup returns."""
+    customers = [Customer(first_name=f"Cust{i}", last_name=f"Omer{i:02d}") for i in range(30)]
+    session.add_all(customers)
+    session.commit()
+    return customers
+
+
+class TestLookupService:
+    """Test cases for the lookup functions."""
+    
+    def test_agent_prefix(self, session, sample_agent):
+        """Test that an agent is found by a name prefix and labelled with the agency."""
+        options = lookup.lookup_agents('jo')
+        assert options == [{'id': sample_agent.agent_id, 'label': 'John Doe (Test Insurance Agency)'}]
+    
+    def test_customer_prefix(self, session, sample_customer):
+        """Test that a customer is found by a name prefix."""
+        options = lookup.lookup_customers('smi')
+        assert options == [{'id': sample_customer.customer_id, 'label': 'Jane Smith'}]
+    
+    def test_policy_by_number_and_customer(self, session, sample_policy):
+        """Test that a policy is found by its number or its customer's name."""
+        label = 'POL-TEST123 - Jane Smith (Auto Insurance)'
+        assert [o['label'] for o in lookup.lookup_policies('pol-test')] == [label]
+        assert [o['label'] for o in lookup.lookup_policies('jane')] == [label]
+    
+    def test_policy_status_filter(self, session, sample_policy):
+        """Test that only policies with the requested status are offered."""
+        assert lookup.lookup_policies('pol', status='Active')
+        assert lookup.lookup_policies('pol', status='Expired') == []
+    
+    def test_policy_active_filter(self, session, sample_policy):
+        """Test that the active filter drops Active policies whose end date has passed."""
+        assert lookup.lookup_policies('pol', active=True)
+        sample_policy.end_date = (datetime.today() - timedelta(days=1)).date()
+        session.commit()
+        assert lookup.lookup_policies('pol', status='Active')
+        assert lookup.lookup_policies('pol', active=True) == []
+    
+    def test_limit_and_order(self, session, many_customers):
+        """Test that lookups return at most the limit, in name order."""
+        options = lookup.lookup_customers('', limit=5)
+        assert [o['label'] for o in options] == [f"Cust{i} Omer{i:02d}" for i in range(5)]
+        assert len(lookup.lookup_customers('cust')) == lookup.LOOKUP_LIMIT
+        assert len(lookup.lookup_customers('cust', limit=1000)) == 30
+    
+    def test_fallback(self, session, sample_agent, ilike_only):
+        """Test the lookups without the full-text index."""
+        assert [o['id'] for o in lookup.lookup_agents('doe')] == [sample_agent.agent_id]
+    
+    def test_selected_option(self, session, sample_policy):
+        """Test resolving a submitted id back to its option."""
+        option = lookup.selected_option(Agent, str(sample_policy.agent_id))
+        assert option['label'] == 'John Doe (Test Insurance Agency)'
+        assert lookup.selected_option(Customer, '') is None
+        assert lookup.selected_option(Policy, 'abc') is None
+        assert lookup.selected_option(Policy, '999999') is None
+
+
+class TestLookupRoutes:
+    """Test cases for the lookup endpoints and the forms that use them."""
+    
+    def test_agent_lookup_api(self, client, sample_agent):
+        """Test the agent lookup endpoint."""
+        response = client.get('/agents/api/lookup?q=doe')
+        assert response.status_code == 200
+        assert json.loads(response.data) == [
+            {'id': sample_agent.agent_id, 'label': 'John Doe (Test Insurance Agency)'}
+        ]
+    
+    def test_customer_lookup_api_limit(self, client, many_customers):
+        """Test that the endpoint caps the limit."""
+        response = client.get('/customers/api/lookup?q=cust&limit=2')
+        assert len(json.loads(response.data)) == 2
+    
+    def test_policy_lookup_api(self, client, sample_policy):
+        """Test the policy lookup endpoint with a status filter."""
+        response = client.get('/policies/api/lookup?q=smith&status=Active')
+        data = json.loads(response.data)
+        assert [item['id'] for item in data] == [sample_policy.policy_id]
+    
+    def test_policy_create_form_does_not_list_customers(self, client, many_customers):
+        """Test that the create form renders pickers instead of every customer."""
+        response = client.get('/policies/create')
+        assert response.status_code == 200
+        assert b'/customers/api/lookup' in response.data
+        assert b'Omer00' not in response.data
+    
+    def test_policy_create_error_keeps_choice(self, client, sample_agent, sample_customer):
+        """Test that a validation error re-renders the chosen agent and customer."""
+        response = client.post('/policies/create', data={
+            'agent_id': sample_agent.agent_id,
+            'customer_id': sample_customer.customer_id,
+            'policy_type': 'Auto',
+            'start_date': '2024-01-01'
+        })
+        assert b'Policy number is required' in response.data
+        assert b'John Doe (Test Insurance Agency)' in response.data
+        assert b'Jane Smith' in response.data
+    
+    def test_policy_edit_form_shows_current_choice(self, client, sample_policy):
+        """Test that the edit form pre-fills the current agent and customer."""
+        response = client.get(f'/policies/{sample_policy.policy_id}/edit')
+        assert response.status_code == 200
+        assert f'value="{sample_policy.customer_id}"'.encode() in response.data
+        assert b'Jane Smith' in response.data
+    
+    def test_claim_create_form_uses_policy_lookup(self, client, sample_policy):
+        """Test that the claim form looks up active policies instead of listing them."""
+        response = client.get('/claims/create')
+        assert b'/policies/api/lookup?active=1' in response.data
+        assert b'POL-TEST123' not in response.data
@@ -0,0 +1,130 @@
+"""
+Tests for the per-request metrics, the /metrics endpoint and the Server-Timing header.
+"""
+import re
+import pytest
+from services import metrics
+
+
+@pytest.fixture
+def recorded(app, monkeypatch):
+    """Enable metrics and start each test from an empty registry."""
+    monkeypatch.setitem(app.config, 'METRICS_ENABLED', True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _sample(text, name, **labels):
+    """The value of the sample ``name`` whose labels include ``labels``."""
+    for line in text.splitlines():
+        match = re.match(r'(\w+)\{(.*)\} (\S+)$', line)
+        if match and match.group(1) == name:
+            found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2)))
+            if all(found.get(k) == str(v) for k, v in labels.items()):
+                return float(match.group(3))
+    return None
+
+
+class TestRecording:
+    """Test cases for the series kept per endpoint."""
+
+    def test_histogram_buckets_are_cumulative(self, recorded):
+        """Test that each bucket counts the requests at or below its bound."""
+        for seconds in (0.001, 0.02, 0.02, 30.0):
+            metrics.record('policy.index', 'GET', 200, seconds)
+        text = metrics.render()
+
+        bucket = 'insuremate_http_request_duration_seconds_bucket'
+        assert _sample(text, bucket, endpoint='policy.index', le='0.005') == 1
+        assert _sample(text, bucket, endpoint='policy.index', le='0.025') == 3
+        assert _sample(text, bucket, endpoint='policy.index', le='10.0') == 3
+        assert _sample(text, bucket, endpoint='policy.index', le='+Inf') == 4
+        assert _sample(text, 'insuremate_http_request_duration_seconds_count',
+                       endpoint='policy.index') == 4
+        assert _sample(text, 'insuremate_http_request_duration_seconds_sum',
+                       endpoint='policy.index') == pytest.approx(30.041)
+
+    def test_label_values_are_escaped(self, recorded):
+        """Test that quotes and backslashes in a label cannot break the exposition format."""
+        metrics.record('odd"name\\', 'GET', 200, 0.1)
+        assert 'endpoint="odd\\"name\\\\"' in metrics.render()
+
+
+class TestRequestInstrumentation:
+    """Test cases for the request, SQL and template hooks."""
+
+    def test_request_is_recorded(self, client, session, sample_policy, recorded, query_counter):
+        """Test that a page view records its latency, status, queries and render time."""
+        with query_counter:
+            client.get('/policies/')
+        text = metrics.render()
+
+        assert _sample(text, 'insuremate_http_requests_total',
+                       endpoint='policy.index', method='GET', status=200) == 1
+        assert _sample(text, 'insuremate_db_queries_total',
+                       endpoint='policy.index') == query_counter.count
+        assert _sample(text, 'insuremate_db_seconds_total', endpoint='policy.index') > 0
+        assert _sample(text, 'insuremate_template_render_seconds_total',
+                       endpoint='policy.index') > 0
+
+    @pytest.mark.parametrize('url, endpoint', [
+        ('/policies/api/policies', 'policy.api_policies'),
+        ('/policies/export', 'policy.export'),
+    ])
+    def test_streamed_response_is_recorded_when_closed(self, client, session, sample_policy,
+                                                       recorded, query_counter, url, endpoint):
+        """Test that the SQL run while a body streams counts, and is recorded at close."""
+        with query_counter:
+            response = client.get(url)
+            assert sample_policy.policy_number.encode() in response.data
+            assert _sample(metrics.render(), 'insuremate_http_requests_total', endpoint=endpoint) is None
+            response.close()
+        text = metrics.render()
+
+        assert _sample(text, 'insuremate_http_requests_total', endpoint=endpoint, status=200) == 1
+        assert _sample(text, 'insuremate_db_queries_total', endpoint=endpoint) == query_counter.count
+        assert query_counter.count > 0
+
+    def test_server_timing_header(self, client, session, recorded):
+        """Test that the response reports the request, SQL and render durations."""
+        response = client.get('/')
+        timing = response.headers['Server-Timing']
+        assert re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+',
+                            timing), timing
+
+    def test_unmatched_requests_share_one_label(self, client, session, recorded):
+        """Test that 404s for unknown URLs do not create a series per URL."""
+        client.get('/no-such-page')
+        client.get('/another-missing-page')
+        assert _sample(metrics.render(), 'insuremate_http_requests_total',
+                       endpoint=metrics.UNMATCHED, status=404) == 2
+
+    def test_queries_outside_requests_are_ignored(self, session, sample_policy, recorded):
+        """Test that work outside a request (CLI, background jobs) is not attributed to one."""
+        assert 'insuremate_db_queries_total{' not in metrics.render()
+
+
+class TestMetricsEndpoint:
+    """Test cases for the /metrics endpoint."""
+
+    def test_prometheus_text_format(self, client, session, recorded):
+        """Test that /metrics is served as Prometheus text with HELP and TYPE lines."""
+        client.get('/')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type == metrics.CONTENT_TYPE
+        text = response.get_data(as_text=True)
+        assert '# TYPE insuremate_http_request_duration_seconds histogram' in text
+        assert '# TYPE insuremate_db_queries_total counter' in text
+        assert _sample(text, 'insuremate_http_requests_total', endpoint='index') == 1
+
+    def test_disabled(self, app, client, session, recorded, monkeypatch):
+        """Test that with METRICS_ENABLED off nothing is recorded or served."""
+        monkeypatch.setitem(app.config, 'METRICS_ENABLED', False)
+        response = client.get('/')
+
+        assert 'Server-Timing' not in response.headers
+        assert client.get('/metrics').status_code == 404
+        assert all(line.startswith('#') for line in metrics.render().splitlines())
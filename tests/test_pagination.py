@@ -0,0 +1,128 @@
+"""
+Tests for keyset (cursor) pagination of the list views.
+"""
+import pytest
+import re
+from datetime import datetime, timedelta
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from services.pagination import keyset_paginate, decode_cursor, cached_count
+
+
+@pytest.fixture
+def many_policies(session, sample_agent, sample_customer):
+    """Create 25 policies, several sharing a start date."""
+    today = datetime.today().date()
+    policies = [
+        Policy(
+            agent_id=sample_agent.agent_id,
+            customer_id=sample_customer.customer_id,
+            policy_number=f"POL-K{i:03d}",
+            policy_type="Auto Insurance",
+            start_date=today - timedelta(days=i // 3),
+            policy_status="Active"
+        )
+        for i in range(25)
+    ]
+    session.add_all(policies)
+    session.commit()
+    return policies
+
+
+def expected_order(session):
+    return [
+        p.policy_id for p in
+        session.query(Policy).order_by(Policy.start_date.desc(), Policy.policy_id.desc())
+    ]
+
+
+class TestKeysetPaginate:
+    """Test cases for the keyset pagination service."""
+    
+    def test_walk_forward_and_back(self, app, session, many_policies):
+        """Test that next and prev cursors visit every row exactly once."""
+        columns = [Policy.start_date, Policy.policy_id]
+        pages = []
+        cursor = None
+        while True:
+            page = keyset_paginate(Policy.query, columns, cursor=cursor, per_page=10, descending=True)
+            pages.append(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        
+        seen = [p.policy_id for page in pages for p in page.items]
+        assert seen == expected_order(session)
+        assert [len(page.items) for page in pages] == [10, 10, 5]
+        assert not pages[0].has_prev
+        assert pages[-1].has_prev
+        
+        back = keyset_paginate(Policy.query, columns, cursor=pages[-1].prev_cursor,
+                               per_page=10, descending=True)
+        assert [p.policy_id for p in back.items] == [p.policy_id for p in pages[1].items]
+        assert back.has_prev and back.has_next
+    
+    def test_total_is_counted_once(self, app, session, many_policies, query_counter):
+        """Test that later pages reuse the cached total."""
+        columns = [Policy.start_date, Policy.policy_id]
+        first = keyset_paginate(Policy.query, columns, per_page=10, descending=True)
+        
+        with query_counter:
+            second = keyset_paginate(Policy.query, columns, cursor=first.next_cursor,
+                                     per_page=10, descending=True)
+        
+        assert second.total == 25
+        assert query_counter.count == 1
+
+    def test_total_follows_commits(self, app, session, many_policies, sample_agent):
+        """Test that a cached total is dropped when its table is written, and kept otherwise."""
+        query = Policy.query.filter(Policy.policy_status == 'Active')
+        assert cached_count(query) == 25
+
+        session.add(Agent(agency_id=sample_agent.agency_id, first_name='Other', last_name='Agent'))
+        session.commit()
+        many_policies[0].policy_status = 'Expired'
+        session.flush()
+        assert cached_count(query) == 25
+
+        session.commit()
+        assert cached_count(query) == 24
+
+    def test_cursor_round_trip(self, app, many_policies):
+        """Test that a cursor decodes back to the row's sort key."""
+        columns = [Policy.start_date, Policy.policy_id]
+        page = keyset_paginate(Policy.query, columns, per_page=5, descending=True)
+        direction, key = decode_cursor(columns, page.next_cursor)
+        
+        assert direction == 'next'
+        assert key == [page.items[-1].start_date, page.items[-1].policy_id]
+
+
+class TestKeysetRoutes:
+    """Test cases for the ?cursor= mode of the list views."""
+    
+    @pytest.mark.parametrize('url', ['/policies/', '/claims/', '/customers/', '/agents/'])
+    def test_cursor_mode_renders(self, client, sample_claim, url):
+        """Test that every list view accepts an empty cursor."""
+        response = client.get(url + '?cursor=')
+        assert response.status_code == 200
+        assert b'of about 1' in response.data
+    
+    def test_policy_cursor_links(self, client, many_policies):
+        """Test following the Next link through the policy list."""
+        response = client.get('/policies/?cursor=')
+        assert response.status_code == 200
+        assert b'POL-K000' in response.data
+        
+        next_link = re.search(rb'href="([^"]*cursor=[^"]+)">Next', response.data).group(1)
+        response = client.get(next_link.decode().replace('&amp;', '&'))
+        assert response.status_code == 200
+        assert b'POL-K000' not in response.data
+        assert b'POL-K010' in response.data or b'POL-K011' in response.data
+    
+    def test_invalid_cursor(self, client, session):
+        """Test that a malformed cursor is rejected."""
+        response = client.get('/claims/?cursor=not-a-cursor')
+        assert response.status_code == 400
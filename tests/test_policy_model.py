@@ -216,3 +216,13 @@ class TestPolicyModel:
         from models.claim import Claim
         deleted_claim = session.get(Claim, claim_id)
         assert deleted_claim is None
+    
+    def test_policy_claim_count(self, session, sample_policy, sample_claim):
+        """Test that claim_count is computed in SQL without loading claims."""
+        from models.policy import Policy
+        session.expire_all()
+        policy = session.get(Policy, sample_policy.policy_id)
+        
+        assert policy.claim_count == 1
+        assert 'claims' not in policy.__dict__
+        assert policy.to_dict()['claim_count'] == 1
@@ -0,0 +1,135 @@
+"""
+Statement-count tests guarding the eager-loading presets.
+
+Each endpoint is rendered against a book of business large enough that a
+lazy load per row would blow well past the allowed number of statements.
+"""
+import pytest
+from datetime import datetime, timedelta
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+
+
+ROWS = 12
+
+
+@pytest.fixture
+def book_of_business(session):
+    """Create agencies, agents, customers, policies and claims in bulk."""
+    today = datetime.today().date()
+    agencies = [Agency(name=f"Agency {i}") for i in range(3)]
+    session.add_all(agencies)
+    session.flush()
+
+    agents = [
+        Agent(agency_id=agencies[i % 3].agency_id, first_name=f"Agent{i}", last_name=f"Last{i}")
+        for i in range(ROWS)
+    ]
+    customers = [
+        Customer(first_name=f"Cust{i}", last_name=f"Omer{i}")
+        for i in range(ROWS)
+    ]
+    session.add_all(agents + customers)
+    session.flush()
+
+    policies = [
+        Policy(
+            agent_id=agents[i].agent_id,
+            customer_id=customers[i].customer_id,
+            policy_number=f"POL-{i:04d}",
+            policy_type="Auto Insurance",
+            premium=100 + i,
+            start_date=today - timedelta(days=i),
+            end_date=today + timedelta(days=30 + i),
+            policy_status="Active"
+        )
+        for i in range(ROWS)
+    ]
+    session.add_all(policies)
+    session.flush()
+
+    claims = [
+        Claim(
+            policy_id=policies[i].policy_id,
+            claim_number=f"CLM-{i:04d}",
+            claim_date=today - timedelta(days=i),
+            incident_date=today - timedelta(days=i + 1),
+            status="Open"
+        )
+        for i in range(ROWS)
+    ]
+    session.add_all(claims)
+    session.commit()
+
+    return {
+        'agency': agencies[0],
+        'agent': agents[0],
+        'customer': customers[0],
+        'policy': policies[0],
+        'claim': claims[0],
+    }
+
+
+# Upper bound on statements per endpoint, independent of the number of rows.
+# The JSON APIs and detail pages include the one conditional-GET validator SELECT.
+MAX_STATEMENTS = {
+    '/': 5,
+    '/agencies/': 2,
+    '/agents/': 2,
+    '/customers/': 2,
+    '/policies/': 3,
+    '/claims/': 3,
+    '/agencies/api/agencies': 2,
+    '/agents/api/agents': 2,
+    '/customers/api/customers': 2,
+    '/policies/api/policies': 2,
+    '/claims/api/claims': 2,
+    '/policies/renewals': 4,
+    '/policies/api/renewals': 3,
+    '/claims/create': 0,
+    '/policies/create': 0,
+    '/agents/api/lookup?q=a': 1,
+    '/customers/api/lookup?q=a': 1,
+    '/policies/api/lookup?q=pol&status=Active': 1,
+}
+
+
+class TestQueryCounts:
+    """Every list, detail and API endpoint issues a bounded number of statements."""
+
+    @pytest.mark.parametrize('url', sorted(MAX_STATEMENTS))
+    def test_list_endpoints(self, client, session, book_of_business, query_counter, url):
+        """List pages and APIs do not lazy-load per row."""
+        session.expunge_all()
+
+        with query_counter:
+            response = client.get(url)
+            response.get_data()
+
+        assert response.status_code == 200
+        assert query_counter.count <= MAX_STATEMENTS[url], query_counter.statements
+
+    @pytest.mark.parametrize('entity, url, limit', [
+        ('agency', '/agencies/{agency_id}', 4),
+        ('agent', '/agents/{agent_id}', 4),
+        ('customer', '/customers/{customer_id}', 3),
+        ('policy', '/policies/{policy_id}', 3),
+        ('claim', '/claims/{claim_id}', 2),
+        ('claim', '/claims/{claim_id}/edit', 1),
+    ])
+    def test_detail_endpoints(self, client, session, book_of_business, query_counter,
+                              entity, url, limit):
+        """Detail pages load their related rows with a fixed number of statements."""
+        instance = book_of_business[entity]
+        url = url.format(**{key: getattr(instance, key) for key in instance.__table__.columns.keys()})
+        session.expunge_all()
+
+        with query_counter:
+            response = client.get(url)
+            response.get_data()
+
+        assert response.status_code == 200
+        assert query_counter.count <= limit, query_counter.statements
@@ -0,0 +1,74 @@
+"""
+Tests for the indexes behind the list-view queries.
+"""
+import pytest
+from sqlalchemy import inspect, select, text
+from models.agency import Agency
+from services import query_plans
+
+
+def _inspector(session):
+    """Inspect the session's connection after refreshing its schema.
+
+    The PRAGMAs used for reflection read SQLite's cached schema, which a
+    pooled connection only reloads once it prepares an ordinary statement
+    after another connection recreated the tables.
+    """
+    connection = session.connection()
+    connection.execute(text('SELECT 1 FROM sqlite_master LIMIT 1'))
+    return inspect(connection)
+
+
+class TestIndexes:
+    """Test cases for the indexes declared on the models."""
+    
+    def test_foreign_keys_are_indexed(self, session):
+        """Test that every foreign key column has an index."""
+        inspector = _inspector(session)
+        for table in ('agent', 'policy', 'claim'):
+            indexed = {index['column_names'][0] for index in inspector.get_indexes(table)}
+            for fk in inspector.get_foreign_keys(table):
+                assert fk['constrained_columns'][0] in indexed, table
+    
+    def test_status_sort_indexes(self, session):
+        """Test the composite indexes for status-filtered, date-sorted lists."""
+        inspector = _inspector(session)
+        policy = {i['name']: i['column_names'] for i in inspector.get_indexes('policy')}
+        claim = {i['name']: i['column_names'] for i in inspector.get_indexes('claim')}
+        assert policy['ix_policy_policy_status_start_date'] == ['policy_status', 'start_date']
+        assert claim['ix_claim_status_claim_date'] == ['status', 'claim_date']
+
+
+class TestQueryPlans:
+    """Test cases for the EXPLAIN QUERY PLAN check."""
+    
+    def test_no_full_scans(self, session):
+        """Test that no list-view query shape scans a whole table."""
+        assert query_plans.full_scans() == {}
+    
+    def test_expected_scans_still_scan(self, session):
+        """Test that every shape excused from the check is a real shape that does scan."""
+        for name in query_plans.EXPECTED_SCANS:
+            plan = query_plans.explain(query_plans._statement(query_plans.QUERY_SHAPES[name]))
+            assert any(query_plans._FULL_SCAN.match(line) for line in plan), name
+    
+    @pytest.mark.parametrize('name, condition', [
+        ('agents: lookup', 'MATCH'),
+        ('customers: lookup', 'MATCH'),
+        ('policies: lookup', 'MATCH'),
+        ('agencies: search', 'LIKE'),
+    ])
+    def test_search_shapes_filter(self, session, name, condition):
+        """Test that the lookup and search shapes carry the route's search filter."""
+        assert condition in str(query_plans._statement(query_plans.QUERY_SHAPES[name]))
+    
+    def test_full_scan_is_detected(self, session):
+        """Test that an unindexed read is reported as a scan."""
+        plan = query_plans.explain(select(Agency).where(Agency.city == 'Springfield'))
+        assert any(query_plans._FULL_SCAN.match(line) for line in plan)
+    
+    def test_check_indexes_command(self, app, session):
+        """Test the check-indexes CLI command."""
+        result = app.test_cli_runner().invoke(args=['check-indexes'])
+        assert result.exit_code == 0
+        assert 'use indexes' in result.output
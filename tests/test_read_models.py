@@ -0,0 +1,70 @@
+"""
+Tests for the read models behind the list views.
+"""
+import pytest
+from models.database import db
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from models import read_models
+
+
+ROWS = [
+    (read_models.AgencyRow, Agency),
+    (read_models.AgentRow, Agent),
+    (read_models.CustomerRow, Customer),
+    (read_models.PolicyRow, Policy),
+    (read_models.ClaimRow, Claim),
+]
+
+
+def _rows(row_class, model):
+    return row_class.from_rows(row_class.project(model.query).all())
+
+
+class TestReadModels:
+    """Test cases for the column-projected list rows."""
+
+    @pytest.mark.parametrize('row_class, model', ROWS, ids=lambda r: r.__name__)
+    def test_rows_are_not_entities(self, session, sample_claim, row_class, model):
+        """Test that reading a list fills no identity map and gives slotted rows."""
+        session.expunge_all()
+        row, = _rows(row_class, model)
+        assert len(db.session.identity_map) == 0
+        assert not hasattr(row, '__dict__')
+
+    def test_related_names(self, session, sample_claim):
+        """Test that the names the templates show are selected with the rows."""
+        policy = sample_claim.policy
+        claim, = _rows(read_models.ClaimRow, Claim)
+        assert (claim.policy_number, claim.customer_id, claim.customer_name) == \
+            (policy.policy_number, policy.customer_id, policy.customer.full_name())
+        assert claim.days_since_filed() == sample_claim.days_since_filed()
+
+        row, = _rows(read_models.PolicyRow, Policy)
+        assert (row.customer_name, row.agent_name) == \
+            (policy.customer.full_name(), policy.agent.full_name())
+        assert row.premium == policy.premium
+
+        agent, = _rows(read_models.AgentRow, Agent)
+        assert (agent.full_name(), agent.agency_name, agent.policy_count) == \
+            (policy.agent.full_name(), policy.agent.agency.name, 1)
+
+    def test_description_is_not_read(self, session, sample_claim, query_counter):
+        """Test that the claim list leaves the large description column out."""
+        with query_counter:
+            _rows(read_models.ClaimRow, Claim)
+        assert 'description' not in query_counter.statements[-1]
+
+    @pytest.mark.parametrize('url', ['/agents/', '/policies/', '/claims/'])
+    def test_list_pages_show_related_names(self, client, sample_claim, url):
+        """Test that the list pages render the joined names from the rows."""
+        customer = sample_claim.policy.customer
+        agent = sample_claim.policy.agent
+        expected = agent.agency.name if url == '/agents/' else customer.full_name()
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert expected in response.get_data(as_text=True)
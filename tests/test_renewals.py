@@ -0,0 +1,172 @@
+"""
+Tests for the renewal worklist service, view and API.
+"""
+import pytest
+import json
+from datetime import datetime, timedelta
+from models.agency import Agency
+from models.agent import Agent
+from models.policy import Policy
+from services import renewals
+
+
+# Days from today to each policy's end date, with the bucket it belongs in
+END_DAYS = {
+    -400: None,        # lapsed long ago: off the worklist
+    -5: 'Expired',
+    0: 'Critical',
+    7: 'Critical',
+    8: 'Warning',
+    30: 'Warning',
+    31: 'OK',
+    90: 'OK',
+    91: None,          # beyond the horizon
+}
+
+
+@pytest.fixture
+def worklist(session, sample_agent, sample_customer):
+    """Create one Active policy per end date above, plus a cancelled one."""
+    today = datetime.today().date()
+    policies = {}
+    for days in END_DAYS:
+        policies[days] = Policy(
+            agent_id=sample_agent.agent_id,
+            customer_id=sample_customer.customer_id,
+            policy_number=f'POL-R{days + 1000:04d}',
+            policy_type='Auto Insurance',
+            start_date=today - timedelta(days=500),
+            end_date=today + timedelta(days=days),
+            policy_status='Active'
+        )
+    cancelled = Policy(
+        agent_id=sample_agent.agent_id,
+        customer_id=sample_customer.customer_id,
+        policy_number='POL-RCANCEL',
+        policy_type='Auto Insurance',
+        start_date=today - timedelta(days=500),
+        end_date=today + timedelta(days=3),
+        policy_status='Cancelled'
+    )
+    session.add_all(list(policies.values()) + [cancelled])
+    session.commit()
+    return policies
+
+
+@pytest.fixture
+def other_agent(session):
+    """An agent in a second agency with one policy due in the Critical bucket."""
+    agency = Agency(name='Other Agency')
+    session.add(agency)
+    session.flush()
+    agent = Agent(agency_id=agency.agency_id, first_name='Ann', last_name='Other')
+    session.add(agent)
+    session.commit()
+    return agent
+
+
+def _numbers(query):
+    return [policy.policy_number for policy in query]
+
+
+class TestRenewalService:
+    """Test cases for the bucket ranges, worklist filter and counts."""
+
+    def test_buckets_match_renewal_status(self, app, worklist):
+        """Test that each bucket holds exactly the policies renewal_status() puts in it."""
+        for bucket in renewals.BUCKETS:
+            selected = set(_numbers(renewals.worklist(Policy.query, bucket=bucket)))
+            expected = {p.policy_number for days, p in worklist.items() if END_DAYS[days] == bucket}
+            assert selected == expected, bucket
+            for policy in renewals.worklist(Policy.query, bucket=bucket):
+                assert policy.renewal_status() == bucket
+
+    def test_window_excludes_old_future_and_inactive(self, app, worklist):
+        """Test that the worklist skips long-lapsed, far-off and non-Active policies."""
+        numbers = set(_numbers(renewals.worklist(Policy.query)))
+        assert worklist[-400].policy_number not in numbers
+        assert worklist[91].policy_number not in numbers
+        assert 'POL-RCANCEL' not in numbers
+        assert len(numbers) == sum(1 for bucket in END_DAYS.values() if bucket)
+
+    def test_unknown_bucket(self, app):
+        """Test that an unknown bucket name is rejected."""
+        with pytest.raises(ValueError):
+            renewals.bucket_range('Later')
+
+    def test_bucket_counts(self, app, worklist):
+        """Test that the counts cover every bucket, empty ones included."""
+        assert renewals.bucket_counts() == {'Expired': 1, 'Critical': 2, 'Warning': 2, 'OK': 2}
+        assert renewals.bucket_counts(agent_id=999) == dict.fromkeys(renewals.BUCKETS, 0)
+
+    def test_agent_and_agency_filters(self, session, worklist, other_agent, sample_agent):
+        """Test that the worklist narrows to one agent or one agency."""
+        policy = worklist[0]
+        policy.agent_id = other_agent.agent_id
+        session.commit()
+
+        assert _numbers(renewals.worklist(Policy.query, agent_id=other_agent.agent_id)) == [policy.policy_number]
+        assert _numbers(renewals.worklist(Policy.query, agency_id=other_agent.agency_id)) == [policy.policy_number]
+        assert policy.policy_number not in _numbers(
+            renewals.worklist(Policy.query, agency_id=sample_agent.agency_id))
+        assert renewals.bucket_counts(agency_id=other_agent.agency_id)['Critical'] == 1
+
+    def test_upcoming_skips_lapsed(self, app, worklist):
+        """Test that the dashboard list starts today, not with long-lapsed policies."""
+        upcoming = renewals.upcoming(Policy.query, 3).all()
+        assert [p.policy_number for p in upcoming] == [
+            worklist[0].policy_number, worklist[7].policy_number, worklist[8].policy_number]
+
+
+class TestRenewalRoutes:
+    """Test cases for the worklist page and API."""
+
+    def test_renewals_page(self, client, worklist):
+        """Test that the page lists the bucket with its counts."""
+        response = client.get('/policies/renewals?bucket=Critical')
+        assert response.status_code == 200
+        assert worklist[0].policy_number.encode() in response.data
+        assert worklist[8].policy_number.encode() not in response.data
+        assert b'Warning' in response.data
+
+    def test_renewals_page_ignores_unknown_bucket(self, client, worklist):
+        """Test that an unknown bucket shows the whole worklist."""
+        response = client.get('/policies/renewals?bucket=Later')
+        assert response.status_code == 200
+        assert worklist[-5].policy_number.encode() in response.data
+
+    def test_renewals_api_pages(self, client, worklist):
+        """Test that the API pages through the worklist in end-date order."""
+        response = client.get('/policies/api/renewals?limit=4')
+        data = json.loads(response.data)
+        assert data['buckets']['Critical'] == 2
+        assert [p['policy_number'] for p in data['policies']] == [
+            worklist[days].policy_number for days in (-5, 0, 7, 8)]
+
+        response = client.get(f"/policies/api/renewals?limit=4&cursor={data['next_cursor']}")
+        data = json.loads(response.data)
+        assert [p['policy_number'] for p in data['policies']] == [
+            worklist[days].policy_number for days in (30, 31, 90)]
+        assert data['next_cursor'] is None
+
+    def test_renewals_api_matches_to_dict(self, client, session, worklist):
+        """Test that the batch serialized page is what to_dict gives for the same policies."""
+        data = json.loads(client.get('/policies/api/renewals?limit=4').data)
+        expected = [session.get(Policy, p['policy_id']).to_dict() for p in data['policies']]
+        assert data['policies'] == json.loads(json.dumps(expected))
+
+    def test_renewals_api_filters(self, client, worklist, other_agent):
+        """Test the bucket and agency filters on the API."""
+        response = client.get(f'/policies/api/renewals?agency_id={other_agent.agency_id}')
+        assert json.loads(response.data)['policies'] == []
+
+        response = client.get('/policies/api/renewals?bucket=Expired')
+        data = json.loads(response.data)
+        assert [p['renewal_status'] for p in data['policies']] == ['Expired']
+
+    def test_dashboard_renewals(self, client, worklist):
+        """Test that the dashboard shows the next renewals, not lapsed policies."""
+        response = client.get('/')
+        assert worklist[0].policy_number.encode() in response.data
+        assert worklist[-400].policy_number.encode() not in response.data
+        assert b'/policies/renewals' in response.data
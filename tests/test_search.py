@@ -0,0 +1,160 @@
+"""
+Tests for the full-text search subsystem.
+"""
+import pytest
+import json
+from datetime import datetime
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from services import search
+
+
+@pytest.fixture
+def ilike_only(monkeypatch):
+    """Force the portable ILIKE fallback."""
+    monkeypatch.setattr(search, 'fts_available', lambda: False)
+
+
+class TestMatchExpression:
+    """Test cases for turning search terms into FTS queries."""
+    
+    def test_words_become_prefixes(self):
+        """Test that every word is matched as a prefix."""
+        assert search.match_expression('Jan Smi') == '"jan"* "smi"*'
+    
+    def test_punctuation_is_ignored(self):
+        """Test that punctuation splits words and cannot inject syntax."""
+        assert search.match_expression('CLM-TEST"456') == '"clm"* "test"* "456"*'
+        assert search.match_expression('- "') is None
+    
+    def test_column_filter(self):
+        """Test restricting the match to named columns."""
+        assert search.match_expression('jo', columns=['name']) == '{name} : ("jo"*)'
+
+
+class TestSearchIndex:
+    """Test cases for the FTS index and its triggers."""
+    
+    def test_index_is_available(self, session):
+        """Test that the FTS tables are installed on SQLite."""
+        assert search.fts_available()
+    
+    def test_customer_prefix(self, session, sample_customer):
+        """Test that a customer is found by name prefixes."""
+        ids = [c.customer_id for c in search.filter_customers(Customer.query, 'jan smi')]
+        assert ids == [sample_customer.customer_id]
+    
+    def test_customer_phone_and_email(self, session, sample_customer):
+        """Test that phone numbers and emails are indexed."""
+        assert search.filter_customers(Customer.query, '555-9012').count() == 1
+        assert search.filter_customers(Customer.query, 'jane.smith@example').count() == 1
+    
+    def test_update_reindexes(self, session, sample_customer):
+        """Test that renaming a customer updates the index."""
+        sample_customer.last_name = "Jones"
+        session.commit()
+        
+        assert search.filter_customers(Customer.query, 'jones').count() == 1
+        labels = [hit['label'] for hit in search.prefix_search('jane', entities=['customer'])]
+        assert labels == ['Jane Jones']
+    
+    def test_delete_removes_from_index(self, session, sample_customer):
+        """Test that deleting a customer removes it from the index."""
+        session.delete(sample_customer)
+        session.commit()
+        
+        assert search.prefix_search('jane', entities=['customer']) == []
+    
+    def test_policy_by_customer_and_agent_name(self, session, sample_policy):
+        """Test that policies are found through customer and agent names."""
+        assert search.filter_policies(Policy.query, 'Jane').count() == 1
+        assert search.filter_policies(Policy.query, 'doe').count() == 1
+        assert search.filter_policies(Policy.query, 'auto').count() == 1
+        assert search.filter_policies(Policy.query, 'nobody').count() == 0
+    
+    def test_policy_does_not_match_customer_email(self, session, sample_policy):
+        """Test that only customer and agent names are searched for policies."""
+        assert search.filter_policies(Policy.query, 'example').count() == 0
+    
+    def test_claim_by_policy_number(self, session, sample_claim):
+        """Test that claims are found by their policy number."""
+        assert search.filter_claims(Claim.query, 'POL-TEST123').count() == 1
+        assert search.filter_claims(Claim.query, 'clm-test').count() == 1
+        assert search.filter_claims(Claim.query, 'auto').count() == 0
+    
+    def test_rebuild(self, db, session, sample_customer):
+        """Test that the index can be rebuilt from the source tables."""
+        with db.engine.begin() as connection:
+            search.rebuild_search_index(connection)
+        
+        assert search.filter_customers(Customer.query, 'jane').count() == 1
+
+
+class TestPrefixSearch:
+    """Test cases for ranked prefix search."""
+    
+    def test_ranked_hits(self, session, sample_claim):
+        """Test that hits across entities carry labels and ranks."""
+        session.add(Customer(first_name="Janet", last_name="Testa"))
+        session.commit()
+        
+        hits = search.prefix_search('jan')
+        labels = [hit['label'] for hit in hits]
+        
+        assert set(labels) == {'Jane Smith', 'Janet Testa'}
+        assert all(hit['entity'] == 'customer' for hit in hits)
+        assert hits == sorted(hits, key=lambda hit: hit['rank'])
+    
+    def test_limit(self, session):
+        """Test that the number of hits is limited."""
+        session.add_all([Customer(first_name=f"Sam{i}", last_name="Same") for i in range(5)])
+        session.commit()
+        
+        assert len(search.prefix_search('same', limit=3)) == 3
+    
+    def test_fallback(self, session, sample_policy, ilike_only):
+        """Test prefix search without FTS."""
+        hits = search.prefix_search('POL-TEST', entities=['policy'])
+        assert [hit['label'] for hit in hits] == ['POL-TEST123']
+    
+    def test_search_api(self, client, sample_claim):
+        """Test the search API endpoint."""
+        response = client.get('/search/api/search?q=clm&type=claim')
+        assert response.status_code == 200
+        
+        data = json.loads(response.data)
+        assert data[0]['label'] == 'CLM-TEST456'
+        assert data[0]['id'] == sample_claim.claim_id
+    
+    def test_search_api_unknown_type(self, client, session):
+        """Test the search API with an unknown type."""
+        response = client.get('/search/api/search?q=x&type=agency')
+        assert response.status_code == 400
+
+
+class TestSearchRoutes:
+    """Test cases for search in the list views."""
+    
+    @pytest.mark.parametrize('url, needle', [
+        ('/customers/?search=Smi', b'Jane'),
+        ('/agents/?search=Jo', b'John'),
+        ('/policies/?search=smith', b'POL-TEST123'),
+        ('/claims/?search=POL-TEST', b'CLM-TEST456'),
+    ])
+    def test_fts_search(self, client, sample_claim, url, needle):
+        """Test that the list views search through the index."""
+        response = client.get(url)
+        assert response.status_code == 200
+        assert needle in response.data
+    
+    @pytest.mark.parametrize('url, needle', [
+        ('/customers/?search=mit', b'Jane'),
+        ('/policies/?search=TEST12', b'POL-TEST123'),
+        ('/claims/?search=TEST456', b'CLM-TEST456'),
+    ])
+    def test_ilike_fallback(self, client, sample_claim, ilike_only, url, needle):
+        """Test that substring search still works without FTS."""
+        response = client.get(url)
+        assert response.status_code == 200
+        assert needle in response.data
@@ -0,0 +1,96 @@
+"""
+Tests for the synthetic data generator and the seed command.
+"""
+import pytest
+from datetime import date
+from sqlalchemy.orm import undefer
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from services import seed, search
+
+
+TODAY = date(2025, 6, 15)
+
+
+@pytest.fixture
+def seeded(session):
+    """The result of seeding one unit of scale."""
+    return seed.seed(scale=1, seed=7, today=TODAY, chunk_size=300)
+
+
+class TestSeed:
+    """Test cases for the rows the generator adds."""
+
+    def test_row_counts(self, session, seeded):
+        """Test that one unit of scale adds ROWS_PER_SCALE rows to each table."""
+        assert seeded.counts == seed.ROWS_PER_SCALE
+        assert {name: model.query.count() for name, model in (
+            ('agencies', Agency), ('agents', Agent), ('customers', Customer),
+            ('policies', Policy), ('claims', Claim))} == seed.ROWS_PER_SCALE
+
+    def test_statuses_agree_with_dates(self, session, seeded):
+        """Test that Pending policies start later, Active ones are in force and Expired ones ended."""
+        for policy in Policy.query:
+            if policy.policy_status == 'Pending':
+                assert policy.start_date > TODAY
+            elif policy.policy_status == 'Active':
+                assert policy.is_active(TODAY)
+            elif policy.policy_status == 'Expired':
+                assert policy.end_date < TODAY
+
+    def test_claims_fall_inside_policy_terms(self, session, seeded):
+        """Test that every incident happened while its policy ran and was claimed afterwards."""
+        for claim in Claim.query:
+            assert claim.policy.start_date <= claim.incident_date <= claim.policy.end_date
+            assert claim.incident_date <= claim.claim_date <= TODAY
+            if claim.settlement_amount is not None:
+                assert claim.status == 'Settled'
+                assert claim.settlement_amount <= claim.claim_amount
+
+    def test_policies_are_skewed(self, session, seeded):
+        """Test that some customers hold several policies while most hold one or none."""
+        counts = [c.policy_count for c in Customer.query.options(undefer(Customer.policy_count))]
+        assert max(counts) >= 4
+        assert sorted(counts)[len(counts) // 2] <= 2
+
+    def test_same_seed_same_rows(self, session):
+        """Test that a seed number reproduces its rows."""
+        seed.seed(scale=0.1, seed=3, today=TODAY)
+        first = [(p.policy_type, p.premium, p.start_date) for p in Policy.query.order_by(Policy.policy_id)]
+        session.query(Agency).delete()
+        session.query(Customer).delete()
+        session.commit()
+
+        seed.seed(scale=0.1, seed=3, today=TODAY)
+        assert [(p.policy_type, p.premium, p.start_date)
+                for p in Policy.query.order_by(Policy.policy_id)] == first
+
+    def test_adds_after_existing_rows(self, session, sample_claim, seeded):
+        """Test that seeding an existing database keeps its rows and numbers."""
+        assert session.get(Claim, sample_claim.claim_id).claim_number == 'CLM-TEST456'
+        assert Claim.query.count() == seed.ROWS_PER_SCALE['claims'] + 1
+
+    def test_search_index_covers_seeded_rows(self, session, seeded):
+        """Test that the rows inserted with the triggers off are still searchable."""
+        policy = Policy.query.order_by(Policy.policy_id.desc()).first()
+        assert search.filter_policies(Policy.query, policy.policy_number).all() == [policy]
+        # and the triggers are back for ordinary writes
+        customer = Customer(first_name='Zebedee', last_name='Quartermain')
+        session.add(customer)
+        session.commit()
+        assert search.filter_customers(Customer.query, 'quartermain').all() == [customer]
+
+
+class TestSeedCommand:
+    """Test cases for the seed CLI command."""
+
+    def test_command(self, app, session):
+        """Test that the command seeds the requested scale and reports its speed."""
+        result = app.test_cli_runner().invoke(args=['seed', '--scale', '0.1', '--seed', '1'])
+        assert result.exit_code == 0, result.output
+        assert '80 policies' in result.output
+        assert 'rows/sec' in result.output
+        assert Policy.query.count() == 80
@@ -0,0 +1,113 @@
+"""
+Tests for the batch serializers behind the JSON APIs.
+"""
+import json
+import re
+import pytest
+from datetime import date, datetime, timedelta
+from models.agency import Agency
+from models.agent import Agent
+from models.customer import Customer
+from models.policy import Policy
+from models.claim import Claim
+from services import serializers
+
+
+MODELS = [Agency, Agent, Customer, Policy, Claim]
+
+_ISO = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def _as_driver_value(value):
+    # What drivers other than SQLite's return for date and timestamp columns
+    if isinstance(value, str) and _ISO.fullmatch(value[:10]):
+        return date.fromisoformat(value) if len(value) == 10 else datetime.fromisoformat(value)
+    return value
+
+
+@pytest.fixture
+def varied_rows(session, sample_claim):
+    """Rows with the optional columns left empty, next to the fully filled samples."""
+    policy = sample_claim.policy
+    customer = Customer(first_name='No', last_name='Birthday')
+    session.add(customer)
+    session.flush()
+    session.add(Policy(agent_id=policy.agent_id, customer_id=customer.customer_id,
+                       policy_number='POL-OPEN-END', policy_type='Life Insurance',
+                       start_date=date.today() + timedelta(days=3), policy_status='Pending'))
+    session.add(Claim(policy_id=policy.policy_id, claim_number='CLM-SETTLED',
+                      claim_date=date.today() - timedelta(days=40), incident_date=date.today(),
+                      status='Settled', claim_amount=250.5, settlement_amount=200,
+                      resolution_date=date.today()))
+    session.commit()
+    return sample_claim
+
+
+class TestSchemas:
+    """Test cases for serializing column tuples."""
+
+    @pytest.mark.parametrize('model', MODELS, ids=lambda m: m.__name__)
+    def test_matches_to_dict(self, session, varied_rows, model):
+        """Test that each schema gives exactly what to_dict gives, in the same key order."""
+        schema = serializers.schema_for(model)
+        rows = session.execute(schema.select().order_by(schema.pk)).all()
+        expected = [obj.to_dict() for obj in session.query(model).order_by(schema.pk)]
+
+        items = schema.serialize(rows)
+        assert items == expected
+        assert [list(item) for item in items] == [list(item) for item in expected]
+
+    @pytest.mark.parametrize('model', MODELS, ids=lambda m: m.__name__)
+    def test_date_objects(self, session, varied_rows, model):
+        """Test that rows holding date and datetime objects give the same output as ISO text."""
+        schema = serializers.schema_for(model)
+        rows = session.execute(schema.select().order_by(schema.pk)).all()
+        typed = [tuple(_as_driver_value(value) for value in row) for row in rows]
+        assert schema.serialize(typed) == schema.serialize(rows)
+
+    def test_today_is_fixed_per_batch(self, session, sample_policy):
+        """Test that computed fields use the batch's date, not the clock."""
+        schema = serializers.schema_for(Policy)
+        rows = session.execute(schema.select()).all()
+        later = sample_policy.end_date + timedelta(days=1)
+
+        item, = schema.serialize(rows, today=later)
+        assert item['days_until_renewal'] == -1
+        assert item['renewal_status'] == 'Expired'
+        assert item['is_active'] is False
+
+    def test_one_statement_per_batch(self, session, varied_rows, query_counter):
+        """Test that related names and counts come with the rows, not per row."""
+        schema = serializers.schema_for(Claim)
+        with query_counter:
+            schema.serialize(session.execute(schema.select()).all())
+        assert query_counter.count == 1
+
+    def test_dumps(self):
+        """Test that the encoder returns UTF-8 JSON bytes."""
+        encoded = serializers.dumps([{'name': 'Zoë', 'amount': 1.5, 'none': None}])
+        assert isinstance(encoded, bytes)
+        assert json.loads(encoded) == [{'name': 'Zoë', 'amount': 1.5, 'none': None}]
+
+
+class TestListEndpoints:
+    """Test cases for the batched list responses."""
+
+    @pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+    def test_batches_are_spliced(self, app, client, session, monkeypatch, fmt):
+        """Test that a stream of several batches is one valid document."""
+        monkeypatch.setitem(app.config, 'API_STREAM_BATCH', 2)
+        session.add_all([Customer(first_name=f'C{i}', last_name='Batch') for i in range(5)])
+        session.commit()
+
+        response = client.get(f'/customers/api/customers?format={fmt}')
+        body = response.get_data(as_text=True)
+        if fmt == 'ndjson':
+            items = [json.loads(line) for line in body.splitlines()]
+        else:
+            items = json.loads(body)
+        assert [item['first_name'] for item in items] == [f'C{i}' for i in range(5)]
+
+    def test_empty_table(self, client, session):
+        """Test that an empty table is an empty array."""
+        assert client.get('/claims/api/claims').get_data(as_text=True) == '[]'
@@ -0,0 +1,152 @@
+"""
+Tests for the slow-query log and the slow-queries CLI command.
+"""
+import json
+import logging
+import pytest
+from services import slow_queries
+
+
+@pytest.fixture
+def slow_log(app, monkeypatch):
+    """Treat every statement as slow and collect the log lines instead of writing a file."""
+    records = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            records.append(json.loads(record.getMessage()))
+
+    monkeypatch.setitem(app.config, 'SLOW_QUERY_MS', 0.000001)
+    monkeypatch.setitem(app.config, 'SLOW_QUERY_SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(slow_queries.logger, 'handlers', [Collect()])
+    return records
+
+
+def _entry(**values):
+    entry = {'statement': 'SELECT 1', 'duration_ms': 1.0, 'endpoint': None, 'plan': None}
+    entry.update(values)
+    entry['fingerprint'] = slow_queries.fingerprint(entry['statement'])
+    return entry
+
+
+class TestFingerprint:
+    """Test cases for grouping statements by shape."""
+
+    def test_values_do_not_change_the_fingerprint(self):
+        """Test that literals, placeholders and IN list lengths are collapsed."""
+        a = "SELECT * FROM policy WHERE policy_id IN (?, ?, ?) AND policy_number = 'POL-1' LIMIT 10"
+        b = "SELECT *  FROM policy\n WHERE policy_id IN (?) AND policy_number = 'x''y' LIMIT 20"
+        assert slow_queries.normalize(a) == \
+            'SELECT * FROM policy WHERE policy_id IN (?) AND policy_number = ? LIMIT ?'
+        assert slow_queries.fingerprint(a) == slow_queries.fingerprint(b)
+
+    def test_different_statements_differ(self):
+        """Test that different tables or columns get different fingerprints."""
+        assert slow_queries.fingerprint('SELECT * FROM policy WHERE policy_id = ?') != \
+            slow_queries.fingerprint('SELECT * FROM claim WHERE claim_id = ?')
+
+    def test_identifiers_with_digits_are_kept(self):
+        """Test that numbers inside names such as anon_1 are not taken for literals."""
+        assert slow_queries.normalize('SELECT anon_1.policy_id FROM anon_1') == \
+            'SELECT anon_1.policy_id FROM anon_1'
+
+
+class TestSlowQueryLog:
+    """Test cases for timing statements and writing the log entries."""
+
+    def test_slow_select_is_logged_with_plan(self, client, session, sample_policy, slow_log):
+        """Test that a slow read from a request is logged with parameters, endpoint and plan."""
+        client.get('/policies/?search=POL-TEST')
+        entries = [e for e in slow_log if e['endpoint'] == 'policy.index']
+
+        assert entries
+        entry = next(e for e in entries if 'FROM policy' in e['statement'] and e['plan'])
+        assert entry['path'] == '/policies/'
+        assert entry['duration_ms'] > 0
+        assert entry['fingerprint'] == slow_queries.fingerprint(entry['statement'])
+        assert isinstance(entry['parameters'], list)
+        assert all(isinstance(line, str) for line in entry['plan'])
+
+    def test_parameters_are_redacted(self, app, session, sample_customer, slow_log, monkeypatch):
+        """Test that only the types and lengths of bound values are logged unless opted in."""
+        email = sample_customer.email
+        session.query(sample_customer.__class__).filter_by(email=email).all()
+        entry = next(e for e in slow_log if 'customer.email = ?' in e['statement'])
+        assert email not in json.dumps(entry)
+        assert f'<str len={len(email)}>' in entry['parameters']
+
+        monkeypatch.setitem(app.config, 'SLOW_QUERY_LOG_PARAMETERS', True)
+        slow_log.clear()
+        session.query(sample_customer.__class__).filter_by(email=email).all()
+        entry = next(e for e in slow_log if 'customer.email = ?' in e['statement'])
+        assert email in entry['parameters']
+
+    def test_write_is_logged_with_row_count(self, session, sample_policy, slow_log):
+        """Test that a write outside a request reports the rows it changed and no plan."""
+        sample_policy.premium = 123
+        session.commit()
+        entry = next(e for e in slow_log if e['statement'].startswith('UPDATE policy'))
+        assert entry['row_count'] == 1
+        assert entry['plan'] is None
+        assert entry['endpoint'] is None
+
+    def test_fast_statements_are_not_logged(self, app, session, sample_policy, slow_log, monkeypatch):
+        """Test that statements under the threshold are not logged."""
+        monkeypatch.setitem(app.config, 'SLOW_QUERY_MS', 60000)
+        session.query(sample_policy.__class__).all()
+        assert slow_log == []
+
+    @pytest.mark.parametrize('setting', ['SLOW_QUERY_MS', 'SLOW_QUERY_SAMPLE_RATE'])
+    def test_disabled(self, app, session, sample_policy, slow_log, monkeypatch, setting):
+        """Test that a zero threshold or sample rate turns the log off."""
+        monkeypatch.setitem(app.config, setting, 0)
+        session.query(sample_policy.__class__).all()
+        assert slow_log == []
+
+
+class TestSummary:
+    """Test cases for the slow-queries summary and command."""
+
+    def test_summarize_groups_by_fingerprint(self):
+        """Test that entries are grouped by shape and ordered by total time."""
+        entries = [
+            _entry(statement='SELECT * FROM claim WHERE claim_id = 1', duration_ms=300.0,
+                   endpoint='claim.view'),
+            _entry(statement='SELECT * FROM policy WHERE policy_id = 1', duration_ms=250.0,
+                   endpoint='policy.view'),
+            _entry(statement='SELECT * FROM policy WHERE policy_id = 2', duration_ms=150.0,
+                   endpoint='policy.index', plan=['SEARCH policy USING INTEGER PRIMARY KEY']),
+        ]
+        summary = slow_queries.summarize(entries)
+
+        assert [g['count'] for g in summary] == [2, 1]
+        policy = summary[0]
+        assert policy['statement'] == 'SELECT * FROM policy WHERE policy_id = ?'
+        assert policy['total_ms'] == 400.0
+        assert policy['mean_ms'] == 200.0
+        assert policy['max_ms'] == 250.0
+        assert policy['endpoints'] == ['policy.index', 'policy.view']
+        assert policy['plan'] == ['SEARCH policy USING INTEGER PRIMARY KEY']
+
+    def test_command(self, app, tmp_path):
+        """Test that the command prints each statement shape with its totals."""
+        path = tmp_path / 'slow.log'
+        lines = [json.dumps(_entry(statement=f'SELECT * FROM policy WHERE policy_id = {i}',
+                                   duration_ms=100.0, endpoint='policy.view',
+                                   plan=['SEARCH policy']))
+                 for i in range(3)]
+        path.write_text('\n'.join(lines + ['not json']) + '\n')
+
+        result = app.test_cli_runner().invoke(args=['slow-queries', '--path', str(path), '--plans'])
+        assert result.exit_code == 0, result.output
+        assert '1 statement shape(s)' in result.output
+        assert '3x  total 300.0 ms' in result.output
+        assert 'SELECT * FROM policy WHERE policy_id = ?' in result.output
+        assert 'SEARCH policy' in result.output
+
+    def test_command_without_log(self, app, tmp_path):
+        """Test that a missing log file is reported rather than an error."""
+        result = app.test_cli_runner().invoke(
+            args=['slow-queries', '--path', str(tmp_path / 'missing.log')])
+        assert result.exit_code == 0
+        assert 'No slow queries logged' in result.output